@@ -0,0 +1,28 @@
+"""add party_policy_sources deny_patterns
+
+Revision ID: 20261019000000
+Revises: 20251226000000
+Create Date: 2026-10-19 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019000000"
+down_revision = "20251226000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "party_policy_sources",
+        sa.Column("deny_patterns", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("party_policy_sources", "deny_patterns")
@@ -0,0 +1,39 @@
+"""add near-duplicate fingerprints to policy_documents
+
+Revision ID: 20261019010000
+Revises: 20261019000000
+Create Date: 2026-10-19 01:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019010000"
+down_revision = "20261019000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("policy_documents", sa.Column("simhash", sa.BigInteger(), nullable=True))
+    op.add_column("policy_documents", sa.Column("simhash_bands", postgresql.ARRAY(sa.Integer()), nullable=True))
+    op.add_column(
+        "policy_documents",
+        sa.Column(
+            "duplicate_of",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("policy_documents.doc_id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_policy_documents_simhash_bands ON policy_documents USING GIN (simhash_bands);")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_policy_documents_simhash_bands;")
+    op.drop_column("policy_documents", "duplicate_of")
+    op.drop_column("policy_documents", "simhash_bands")
+    op.drop_column("policy_documents", "simhash")
@@ -0,0 +1,27 @@
+"""add policy_chunks content_hash
+
+Revision ID: 20261019020000
+Revises: 20261019010000
+Create Date: 2026-10-19 02:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019020000"
+down_revision = "20261019010000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("policy_chunks", sa.Column("content_hash", sa.Text(), nullable=True))
+    op.execute("UPDATE policy_chunks SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex');")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_policy_chunks_doc_id_content_hash ON policy_chunks(doc_id, content_hash);")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_policy_chunks_doc_id_content_hash;")
+    op.drop_column("policy_chunks", "content_hash")
@@ -0,0 +1,24 @@
+"""add party_policy_sources repo_commit_sha
+
+Revision ID: 20261019030000
+Revises: 20261019020000
+Create Date: 2026-10-19 03:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019030000"
+down_revision = "20261019020000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("party_policy_sources", sa.Column("repo_commit_sha", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("party_policy_sources", "repo_commit_sha")
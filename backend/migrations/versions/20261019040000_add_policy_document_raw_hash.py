@@ -0,0 +1,29 @@
+"""add policy_documents raw_hash and content-addressed crawl snapshots
+
+Revision ID: 20261019040000
+Revises: 20261019030000
+Create Date: 2026-10-19 04:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019040000"
+down_revision = "20261019030000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("policy_documents", sa.Column("raw_hash", sa.Text(), nullable=True))
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_source_snapshots_policy_crawl_content_hash "
+        "ON source_snapshots(content_hash) WHERE source_name = 'policy_crawl';"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_source_snapshots_policy_crawl_content_hash;")
+    op.drop_column("policy_documents", "raw_hash")
@@ -0,0 +1,98 @@
+"""add japanese bigram full-text index for policy_chunks
+
+Revision ID: 20261019050000
+Revises: 20261019040000
+Create Date: 2026-10-19 05:00:00
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019050000"
+down_revision = "20261019040000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 'simple' 設定は日本語を分かち書きしないため、空白/記号で区切った各区間を文字 bi-gram に分ける。
+    # 区間が1文字ならその文字自体をトークンにする。位置は区間ごとに1つ空け、フレーズ検索が区間をまたがないようにする。
+    op.execute(
+        """
+    CREATE OR REPLACE FUNCTION ja_bigram_tokens(t text)
+    RETURNS TABLE(seg_no bigint, pos int, token text)
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+      SELECT s.seg_no,
+             p.pos,
+             CASE WHEN char_length(s.seg) = 1 THEN s.seg ELSE substr(s.seg, p.pos, 2) END
+      FROM regexp_split_to_table(lower(normalize(coalesce(t, ''), NFKC)), '[[:space:][:punct:]]+')
+           WITH ORDINALITY AS s(seg, seg_no)
+      CROSS JOIN LATERAL generate_series(1, greatest(char_length(s.seg) - 1, 1)) AS p(pos)
+      WHERE s.seg <> ''
+    $$;
+    """
+    )
+    # 索引式から呼ばれるため search_path を固定する（リストア時に ja_bigram_tokens が見つからなくならないように）。
+    # パーサ（ロケール依存）を通さないよう tsvector/tsquery はリテラルを組み立ててキャストする
+    op.execute(
+        """
+    CREATE OR REPLACE FUNCTION ja_bigram_tsvector(t text)
+    RETURNS tsvector
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    SET search_path = public, pg_catalog
+    AS $$
+      SELECT coalesce(
+        string_agg(
+          '''' || replace(replace(token, '\\', '\\\\'), '''', '''''') || ''':' || least(n, 16383),
+          ' '
+        )::tsvector,
+        ''::tsvector
+      )
+      FROM (
+        SELECT token, row_number() OVER (ORDER BY seg_no, pos) + seg_no AS n
+        FROM ja_bigram_tokens(t)
+      ) x
+    $$;
+    """
+    )
+    # mode='all': 区間ごとに bi-gram を隣接（<->）で結び、区間どうしは AND（部分一致の AND 検索）
+    # mode='any': いずれかの bi-gram を含む（長い問い合わせ向けの緩い検索。順位付けは ts_rank_cd）
+    op.execute(
+        """
+    CREATE OR REPLACE FUNCTION ja_bigram_tsquery(q text, mode text DEFAULT 'all')
+    RETURNS tsquery
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    SET search_path = public, pg_catalog
+    AS $$
+      SELECT coalesce(
+        string_agg('(' || phrase || ')', CASE WHEN mode = 'any' THEN ' | ' ELSE ' & ' END)::tsquery,
+        ''::tsquery
+      )
+      FROM (
+        SELECT string_agg(
+                 '''' || replace(replace(token, '\\', '\\\\'), '''', '''''') || ''''
+                   || CASE WHEN char_length(token) = 1 THEN ':*' ELSE '' END,
+                 CASE WHEN mode = 'any' THEN ' | ' ELSE ' <-> ' END
+                 ORDER BY pos
+               ) AS phrase
+        FROM ja_bigram_tokens(q)
+        GROUP BY seg_no
+      ) s
+    $$;
+    """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_policy_chunks_content_bigram
+        ON policy_chunks
+        USING gin (ja_bigram_tsvector(content))
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_policy_chunks_content_bigram")
+    op.execute("DROP FUNCTION IF EXISTS ja_bigram_tsquery(text, text)")
+    op.execute("DROP FUNCTION IF EXISTS ja_bigram_tsvector(text)")
+    op.execute("DROP FUNCTION IF EXISTS ja_bigram_tokens(text)")
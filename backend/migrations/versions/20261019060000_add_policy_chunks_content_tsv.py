@@ -0,0 +1,42 @@
+"""add stored bigram tsvector column and (party_id, tsv) index to policy_chunks
+
+Revision ID: 20261019060000
+Revises: 20261019050000
+Create Date: 2026-10-19 06:00:00
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019060000"
+down_revision = "20261019050000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GIN で uuid の等値条件を扱うため（party_id と tsvector を1つの索引にまとめる）
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin;")
+    op.execute(
+        """
+    ALTER TABLE policy_chunks
+      ADD COLUMN IF NOT EXISTS content_tsv tsvector
+      GENERATED ALWAYS AS (ja_bigram_tsvector(content)) STORED;
+    """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_policy_chunks_party_id_content_tsv ON policy_chunks USING gin (party_id, content_tsv);")
+    # 式索引は保存列の索引に置き換える
+    op.execute("DROP INDEX IF EXISTS idx_policy_chunks_content_bigram;")
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_policy_chunks_content_bigram
+        ON policy_chunks
+        USING gin (ja_bigram_tsvector(content))
+        """
+    )
+    op.execute("DROP INDEX IF EXISTS idx_policy_chunks_party_id_content_tsv;")
+    op.execute("ALTER TABLE policy_chunks DROP COLUMN IF EXISTS content_tsv;")
@@ -0,0 +1,54 @@
+"""turn policy_chunks.embedding into a pgvector column
+
+Revision ID: 20261019070000
+Revises: 20261019060000
+Create Date: 2026-10-19 07:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019070000"
+down_revision = "20261019060000"
+branch_labels = None
+depends_on = None
+
+
+# pgvector（サーバ側の拡張）の最低バージョン。README の「PostgreSQLセットアップ」を参照
+PGVECTOR_MIN_VERSION = (0, 5, 0)
+
+
+def _check_pgvector() -> None:
+    """拡張が入っていないサーバでは、原因の分かるメッセージで止める。"""
+    row = op.get_bind().execute(
+        sa.text(
+            "SELECT coalesce(installed_version, default_version) AS version FROM pg_available_extensions WHERE name = 'vector'"
+        )
+    ).first()
+    required = ".".join(map(str, PGVECTOR_MIN_VERSION))
+    if row is None:
+        raise RuntimeError(
+            f"pgvector is not installed on this PostgreSQL server. Install pgvector >= {required} "
+            "(e.g. `brew install pgvector`, `apt install postgresql-15-pgvector`, or the pgvector/pgvector:pg15 image) "
+            "and re-run `alembic upgrade head`."
+        )
+    version = tuple(int(p) for p in str(row.version).split(".")[:3] if p.isdigit())
+    if version < PGVECTOR_MIN_VERSION:
+        raise RuntimeError(f"pgvector {row.version} is too old; >= {required} is required.")
+
+
+def upgrade() -> None:
+    _check_pgvector()
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    # これまでの embedding はプレースホルダ（常に NULL）なので値は引き継がない
+    op.execute("ALTER TABLE policy_chunks ALTER COLUMN embedding TYPE vector(256) USING NULL;")
+    op.add_column("policy_chunks", sa.Column("embedding_model", sa.Text(), nullable=True))
+    # 近似索引（HNSW）は作らない: 検索は政党で絞った行を全件比較する（policy_index._vector_rows）
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_policy_chunks_embedding_hnsw;")
+    op.drop_column("policy_chunks", "embedding_model")
+    op.execute("ALTER TABLE policy_chunks ALTER COLUMN embedding TYPE text USING NULL;")
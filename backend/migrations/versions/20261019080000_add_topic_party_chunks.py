@@ -0,0 +1,45 @@
+"""add topic_party_chunks (materialized top chunks per topic x party) and party_registry.index_generation
+
+Revision ID: 20261019080000
+Revises: 20261019070000
+Create Date: 2026-10-19 08:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019080000"
+down_revision = "20261019070000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 政党のチャンクが変わるたびに増やす。topic_party_chunks の行はこの値と比べて古さを判定する
+    op.add_column(
+        "party_registry",
+        sa.Column("index_generation", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+    )
+    # chunk_id は policy_chunks を参照しない（再チャンク化でテーブルごと差し替えるため外部キーを張れない）
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS topic_party_chunks (
+          topic_id TEXT NOT NULL REFERENCES topics(topic_id) ON DELETE CASCADE,
+          party_id UUID NOT NULL REFERENCES party_registry(party_id) ON DELETE CASCADE,
+          index_generation BIGINT NOT NULL,
+          query_key TEXT NOT NULL,
+          chunk_ids UUID[] NOT NULL DEFAULT '{}'::uuid[],
+          ranks DOUBLE PRECISION[] NOT NULL DEFAULT '{}'::double precision[],
+          computed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+          PRIMARY KEY (topic_id, party_id)
+        );
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_topic_party_chunks_party_id ON topic_party_chunks (party_id);")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS topic_party_chunks;")
+    op.drop_column("party_registry", "index_generation")
@@ -0,0 +1,114 @@
+"""store policy_chunks as offsets into policy_documents.content_text instead of text copies
+
+Revision ID: 20261019090000
+Revises: 20261019080000
+Create Date: 2026-10-19 09:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019090000"
+down_revision = "20261019080000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # チャンクは文書の本文への位置 [start_offset, end_offset)（文字単位）で持つ。
+    # content は本文の部分文字列にならないチャンクだけが持つ本文の複製になる
+    op.add_column("policy_chunks", sa.Column("start_offset", sa.Integer(), nullable=True))
+    op.add_column("policy_chunks", sa.Column("end_offset", sa.Integer(), nullable=True))
+    op.execute("ALTER TABLE policy_chunks ALTER COLUMN content DROP NOT NULL;")
+    op.execute(
+        """
+        ALTER TABLE policy_chunks
+          ADD CONSTRAINT ck_policy_chunks_body
+          CHECK (content IS NOT NULL OR (start_offset IS NOT NULL AND end_offset IS NOT NULL AND 0 <= start_offset AND start_offset <= end_offset));
+        """
+    )
+    # チャンクの本文（複製があればそれ、無ければ文書の本文の該当部分）
+    op.execute(
+        """
+    CREATE OR REPLACE FUNCTION policy_chunk_body(content text, doc_id uuid, start_offset integer, end_offset integer)
+    RETURNS text
+    LANGUAGE sql
+    STABLE
+    AS $$
+      SELECT coalesce(
+        content,
+        (SELECT substr(d.content_text, start_offset + 1, end_offset - start_offset) FROM policy_documents d WHERE d.doc_id = policy_chunk_body.doc_id)
+      );
+    $$;
+    """
+    )
+    # 本文が別の表にあるので生成列にはできない。既存の値は残したまま、以後はトリガーで書く
+    op.execute("ALTER TABLE policy_chunks ALTER COLUMN content_tsv DROP EXPRESSION;")
+    op.execute(
+        """
+    CREATE OR REPLACE FUNCTION policy_chunks_fill_tsv()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+      NEW.content_tsv := ja_bigram_tsvector(policy_chunk_body(NEW.content, NEW.doc_id, NEW.start_offset, NEW.end_offset));
+      RETURN NEW;
+    END;
+    $$;
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER policy_chunks_fill_tsv
+        BEFORE INSERT OR UPDATE OF content, start_offset, end_offset, doc_id ON policy_chunks
+        FOR EACH ROW EXECUTE FUNCTION policy_chunks_fill_tsv();
+        """
+    )
+    # 位置で持つ行は content が NULL なので、content の式索引は使われなくなる（simple 方式は政党で絞ってから照合する）
+    op.execute("DROP INDEX IF EXISTS idx_policy_chunks_content_fts;")
+    # 既存のチャンクは本文の複製のまま残る（空白を詰めた旧チャンクは本文の部分文字列にならない）。
+    # 適用後に scripts/reindex_policy_chunks.py を流すこと（必須）。位置で持つ行だけの新しい表を作って入れ替えるので、
+    # 古い行の領域も消え、VACUUM FULL は要らない（手順と計測は docs/policy-search-benchmarks.md）
+
+
+def downgrade() -> None:
+    # 位置で持つ行に本文を、URL/タイトルを持たない行に文書の URL/タイトルを書き戻す
+    op.execute(
+        "UPDATE policy_chunks SET content = policy_chunk_body(content, doc_id, start_offset, end_offset) WHERE content IS NULL;"
+    )
+    op.execute(
+        """
+        UPDATE policy_chunks c
+        SET meta = jsonb_build_object('source_url', d.url, 'title', d.title) || c.meta
+        FROM policy_documents d
+        WHERE d.doc_id = c.doc_id AND NOT (c.meta ? 'source_url');
+        """
+    )
+    op.execute("DELETE FROM policy_chunks WHERE content IS NULL;")
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_policy_chunks_content_fts
+        ON policy_chunks
+        USING gin (to_tsvector('simple', content))
+        """
+    )
+    op.execute("DROP TRIGGER IF EXISTS policy_chunks_fill_tsv ON policy_chunks;")
+    op.execute("DROP FUNCTION IF EXISTS policy_chunks_fill_tsv();")
+    # 通常の列を生成列に戻すことはできないので作り直す
+    op.execute("DROP INDEX IF EXISTS idx_policy_chunks_party_id_content_tsv;")
+    op.execute("ALTER TABLE policy_chunks DROP COLUMN IF EXISTS content_tsv;")
+    op.execute(
+        """
+    ALTER TABLE policy_chunks
+      ADD COLUMN content_tsv tsvector
+      GENERATED ALWAYS AS (ja_bigram_tsvector(content)) STORED;
+    """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_policy_chunks_party_id_content_tsv ON policy_chunks USING gin (party_id, content_tsv);")
+    op.execute("DROP FUNCTION IF EXISTS policy_chunk_body(text, uuid, integer, integer);")
+    op.execute("ALTER TABLE policy_chunks DROP CONSTRAINT IF EXISTS ck_policy_chunks_body;")
+    op.execute("ALTER TABLE policy_chunks ALTER COLUMN content SET NOT NULL;")
+    op.drop_column("policy_chunks", "end_offset")
+    op.drop_column("policy_chunks", "start_offset")
@@ -0,0 +1,34 @@
+"""add boilerplate_models (per-host boilerplate lines learned by the policy crawler)
+
+Revision ID: 20261019100000
+Revises: 20261019090000
+Create Date: 2026-10-19 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019100000"
+down_revision = "20261019090000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 前回のクロールで学習した共通行。今回の標本が少なすぎるホストではこれで除去する（再クロールでチャンクが揺れないように）
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS boilerplate_models (
+          host TEXT PRIMARY KEY,
+          lines JSONB NOT NULL DEFAULT '[]'::jsonb,
+          pages INTEGER NOT NULL DEFAULT 0,
+          updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS boilerplate_models;")
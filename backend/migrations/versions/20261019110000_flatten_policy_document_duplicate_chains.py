@@ -0,0 +1,50 @@
+"""point every near-duplicate policy document at the root canonical document
+
+Revision ID: 20261019110000
+Revises: 20261019100000
+Create Date: 2026-10-19 11:00:00
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019110000"
+down_revision = "20261019100000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 正だった文書が後から別の文書の重複になると B→A→C の連鎖ができていた。各文書を連鎖の根（duplicate_of が NULL）に付け替える。
+    # 循環している場合は深さの上限で打ち切り、付け替えない
+    op.execute(
+        """
+        WITH RECURSIVE chain AS (
+          SELECT doc_id, duplicate_of AS root, 1 AS depth
+          FROM policy_documents
+          WHERE duplicate_of IS NOT NULL
+          UNION ALL
+          SELECT c.doc_id, d.duplicate_of, c.depth + 1
+          FROM chain c
+          JOIN policy_documents d ON d.doc_id = c.root
+          WHERE d.duplicate_of IS NOT NULL AND c.depth < 32
+        ),
+        resolved AS (
+          SELECT DISTINCT ON (c.doc_id) c.doc_id, c.root
+          FROM chain c
+          JOIN policy_documents r ON r.doc_id = c.root
+          WHERE r.duplicate_of IS NULL
+          ORDER BY c.doc_id, c.depth DESC
+        )
+        UPDATE policy_documents d
+        SET duplicate_of = resolved.root
+        FROM resolved
+        WHERE d.doc_id = resolved.doc_id AND d.duplicate_of IS DISTINCT FROM resolved.root;
+        """
+    )
+
+
+def downgrade() -> None:
+    # 元の連鎖は復元できない（根への付け替えはどの版でも正しい状態）
+    pass
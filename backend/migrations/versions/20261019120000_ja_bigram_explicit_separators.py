@@ -0,0 +1,60 @@
+"""split ja_bigram_tokens on an explicit separator class instead of locale-dependent [:space:][:punct:]
+
+Revision ID: 20261019120000
+Revises: 20261019110000
+Create Date: 2026-10-19 12:00:00
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019120000"
+down_revision = "20261019110000"
+branch_labels = None
+depends_on = None
+
+
+# 区切り文字（NFKC 後）。[[:space:][:punct:]] は DB のロケール（LC_CTYPE）で中身が変わり、IMMUTABLE 関数と
+# 保存済みの content_tsv が環境ごとに食い違うため、コードポイントで明示する。
+# ASCII の空白・記号、Latin-1 の記号、一般句読点、矢印/数学記号/罫線/図形/記号/装飾記号、CJK の句読点・括弧、中黒。
+# 々〆〇・長音（ー）・踊り字は語の一部なので含めない。src/services/chunk_bm25.py の _SEPARATORS と同じ
+SEPARATORS = (
+    r"[\x09-\x0d\x20-\x2f\x3a-\x40\x5b-\x60\x7b-\x7e\u00a0-\u00bf\u00d7\u00f7\u2000-\u206f\u2190-\u27bf"
+    r"\u2985\u2986\u3000-\u3004\u3008-\u3020\u3030\u303d\u30fb]+"
+)
+LEGACY_SEPARATORS = "[[:space:][:punct:]]+"
+
+
+def _tokens_function(separators: str) -> str:
+    # E'' 文字列にして standard_conforming_strings の設定によらず同じ正規表現になるようにする
+    pattern = "E'" + separators.replace("\\", "\\\\") + "'"
+    return f"""
+    CREATE OR REPLACE FUNCTION ja_bigram_tokens(t text)
+    RETURNS TABLE(seg_no bigint, pos int, token text)
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+      SELECT s.seg_no,
+             p.pos,
+             CASE WHEN char_length(s.seg) = 1 THEN s.seg ELSE substr(s.seg, p.pos, 2) END
+      FROM regexp_split_to_table(lower(normalize(coalesce(t, ''), NFKC)), {pattern})
+           WITH ORDINALITY AS s(seg, seg_no)
+      CROSS JOIN LATERAL generate_series(1, greatest(char_length(s.seg) - 1, 1)) AS p(pos)
+      WHERE s.seg <> ''
+    $$;
+    """
+
+
+# 関数を差し替えたら保存済みの検索ベクトルも作り直す（トリガーは content_tsv 自体の更新では動かない）
+_REFILL_TSV = (
+    "UPDATE policy_chunks SET content_tsv = ja_bigram_tsvector(policy_chunk_body(content, doc_id, start_offset, end_offset));"
+)
+
+
+def upgrade() -> None:
+    op.execute(_tokens_function(SEPARATORS))
+    op.execute(_REFILL_TSV)
+
+
+def downgrade() -> None:
+    op.execute(_tokens_function(LEGACY_SEPARATORS))
+    op.execute(_REFILL_TSV)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import text
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.db import SessionLocal
+
+
+# 合成チャンクの材料（政策文書に出てくる語）
+_WORDS = [
+    "子育て", "支援", "給付", "教育", "無償化", "医療", "介護", "年金", "社会保障", "財源", "消費税", "減税",
+    "防衛", "外交", "安全保障", "エネルギー", "原発", "再生可能", "脱炭素", "地方", "分権", "デジタル", "行政",
+    "改革", "賃上げ", "最低賃金", "雇用", "物価", "対策", "農業", "食料", "自給率", "災害", "防災", "憲法",
+    "改正", "選挙", "制度", "少子化", "人口", "移民", "観光", "インフラ", "交通", "住宅", "女性", "活躍",
+]
+_QUERIES = ["子育て 支援", "消費税 減税", "最低賃金", "脱炭素 エネルギー", "防災", "年金 制度 改革"]
+
+# (名前, 検索に使う式, 作る索引)
+_VARIANTS = [
+    (
+        "expression",
+        "ja_bigram_tsvector(content)",
+        "CREATE INDEX ON bench_chunks_expr USING gin (ja_bigram_tsvector(content))",
+    ),
+    (
+        "stored",
+        "content_tsv",
+        "CREATE INDEX ON bench_chunks_stored USING gin (party_id, content_tsv)",
+    ),
+]
+
+
+def _sentence(rng: random.Random) -> str:
+    return "".join(rng.choice(_WORDS) + rng.choice(["の", "を", "に", "と", "、", "。"]) for _ in range(rng.randint(20, 60)))
+
+
+def _query_sql(table: str, tsv: str, k: int) -> str:
+    # policy_index._search_bigram と同じ形（政党で絞り、tsvector で一致・順位付け）
+    return (
+        f"SELECT chunk_id, ts_rank_cd({tsv}, q) AS rank FROM {table}, ja_bigram_tsquery(:q, 'all') AS q "
+        f"WHERE party_id = :p AND {tsv} @@ q ORDER BY rank DESC LIMIT {k}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare plans/timings of the bigram expression index vs stored tsvector + (party_id, tsv) GIN index."
+    )
+    parser.add_argument("--chunks", type=int, default=100000, help="Synthetic chunks to load (default: 100000)")
+    parser.add_argument("--parties", type=int, default=30, help="Parties to spread chunks over (default: 30)")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query for timing (default: 20)")
+    parser.add_argument("--k", type=int, default=5, help="LIMIT per query (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    parties = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(max(1, args.parties))]
+    db = SessionLocal()
+    try:
+        # 一時テーブルなので実テーブルには触れない（セッション終了で消える）
+        db.execute(text("CREATE TEMP TABLE bench_chunks_expr (chunk_id uuid PRIMARY KEY, party_id uuid NOT NULL, content text NOT NULL)"))
+        db.execute(
+            text(
+                "CREATE TEMP TABLE bench_chunks_stored (chunk_id uuid PRIMARY KEY, party_id uuid NOT NULL, content text NOT NULL, "
+                "content_tsv tsvector GENERATED ALWAYS AS (ja_bigram_tsvector(content)) STORED)"
+            )
+        )
+        started = time.perf_counter()
+        for i in range(0, args.chunks, 1000):
+            rows = [
+                {"c": uuid.UUID(int=rng.getrandbits(128)), "p": rng.choice(parties), "t": _sentence(rng)}
+                for _ in range(min(1000, args.chunks - i))
+            ]
+            for table in ("bench_chunks_expr", "bench_chunks_stored"):
+                db.execute(text(f"INSERT INTO {table} (chunk_id, party_id, content) VALUES (:c, :p, :t)"), rows)
+        print(f"loaded {args.chunks} chunks x2 in {time.perf_counter() - started:.1f}s")
+        for name, _, ddl in _VARIANTS:
+            started = time.perf_counter()
+            db.execute(text(ddl))
+            print(f"{name:10s} index build {time.perf_counter() - started:.1f}s")
+        db.execute(text("ANALYZE bench_chunks_expr"))
+        db.execute(text("ANALYZE bench_chunks_stored"))
+
+        party = parties[0]
+        for name, tsv, _ in _VARIANTS:
+            table = f"bench_chunks_{'expr' if name == 'expression' else name}"
+            sql = _query_sql(table, tsv, args.k)
+            print(f"\n=== {name}: {sql}")
+            plan = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), {"q": _QUERIES[0], "p": party}).scalars()
+            print("\n".join(plan))
+            timings: list[float] = []
+            for q in _QUERIES:
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    db.execute(text(sql), {"q": q, "p": rng.choice(parties)}).all()
+                    timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{name:10s} latency mean={statistics.mean(timings):.2f}ms p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
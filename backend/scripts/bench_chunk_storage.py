@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import text
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.db import SessionLocal
+from src.services.chunking import CHUNK_TOKENS, MIN_CHUNK_TOKENS, OVERLAP_TOKENS, chunk_spans, content_hash
+
+_SIZES_SQL = """
+SELECT pg_relation_size(c.oid) AS heap,
+       coalesce(pg_total_relation_size(nullif(c.reltoastrelid, 0)), 0) AS toast,
+       pg_indexes_size(c.oid) AS indexes,
+       pg_total_relation_size(c.oid) AS total
+FROM pg_class c
+WHERE c.oid = CAST(:t AS regclass)
+"""
+
+# (名前, 一時テーブルの DDL)。どちらも同じチャンク列を持ち、本文の持ち方だけが違う
+_LAYOUTS = [
+    (
+        "inline",
+        "CREATE TEMP TABLE bench_chunks_inline (chunk_id uuid PRIMARY KEY, doc_id uuid NOT NULL, party_id uuid NOT NULL, "
+        "chunk_index integer NOT NULL, content text NOT NULL, content_hash text, meta jsonb NOT NULL, content_tsv tsvector)",
+    ),
+    (
+        "offsets",
+        "CREATE TEMP TABLE bench_chunks_offsets (chunk_id uuid PRIMARY KEY, doc_id uuid NOT NULL, party_id uuid NOT NULL, "
+        "chunk_index integer NOT NULL, start_offset integer NOT NULL, end_offset integer NOT NULL, content_hash text, "
+        "meta jsonb NOT NULL, content_tsv tsvector)",
+    ),
+]
+
+
+def _sizes(db, table: str) -> dict[str, int]:
+    return dict(db.execute(text(_SIZES_SQL), {"t": table}).mappings().one())
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:.1f}MB"
+
+
+def current_stats(db) -> dict:
+    """今の policy_chunks / policy_documents の大きさと、本文を複製して持つ行・位置で持つ行の内訳。"""
+    rows = db.execute(
+        text(
+            "SELECT count(*) AS chunks, count(*) FILTER (WHERE content IS NOT NULL) AS inline_rows, "
+            "count(*) FILTER (WHERE content IS NULL) AS offset_rows, "
+            "coalesce(sum(pg_column_size(content)), 0) AS content_bytes, coalesce(sum(pg_column_size(meta)), 0) AS meta_bytes, "
+            "coalesce(sum(pg_column_size(content_tsv)), 0) AS tsv_bytes FROM policy_chunks"
+        )
+    ).mappings().one()
+    return {
+        "policy_chunks": _sizes(db, "policy_chunks"),
+        "policy_documents": _sizes(db, "policy_documents"),
+        **{k: int(v) for k, v in rows.items()},
+    }
+
+
+def simulate(db, *, limit: int, params: tuple[int, int, int], samples: int, repeat: int, seed: int) -> dict:
+    """実際の文書を今のチャンク化で切り、本文を複製する持ち方と位置で持つ持ち方の一時テーブルを作って比べる。
+
+    索引は本番と同じ (party_id, content_tsv) の GIN。呼び出し側で rollback する（実テーブルには書かない）。
+    """
+    chunk_size, min_size, overlap = params
+    docs = db.execute(
+        text(
+            "SELECT doc_id, party_id, url, title, content_text FROM policy_documents "
+            "WHERE duplicate_of IS NULL AND content_text IS NOT NULL AND doc_type <> 'deep_research' ORDER BY doc_id LIMIT :n"
+        ),
+        {"n": limit},
+    ).all()
+    db.execute(
+        text("CREATE TEMP TABLE bench_docs (doc_id uuid PRIMARY KEY, url text, title text, content_text text) ON COMMIT DROP")
+    )
+    for _, ddl in _LAYOUTS:
+        db.execute(text(ddl + " ON COMMIT DROP"))
+    started = time.perf_counter()
+    chunk_ids: list[uuid.UUID] = []
+    for d in docs:
+        db.execute(
+            text("INSERT INTO bench_docs VALUES (:doc_id, :url, :title, :content_text)"),
+            {"doc_id": d.doc_id, "url": d.url, "title": d.title, "content_text": d.content_text},
+        )
+        spans = chunk_spans(d.content_text, chunk_size=chunk_size, min_size=min_size, overlap=overlap)
+        rows = []
+        for idx, (start, end) in enumerate(spans):
+            cid = uuid.uuid4()
+            chunk_ids.append(cid)
+            body = d.content_text[start:end]
+            rows.append({"c": cid, "d": d.doc_id, "p": d.party_id, "i": idx, "s": start, "e": end, "t": body, "h": content_hash(body)})
+        if not rows:
+            continue
+        db.execute(
+            text(
+                "INSERT INTO bench_chunks_inline VALUES (:c, :d, :p, :i, :t, :h, "
+                "jsonb_build_object('source_url', CAST(:url AS text), 'title', CAST(:title AS text)), ja_bigram_tsvector(:t))"
+            ),
+            [{**r, "url": d.url, "title": d.title} for r in rows],
+        )
+        db.execute(
+            text("INSERT INTO bench_chunks_offsets VALUES (:c, :d, :p, :i, :s, :e, :h, '{}'::jsonb, ja_bigram_tsvector(:t))"),
+            rows,
+        )
+    print(f"loaded {len(docs)} documents / {len(chunk_ids)} chunks x2 in {time.perf_counter() - started:.1f}s")
+    for name, _ in _LAYOUTS:
+        db.execute(text(f"CREATE INDEX ON bench_chunks_{name} USING gin (party_id, content_tsv)"))
+        db.execute(text(f"ANALYZE bench_chunks_{name}"))
+    db.execute(text("ANALYZE bench_docs"))
+
+    report: dict = {"documents": len(docs), "chunks": len(chunk_ids), "bench_docs": _sizes(db, "bench_docs")}
+    # 検索結果のチャンク本文を読む時間（位置で持つ方は文書を join して切り出す。長い文書ほど展開が重い）
+    reads = {
+        "inline": "SELECT c.chunk_id, c.content, c.meta ->> 'source_url' FROM bench_chunks_inline c WHERE c.chunk_id = ANY(:ids)",
+        "offsets": (
+            "SELECT c.chunk_id, substr(d.content_text, c.start_offset + 1, c.end_offset - c.start_offset), d.url "
+            "FROM bench_chunks_offsets c JOIN bench_docs d ON d.doc_id = c.doc_id WHERE c.chunk_id = ANY(:ids)"
+        ),
+    }
+    rng = random.Random(seed)
+    for name, _ in _LAYOUTS:
+        timings: list[float] = []
+        for _ in range(repeat if chunk_ids else 0):
+            ids = rng.sample(chunk_ids, min(samples, len(chunk_ids)))
+            t0 = time.perf_counter()
+            db.execute(text(reads[name]), {"ids": ids}).all()
+            timings.append((time.perf_counter() - t0) * 1000)
+        report[name] = {
+            **_sizes(db, f"bench_chunks_{name}"),
+            "read_p50_ms": round(statistics.median(timings), 2) if timings else 0.0,
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure policy_chunks storage (heap/TOAST/index sizes, inline vs offset rows) and, with --simulate, "
+            "compare text-copy chunks against offset chunks built from the real documents in temp tables."
+        )
+    )
+    parser.add_argument("--simulate", action="store_true", help="Build both layouts from real documents in temp tables")
+    parser.add_argument("--limit", type=int, default=2000, help="Documents to use with --simulate (default: 2000)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--min-size", type=int, default=MIN_CHUNK_TOKENS)
+    parser.add_argument("--overlap", type=int, default=OVERLAP_TOKENS)
+    parser.add_argument("--samples", type=int, default=20, help="Chunks read per timing run (default: 20, like a search page)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-out", default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report: dict = {"current": current_stats(db)}
+        cur = report["current"]
+        print(
+            f"policy_chunks: {cur['chunks']} rows ({cur['inline_rows']} inline, {cur['offset_rows']} offsets) "
+            f"content={_mb(cur['content_bytes'])} meta={_mb(cur['meta_bytes'])} tsv={_mb(cur['tsv_bytes'])}"
+        )
+        for table in ("policy_chunks", "policy_documents"):
+            s = cur[table]
+            print(f"{table:17s} heap={_mb(s['heap'])} toast={_mb(s['toast'])} indexes={_mb(s['indexes'])} total={_mb(s['total'])}")
+        if args.simulate:
+            sim = simulate(
+                db,
+                limit=args.limit,
+                params=(args.chunk_size, args.min_size, args.overlap),
+                samples=args.samples,
+                repeat=args.repeat,
+                seed=args.seed,
+            )
+            report["simulate"] = sim
+            print(f"{'layout':8s} {'heap':>10s} {'toast':>10s} {'indexes':>10s} {'total':>10s} {'read p50':>10s}")
+            for name, _ in _LAYOUTS:
+                s = sim[name]
+                print(
+                    f"{name:8s} {_mb(s['heap']):>10s} {_mb(s['toast']):>10s} {_mb(s['indexes']):>10s} {_mb(s['total']):>10s} "
+                    f"{s['read_p50_ms']:>8.2f}ms"
+                )
+            saved = sim["inline"]["total"] - sim["offsets"]["total"]
+            base = sim["inline"]["total"] + sim["bench_docs"]["total"]
+            print(
+                f"documents {_mb(sim['bench_docs']['total'])}; offsets save {_mb(saved)} "
+                f"({saved / base:.1%} of documents+chunks)" if base else "no documents"
+            )
+        if args.json_out:
+            Path(args.json_out).write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
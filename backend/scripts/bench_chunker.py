@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Callable
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from eval_policy_search import FIXTURE, build_corpus, evaluate, local_modes
+from src.services.chunking import CHUNK_TOKENS, MIN_CHUNK_TOKENS, OVERLAP_TOKENS, chunk_text, estimate_tokens
+
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？!?])|(?<=\.\s)")
+_SENTENCE_END_CHARS = ("。", "！", "？", "!", "?", ".")
+
+
+def fixed_chunks(text: str, *, chunk_size: int, overlap: int) -> list[str]:
+    """当初の _chunk_text: 空白を詰めて chunk_size 文字ごとに切り、overlap 文字重ねる。"""
+    t = " ".join((text or "").split())
+    step = max(1, chunk_size - overlap)
+    out: list[str] = []
+    for i in range(0, len(t), step):
+        out.append(t[i : i + chunk_size])
+        if i + chunk_size >= len(t):
+            break
+    return out
+
+
+def char_cdc_chunks(text: str, *, chunk_size: int, min_size: int, overlap: int, cut_divisor: int = 3) -> list[str]:
+    """直前の chunk_text: 文末で content-defined に区切るが、長さは文字数で重なりは文字単位。"""
+    t = " ".join((text or "").split())
+    if not t:
+        return []
+    body_max = max(min_size, chunk_size - overlap)
+    pieces: list[str] = []
+    for sentence in _SENTENCE_END_RE.split(t):
+        while len(sentence) > body_max:
+            pieces.append(sentence[:body_max])
+            sentence = sentence[body_max:]
+        if sentence:
+            pieces.append(sentence)
+    raw: list[str] = []
+    cur = ""
+    for piece in pieces:
+        if cur and len(cur) + len(piece) > body_max:
+            raw.append(cur)
+            cur = ""
+        cur += piece
+        if len(cur) >= min_size and zlib.crc32(piece.encode("utf-8")) % cut_divisor == 0:
+            raw.append(cur)
+            cur = ""
+    if cur:
+        raw.append(cur)
+    chunks = [((raw[i - 1][-overlap:] if i > 0 and overlap > 0 else "") + body).strip() for i, body in enumerate(raw)]
+    return [c for c in chunks if c]
+
+
+def chunkers(chunk_size: int, min_size: int, overlap: int) -> dict[str, Callable[[str], list[str]]]:
+    # fixed / char-cdc は文字数、sentence は推定トークン数（日本語はおおむね1文字1トークン）
+    return {
+        "fixed": lambda t: fixed_chunks(t, chunk_size=chunk_size, overlap=overlap),
+        "char-cdc": lambda t: char_cdc_chunks(t, chunk_size=chunk_size, min_size=min_size, overlap=overlap),
+        "sentence": lambda t: chunk_text(t, chunk_size=chunk_size, min_size=min_size, overlap=overlap),
+    }
+
+
+def index_stats(texts: list[str], chunker: Callable[[str], list[str]]) -> dict:
+    source_tokens = sum(estimate_tokens(t) for t in texts)
+    chunks = [c for t in texts for c in chunker(t)]
+    stored = [estimate_tokens(c) for c in chunks]
+    # 文の途中で終わるチャンク（最後のチャンクが文末記号なしで終わる文書もあるので、文書数ぶんは誤差）
+    mid = sum(1 for c in chunks if not c.rstrip().endswith(_SENTENCE_END_CHARS))
+    return {
+        "documents": len(texts),
+        "chunks": len(chunks),
+        "stored_chars": sum(len(c) for c in chunks),
+        "stored_tokens": sum(stored),
+        "duplication": round(sum(stored) / source_tokens - 1, 4) if source_tokens else 0.0,
+        "avg_chunk_tokens": round(statistics.mean(stored), 1) if stored else 0.0,
+        "max_chunk_tokens": max(stored, default=0),
+        "ends_mid_sentence": round(mid / len(chunks), 4) if chunks else 0.0,
+    }
+
+
+def _db_texts(limit: int) -> list[str]:
+    from sqlalchemy import select
+
+    from src.db import SessionLocal, models
+
+    D = models.PolicyDocument
+    db = SessionLocal()
+    try:
+        q = select(D.content_text).where(D.duplicate_of.is_(None), D.content_text.is_not(None)).order_by(D.doc_id).limit(limit)
+        return [t for t in db.scalars(q) if t and t.strip()]
+    finally:
+        db.close()
+
+
+def retrieval_stats(fixture: dict, chunker: Callable[[str], list[str]], *, mode: str, k: int, max_chunks: int) -> dict:
+    """フィクスチャでの recall/MRR と、スコアリング1回（トピック1件 × 全政党）でプロンプトに入るチャンクの推定トークン数。"""
+    corpus = build_corpus(fixture, chunker=chunker, min_overlap=30)
+    with tempfile.TemporaryDirectory(prefix="bench_chunker_") as tmp:
+        modes = local_modes(corpus, Path(tmp))
+        if mode not in modes:
+            raise SystemExit(f"mode {mode!r} is not available here (choose from {', '.join(modes)})")
+        search = modes[mode]
+        report = evaluate(fixture, corpus, {mode: search}, k=k, repeat=1)[mode]
+        by_key = {c.key: c for c in corpus}
+        per_run = []
+        # 政党 × トピックごとの (上位 k 件に入った関連チャンク数, 関連チャンク数)。
+        # 関連チャンク数は重なりの位置で変わるので、recall の差が取りこぼしか分母の違いかをここで見分ける
+        pairs: dict[str, list[int]] = {}
+        for topic in fixture["topics"]:
+            queries = [topic["name"], *topic.get("subkeywords", [])]
+            per_run.append(
+                sum(estimate_tokens(by_key[key].content) for party in fixture["parties"] for key in search(party, queries, max_chunks))
+            )
+            for party in fixture["parties"]:
+                relevant = {c.key for c in corpus if c.party == party and topic["id"] in c.passages}
+                if relevant:
+                    pairs[f"{topic['id']}/{party}"] = [len(relevant & set(search(party, queries, k)[:k])), len(relevant)]
+    return {
+        f"recall@{k}": report[f"recall@{k}"],
+        f"passage_recall@{k}": report[f"passage_recall@{k}"],
+        "mrr": report["mrr"],
+        "prompt_tokens_per_run": round(statistics.mean(per_run), 1) if per_run else 0.0,
+        "pairs": pairs,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare chunkers (fixed-size, character CDC, sentence-aware token CDC): index size and duplication, "
+            "mid-sentence cuts, and on the fixture corpus recall/MRR and prompt tokens per scoring run."
+        )
+    )
+    parser.add_argument("--source", choices=["fixture", "db"], default="fixture", help="Texts for the index size stats")
+    parser.add_argument("--limit", type=int, default=500, help="Documents to read with --source db (default: 500)")
+    parser.add_argument("--fixture", default=str(FIXTURE))
+    parser.add_argument("--chunk-size", type=int, default=None, help=f"default: 240 for fixture, {CHUNK_TOKENS} for db")
+    parser.add_argument("--min-size", type=int, default=None, help=f"default: 120 for fixture, {MIN_CHUNK_TOKENS} for db")
+    parser.add_argument("--overlap", type=int, default=None, help=f"default: 40 for fixture, {OVERLAP_TOKENS} for db")
+    parser.add_argument("--mode", default="bm25", help="Local retrieval mode for recall/prompt tokens (default: bm25)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--max-chunks", type=int, default=4, help="Chunks per party given to the scorer (default: 4)")
+    parser.add_argument("--json-out", default=None)
+    args = parser.parse_args()
+
+    fixture = json.loads(Path(args.fixture).read_text(encoding="utf-8"))
+    small = args.source == "fixture"
+    size = args.chunk_size or (240 if small else CHUNK_TOKENS)
+    min_size = args.min_size or (120 if small else MIN_CHUNK_TOKENS)
+    overlap = args.overlap if args.overlap is not None else (40 if small else OVERLAP_TOKENS)
+    texts = (
+        ["\n\n".join(p["text"] for p in page["paragraphs"]) for page in fixture["pages"]] if small else _db_texts(args.limit)
+    )
+
+    report: dict[str, dict] = {}
+    for name, chunker in chunkers(size, min_size, overlap).items():
+        report[name] = index_stats(texts, chunker)
+        if small:
+            report[name].update(retrieval_stats(fixture, chunker, mode=args.mode, k=args.k, max_chunks=args.max_chunks))
+
+    cols = ["chunks", "stored_tokens", "duplication", "avg_chunk_tokens", "ends_mid_sentence"]
+    if small:
+        cols += [f"recall@{args.k}", f"passage_recall@{args.k}", "mrr", "prompt_tokens_per_run"]
+    print(f"source={args.source} size={size} min={min_size} overlap={overlap}")
+    print(f"{'chunker':10s} " + " ".join(f"{c:>22s}" for c in cols))
+    for name, r in report.items():
+        print(f"{name:10s} " + " ".join(f"{r[c]:>22}" for c in cols))
+    if small:
+        base_name, base = next(iter(report.items()))
+        for name, r in report.items():
+            diff = [
+                f"{pair} {base['pairs'][pair][0]}/{base['pairs'][pair][1]} -> {got[0]}/{got[1]}"
+                for pair, got in r["pairs"].items()
+                if pair in base["pairs"] and got[0] * base["pairs"][pair][1] != base["pairs"][pair][0] * got[1]
+            ]
+            if name != base_name and diff:
+                print(f"{name} vs {base_name} (relevant chunks in top {args.k} / relevant chunks): " + "; ".join(diff))
+    if args.json_out:
+        Path(args.json_out).write_text(
+            json.dumps({"source": args.source, "params": [size, min_size, overlap], "chunkers": report}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.services.crawl_frontier import CrawlFrontier, link_priority
+from src.services.crawl_traps import TrapDetector
+
+
+HOST = "https://party.example.jp"
+
+NAV = [
+    ("/news/", "お知らせ"),
+    ("/event/calendar/?ym=202601", "イベントカレンダー"),
+    ("/blog/", "ブログ"),
+    ("/contact/", "お問い合わせ"),
+    ("/donation/", "寄付のお願い"),
+    ("/about/", "党について"),
+    ("/policy/", "政策"),
+]
+
+
+def build_site(*, seed: int, policy_pages: int, pdfs: int, news_pages: int) -> tuple[dict[str, list[tuple[str, str]]], set[str]]:
+    """政党サイトを模した合成リンクグラフ（ニュース/カレンダー/タグが多く、政策ページは奥にある）。"""
+    rng = random.Random(seed)
+    graph: dict[str, list[tuple[str, str]]] = {}
+    policy: set[str] = set()
+
+    def add(url: str, links: list[tuple[str, str]]) -> None:
+        graph[url] = list(NAV) + links
+
+    add("/", [(f"/news/{i}/", f"活動報告 {i}") for i in range(1, 6)])
+    add("/about/", [("/about/history/", "沿革"), ("/about/member/", "議員一覧")])
+    add("/about/history/", [])
+    add("/about/member/", [(f"/member/{i}/", f"議員 {i}") for i in range(1, 30)])
+    for i in range(1, 30):
+        add(f"/member/{i}/", [])
+    add("/contact/", [])
+    add("/donation/", [])
+
+    add("/news/", [("/news/page/2/", "次へ")] + [(f"/news/{i}/", f"ニュース {i}") for i in range(1, 11)])
+    for page in range(2, news_pages + 1):
+        links = [(f"/news/page/{page + 1}/", "次へ")]
+        links += [(f"/news/{(page - 1) * 10 + i}/", f"ニュース {(page - 1) * 10 + i}") for i in range(1, 11)]
+        add(f"/news/page/{page}/", links)
+    for i in range(1, news_pages * 10 + 11):
+        tags = [(f"/tag/{rng.randint(1, 40)}/", "タグ") for _ in range(2)]
+        # ニュース記事の一部は政策ページへリンクする
+        if rng.random() < 0.05:
+            tags.append((f"/policy/{rng.randint(1, policy_pages)}/", "関連する政策"))
+        add(f"/news/{i}/", tags)
+    for t in range(1, 41):
+        add(f"/tag/{t}/", [(f"/news/{rng.randint(1, news_pages * 10)}/", "記事") for _ in range(5)])
+
+    add("/blog/", [(f"/blog/{i}/", f"ブログ {i}") for i in range(1, 40)])
+    for i in range(1, 40):
+        add(f"/blog/{i}/", [])
+
+    for ym in range(202601, 202613):
+        nxt = ym + 1 if ym % 100 < 12 else ym + 89
+        add(f"/event/calendar/?ym={ym}", [(f"/event/calendar/?ym={nxt}", "翌月")])
+
+    add("/policy/", [("/policy/manifesto/", "マニフェスト2026")] + [(f"/policy/{i}/", f"政策 {i}") for i in range(1, policy_pages + 1)])
+    policy.update({"/policy/", "/policy/manifesto/"})
+    add("/policy/manifesto/", [(f"/wp-content/uploads/2026/01/manifesto_{i}.pdf", f"重点政策 {i}（PDF）") for i in range(1, pdfs + 1)])
+    for i in range(1, policy_pages + 1):
+        add(f"/policy/{i}/", [])
+        policy.add(f"/policy/{i}/")
+    for i in range(1, pdfs + 1):
+        url = f"/wp-content/uploads/2026/01/manifesto_{i}.pdf"
+        graph[url] = []
+        policy.add(url)
+    return graph, policy
+
+
+def simulate(
+    graph: dict[str, list[tuple[str, str]]],
+    policy: set[str],
+    *,
+    mode: str,
+    max_urls: int,
+    max_depth: int,
+    use_traps: bool,
+    topic_terms: list[str],
+) -> dict[str, float]:
+    frontier: CrawlFrontier[tuple[str, int]] = CrawlFrontier(mode)
+    frontier.push(("/", max_depth), 100.0)
+    seen = {"/"}
+    traps = TrapDetector()
+    fetched = 0
+    found = 0
+    fetches_to_half = None
+    found_at_50 = 0
+    while len(frontier) and fetched < max_urls:
+        (path, depth), _ = frontier.pop()
+        fetched += 1
+        if path in policy:
+            found += 1
+            if fetches_to_half is None and found * 2 >= len(policy):
+                fetches_to_half = fetched
+        if fetched == 50:
+            found_at_50 = found
+        if depth <= 0:
+            continue
+        for href, anchor in graph.get(path, []):
+            if href in seen or href not in graph:
+                continue
+            if use_traps and traps.check(HOST + href):
+                continue
+            seen.add(href)
+            traps.admit(HOST + href)
+            priority = link_priority(
+                HOST + href,
+                anchor_text=anchor,
+                depth=max_depth - depth + 1,
+                topic_terms=topic_terms,
+            )
+            frontier.push((href, depth - 1), priority)
+    return {
+        "fetched": fetched,
+        "policy_docs": found,
+        "policy_total": len(policy),
+        "yield_per_fetch": round(found / fetched, 3) if fetched else 0.0,
+        "fetches_to_half": fetches_to_half or -1,
+        "found_at_50": found_at_50 if fetched >= 50 else found,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="クロール順序（BFS / best-first）ごとの政策ページ取得効率を合成サイトで比較する")
+    parser.add_argument("--max-urls", type=int, default=200)
+    parser.add_argument("--max-depth", type=int, default=4)
+    parser.add_argument("--policy-pages", type=int, default=30)
+    parser.add_argument("--pdfs", type=int, default=12)
+    parser.add_argument("--news-pages", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--traps", action="store_true", help="トラップ検出も併用する")
+    parser.add_argument("--topic-terms", default="消費税,減税,子育て,エネルギー", help="カンマ区切りのサブキーワード")
+    args = parser.parse_args()
+
+    graph, policy = build_site(seed=args.seed, policy_pages=args.policy_pages, pdfs=args.pdfs, news_pages=args.news_pages)
+    terms = [t.strip() for t in args.topic_terms.split(",") if t.strip()]
+    print(f"site pages={len(graph)} policy_docs={len(policy)} max_urls={args.max_urls} traps={args.traps}")
+    print(f"{'mode':<12}{'fetched':>9}{'policy':>8}{'yield/fetch':>13}{'to_50%':>8}{'found@50':>10}")
+    for mode in ("bfs", "best_first"):
+        r = simulate(
+            graph,
+            policy,
+            mode=mode,
+            max_urls=args.max_urls,
+            max_depth=args.max_depth,
+            use_traps=args.traps,
+            topic_terms=terms,
+        )
+        print(f"{mode:<12}{r['fetched']:>9}{r['policy_docs']:>8}{r['yield_per_fetch']:>13}{r['fetches_to_half']:>8}{r['found_at_50']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.agents.fetchers import HttpxFetcher
+from src.agents.text_extract import ParsedHtml, available_backends, parse_html
+
+
+class _LegacyTextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self._parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in {"script", "style", "noscript"}:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in {"script", "style", "noscript"} and self._skip_depth > 0:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth > 0:
+            return
+        t = data.strip()
+        if t:
+            self._parts.append(t)
+
+
+def legacy_extract(html: str) -> tuple[str, list[str], dict[str, str]]:
+    """以前のクローラ相当の処理（href正規表現 + アンカー正規表現 + markdown/URL正規表現 + HTMLParser）。"""
+    links = [m.group(1) for m in re.finditer(r'href=[\"\\\']([^\"\\\']+)', html, flags=re.IGNORECASE)]
+    anchors: dict[str, str] = {}
+    for m in re.finditer(r"<a\b[^>]*?href=[\"']([^\"']+)[\"'][^>]*>(.*?)</a>", html, flags=re.IGNORECASE | re.DOTALL):
+        text = " ".join(re.sub(r"<[^>]+>", " ", m.group(2)).split())
+        if text and m.group(1) not in anchors:
+            anchors[m.group(1)] = text[:200]
+    links += [m.group(1) for m in re.finditer(r"\[[^\]]+\]\(([^)]+)\)", html)]
+    links += [m.group(1) for m in re.finditer(r"(https?://[^\s)]+)", html)]
+    parser = _LegacyTextExtractor()
+    parser.feed(html)
+    text = "\n".join(parser._parts)
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    re.search(r"<link\b[^>]*canonical[^>]*>", html, flags=re.IGNORECASE)
+    return text.strip(), links, anchors
+
+
+def synthetic_page(*, items: int = 400) -> str:
+    """政党サイトのトップ/一覧ページを模したHTML（ナビ・ニュース一覧・インラインJSON付き）。"""
+    nav = "".join(f'<li><a href="/menu/{i}/" class="nav-link">メニュー {i}</a></li>' for i in range(40))
+    news = "".join(
+        f'<article class="post"><a href="/news/{i}/"><span class="date">2026.01.{i % 28 + 1:02d}</span>'
+        f"<h3>活動報告 {i}：子育て支援と地域経済について</h3></a><p>本文の抜粋 {i}。詳細はこちら。</p></article>"
+        for i in range(items)
+    )
+    script = "<script>window.__DATA__=" + ",".join(f'{{"url":"https://party.example.jp/p/{i}"}}' for i in range(200)) + "</script>"
+    return (
+        "<!doctype html><html><head><title>政党公式サイト</title>"
+        '<link rel="canonical" href="https://party.example.jp/"><link rel="stylesheet" href="/a.css">'
+        f"<style>body{{color:#333}}</style>{script}</head><body><nav><ul>{nav}</ul></nav>"
+        f"<main>{news}</main><footer>© party</footer></body></html>"
+    )
+
+
+def load_pages(sources: list[str]) -> list[tuple[str, str]]:
+    pages: list[tuple[str, str]] = []
+    fetcher = None
+    for src in sources:
+        if src.startswith(("http://", "https://")):
+            fetcher = fetcher or HttpxFetcher()
+            try:
+                pages.append((src, fetcher.fetch(src)))
+            except Exception as e:
+                print(f"skip {src}: {e}")
+        elif Path(src).is_dir():
+            for path in sorted(Path(src).rglob("*.htm*")):
+                pages.append((str(path), path.read_text(encoding="utf-8", errors="ignore")))
+        else:
+            pages.append((src, Path(src).read_text(encoding="utf-8", errors="ignore")))
+    return pages
+
+
+def bench(fn, html: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _signature(p: ParsedHtml) -> tuple:
+    # 埋め込みURLは重複排除されるだけなので順序は問わない
+    return (p.text, p.title, p.canonical, p.links, p.anchors, sorted(p.embedded_links))
+
+
+def compare_legacy(pages: list[tuple[str, str]], repeat: int) -> None:
+    print(f"{'page':<48}{'KB':>8}{'legacy ms':>12}{'single ms':>12}{'saving':>9}")
+    total_old = total_new = 0.0
+    for name, html in pages:
+        old = bench(legacy_extract, html, repeat)
+        new = bench(lambda h: parse_html(h, backend="stdlib"), html, repeat)
+        total_old += old
+        total_new += new
+        print(f"{name[:47]:<48}{len(html.encode()) / 1024:>8.0f}{old:>12.2f}{new:>12.2f}{1 - new / old:>9.0%}")
+    if len(pages) > 1:
+        print(f"{'total':<48}{'':>8}{total_old:>12.2f}{total_new:>12.2f}{1 - total_new / total_old:>9.0%}")
+
+
+def compare_backends(pages: list[tuple[str, str]], repeat: int) -> bool:
+    """導入済みの各バックエンドの速度（pages/sec, MB/sec）と stdlib 実装との一致率を出す。"""
+    total_mb = sum(len(html.encode()) for _, html in pages) / (1024 * 1024)
+    reference = [_signature(parse_html(html, backend="stdlib")) for _, html in pages]
+    print(f"corpus pages={len(pages)} size={total_mb:.2f}MB repeat={repeat}")
+    print(f"{'backend':<12}{'pages/sec':>11}{'MB/sec':>9}{'same text':>11}{'same all':>10}")
+    all_equal = True
+    for backend in available_backends():
+        results = [parse_html(html, backend=backend) for _, html in pages]
+        same_text = sum(1 for r, ref in zip(results, reference) if r.text == ref[0])
+        same_all = sum(1 for r, ref in zip(results, reference) if _signature(r) == ref)
+        if same_all != len(pages):
+            all_equal = False
+            for (name, _), r, ref in zip(pages, results, reference):
+                if _signature(r) != ref:
+                    print(f"  {backend}: differs on {name}")
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for _, html in pages:
+                parse_html(html, backend=backend)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(
+            f"{backend:<12}{len(pages) / elapsed:>11.1f}{total_mb / elapsed:>9.2f}"
+            f"{same_text / len(pages):>11.0%}{same_all / len(pages):>10.0%}"
+        )
+    return all_equal
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTML本文/リンク抽出のCPU時間を比較する（旧実装との比較 / バックエンド間の速度と一致率）")
+    parser.add_argument("sources", nargs="*", help="政党ページのURL・保存済みHTMLファイル・HTMLを含むディレクトリ（省略時は合成ページ）")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--mode", choices=["legacy", "backends"], default="backends")
+    parser.add_argument("--check", action="store_true", help="stdlib 実装と結果が異なるバックエンドがあれば終了コード1")
+    args = parser.parse_args()
+
+    pages = load_pages(args.sources) if args.sources else [("synthetic", synthetic_page())]
+    if not pages:
+        raise SystemExit("no pages")
+    if args.mode == "legacy":
+        compare_legacy(pages, args.repeat)
+        return
+    if not compare_backends(pages, args.repeat) and args.check:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
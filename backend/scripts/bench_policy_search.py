@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.db import SessionLocal, models
+from src.services import policy_index
+
+
+def _norm(s: str) -> str:
+    return unicodedata.normalize("NFKC", s or "").lower()
+
+
+def load_queries(db, extra: list[str]) -> list[str]:
+    if extra:
+        return extra
+    queries: list[str] = []
+    for topic in db.scalars(select(models.Topic).where(models.Topic.is_active.is_(True))):
+        queries.append(topic.name)
+        queries.extend(str(k) for k in (topic.search_subkeywords or []) if str(k).strip())
+    return list(dict.fromkeys(q for q in queries if q.strip()))
+
+
+def relevant_ids(contents: dict[str, str], q: str) -> set[str]:
+    """正解: 空白区切りの全語を部分文字列として含むチャンク（全件走査で求める）。"""
+    terms = [_norm(t) for t in q.split() if t.strip()]
+    return {cid for cid, content in contents.items() if all(t in content for t in terms)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare recall/latency/diversity of policy chunk search modes.")
+    parser.add_argument("--query", action="append", default=[], help="Query (repeatable; default: active topics + subkeywords)")
+    parser.add_argument("--k", type=int, default=5, help="Results per query (default: 5)")
+    parser.add_argument("--parties", type=int, default=10, help="Parties with the most chunks to test (default: 10)")
+    parser.add_argument("--explain", action="store_true", help="Print the bigram query plan for the first query")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        queries = load_queries(db, args.query)
+        party_ids = [
+            pid
+            for pid, _ in db.execute(
+                select(models.PolicyChunk.party_id, func.count())
+                .group_by(models.PolicyChunk.party_id)
+                .order_by(func.count().desc())
+                .limit(args.parties)
+            )
+        ]
+        if not queries or not party_ids:
+            print("no queries or no policy chunks")
+            return
+
+        if args.explain:
+            plan = db.execute(
+                text(
+                    "EXPLAIN ANALYZE SELECT chunk_id FROM policy_chunks "
+                    "WHERE party_id = :p AND content_tsv @@ ja_bigram_tsquery(:q, 'all')"
+                ),
+                {"p": party_ids[0], "q": queries[0]},
+            ).scalars()
+            print("\n".join(plan))
+
+        modes = [*policy_index.SEARCH_MODES, policy_index.HYBRID_MODE]
+        results: dict[str, dict[str, list[float]]] = {m: {"recall": [], "latency_ms": [], "empty": [], "distinct_docs": []} for m in modes}
+        for pid in party_ids:
+            contents = {
+                str(cid): _norm(content)
+                for cid, content in db.execute(
+                    select(models.PolicyChunk.chunk_id, models.PolicyChunk.content).where(models.PolicyChunk.party_id == pid)
+                )
+            }
+            for q in queries:
+                relevant = relevant_ids(contents, q)
+                for mode in modes:
+                    started = time.perf_counter()
+                    hits = policy_index.search_policy_chunks(db, party_id=pid, queries=[q], per_query=args.k, max_total=args.k, mode=mode)
+                    results[mode]["latency_ms"].append((time.perf_counter() - started) * 1000)
+                    results[mode]["empty"].append(0.0 if hits else 1.0)
+                    if hits:
+                        # 同じページの隣接チャンクばかりだと小さくなる
+                        results[mode]["distinct_docs"].append(len({str(h.chunk.doc_id) for h in hits}) / len(hits))
+                    if relevant:
+                        found = {str(h.chunk.chunk_id) for h in hits} & relevant
+                        results[mode]["recall"].append(len(found) / min(args.k, len(relevant)))
+
+        # 全政党 × 全クエリを1文で引く API と、政党ごとに引く従来の呼び方を比べる（同じ結果になるはず）
+        multi: dict[str, list[float]] = {m: [] for m in modes}
+        mismatches = {m: 0 for m in modes}
+        saved = {m: 0 for m in modes}
+        for mode in modes:
+            started = time.perf_counter()
+            batched = policy_index.search_policy_chunks_multi(
+                db, party_ids=party_ids, queries=queries, per_query=args.k, max_total=args.k * 2, mode=mode
+            )
+            multi[mode].append((time.perf_counter() - started) * 1000)
+            saved[mode] = batched.round_trips_saved
+            started = time.perf_counter()
+            for pid in party_ids:
+                single = policy_index.search_policy_chunks(
+                    db, party_id=pid, queries=queries, per_query=args.k, max_total=args.k * 2, mode=mode
+                )
+                # 同順位の並びは不定なので集合で比べる
+                if {str(h.chunk.chunk_id) for h in single} != {str(h.chunk.chunk_id) for h in batched.hits_for(pid)}:
+                    mismatches[mode] += 1
+            multi[mode].append((time.perf_counter() - started) * 1000)
+
+        print(f"parties={len(party_ids)} queries={len(queries)} k={args.k}")
+        for mode, (batched_ms, per_party_ms) in multi.items():
+            print(
+                f"{mode:7s} multi-party: 1 statement {batched_ms:.1f}ms vs per-party {per_party_ms:.1f}ms "
+                f"round_trips_saved={saved[mode]} parties_mismatched={mismatches[mode]}"
+            )
+        for mode, r in results.items():
+            lat = sorted(r["latency_ms"])
+            p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else 0.0
+            recall = statistics.mean(r["recall"]) if r["recall"] else 0.0
+            empty = statistics.mean(r["empty"]) if r["empty"] else 0.0
+            distinct = statistics.mean(r["distinct_docs"]) if r["distinct_docs"] else 0.0
+            print(
+                f"{mode:7s} recall@{args.k}={recall:.3f} no_hit={empty:.1%} distinct_docs={distinct:.2f} "
+                f"latency mean={statistics.mean(lat) if lat else 0.0:.1f}ms p95={p95:.1f}ms"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.db import SessionLocal
+from src.services import chunk_bm25
+from src.settings import settings
+
+
+def _refresh_once(rebuild: bool) -> None:
+    db: Session = SessionLocal()
+    try:
+        stats = chunk_bm25.refresh(db, rebuild=rebuild)
+    finally:
+        db.close()
+    print(json.dumps({**asdict(stats), "index_dir": str(chunk_bm25.index_dir())}, ensure_ascii=False, indent=2), flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build or incrementally refresh the local BM25 index over policy_chunks. Searches only read the index; "
+            "run this after crawls/reindexes or keep it running with --watch."
+        )
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild from scratch instead of applying the diff")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and apply the diff every BM25_REFRESH_INTERVAL_SEC seconds (default: 300)",
+    )
+    args = parser.parse_args()
+
+    if not chunk_bm25.available():
+        print("numpy is not installed; the BM25 index is unavailable", file=sys.stderr)
+        sys.exit(1)
+
+    _refresh_once(args.rebuild)
+    while args.watch:
+        time.sleep(max(1.0, float(settings.bm25_refresh_interval_sec)))
+        try:
+            _refresh_once(False)
+        except Exception as e:
+            print(f"refresh failed: {type(e).__name__}: {e}", file=sys.stderr, flush=True)
+
+if __name__ == "__main__":
+    main()
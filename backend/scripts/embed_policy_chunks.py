@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.db import SessionLocal
+from src.services import chunk_embedding
+from src.services.embeddings import get_embedder
+
+
+def _print_progress(p: chunk_embedding.EmbedProgress) -> None:
+    print(
+        f"[{p.state}] {p.model} chunks {p.chunks_done}/{p.chunks_total} failed={p.chunks_failed} "
+        f"({p.chunks_per_sec} chunks/s, {p.elapsed_sec}s)",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embed policy chunks that have no vector for the configured embedder.")
+    parser.add_argument("--provider", default=None, help="hashing|openai|gemini (default: settings.embedding_provider)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Chunks per API call/commit (default: settings)")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many chunks")
+    args = parser.parse_args()
+
+    db: Session = SessionLocal()
+    try:
+        result = chunk_embedding.embed_policy_chunks(
+            db,
+            embedder=get_embedder(args.provider),
+            batch_size=args.batch_size,
+            limit=args.limit,
+            on_progress=_print_progress,
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(result.as_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.services import chunk_bm25, policy_index
+from src.services.chunking import chunk_text, chunk_values, content_hash
+from src.services.embeddings import HashingEmbedder
+from src.settings import settings
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "policy_search_eval.json"
+# 既定のチャンク長で --engine local を実行した結果（bigram/vector/hybrid は --engine postgres と同じ値になる）
+BASELINE = Path(__file__).resolve().parent / "fixtures" / "policy_search_eval_baseline.json"
+
+# 検索関数: (政党キー, クエリ一覧, k) → 順位順のチャンクキー (url, chunk_index)
+SearchFn = Callable[[str, list[str], int], list[tuple[str, int]]]
+
+
+@dataclass
+class EvalChunk:
+    party: str
+    url: str
+    title: str
+    chunk_index: int
+    content: str
+    # トピック → 重なっているラベル付き段落 (url, 段落番号)
+    passages: dict[str, set[tuple[str, int]]] = field(default_factory=dict)
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return (self.url, self.chunk_index)
+
+
+def build_corpus(fixture: dict, *, chunker: Callable[[str], list[str]], min_overlap: int) -> list[EvalChunk]:
+    """ページをチャンク化し、各チャンクに重なる段落のトピックを付ける（段落との重なりが min_overlap 文字以上なら関連）。"""
+    out: list[EvalChunk] = []
+    for page in fixture["pages"]:
+        paras = [" ".join(p["text"].split()) for p in page["paragraphs"]]
+        flat = " ".join(paras)
+        spans = []
+        pos = 0
+        for p in paras:
+            spans.append((pos, pos + len(p)))
+            pos += len(p) + 1
+        cursor = 0
+        for idx, chunk in enumerate(chunker("\n\n".join(paras))):
+            # 空白を詰めたチャンクは空白を詰めた本文の連続した部分文字列（前のチャンクとの重なりを含む）
+            flat_chunk = " ".join(chunk.split())
+            start = flat.find(flat_chunk, cursor)
+            if start < 0:
+                start = flat.find(flat_chunk)
+            end = start + len(flat_chunk)
+            cursor = start + 1
+            c = EvalChunk(party=page["party"], url=page["url"], title=page.get("title") or "", chunk_index=idx, content=chunk)
+            for pi, ((s, e), para) in enumerate(zip(spans, page["paragraphs"])):
+                if start < 0 or min(e, end) - max(s, start) < min(min_overlap, e - s):
+                    continue
+                for topic in para.get("topics") or []:
+                    c.passages.setdefault(topic, set()).add((page["url"], pi))
+            out.append(c)
+    return out
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def evaluate(fixture: dict, corpus: list[EvalChunk], modes: dict[str, SearchFn], *, k: int, repeat: int) -> dict[str, dict]:
+    report: dict[str, dict] = {}
+    for mode, search in modes.items():
+        recall: list[float] = []
+        passage_recall: list[float] = []
+        rr: list[float] = []
+        latency: list[float] = []
+        for topic in fixture["topics"]:
+            queries = [topic["name"], *topic.get("subkeywords", [])]
+            for party in fixture["parties"]:
+                relevant = {c.key for c in corpus if c.party == party and topic["id"] in c.passages}
+                passages = set().union(*(c.passages[topic["id"]] for c in corpus if c.party == party and topic["id"] in c.passages))
+                if not relevant:
+                    continue
+                ranked: list[tuple[str, int]] = []
+                for i in range(max(1, repeat)):
+                    started = time.perf_counter()
+                    got = search(party, queries, k)
+                    latency.append((time.perf_counter() - started) * 1000)
+                    if i == 0:
+                        ranked = got[:k]
+                by_key = {c.key: c for c in corpus}
+                recall.append(len(relevant & set(ranked)) / len(relevant))
+                covered = set().union(*(by_key[key].passages.get(topic["id"], set()) for key in ranked if key in by_key))
+                passage_recall.append(len(covered & passages) / len(passages))
+                first = next((i for i, key in enumerate(ranked, start=1) if key in relevant), None)
+                rr.append(1.0 / first if first else 0.0)
+        report[mode] = {
+            "pairs": len(recall),
+            f"recall@{k}": round(statistics.mean(recall), 4) if recall else 0.0,
+            f"passage_recall@{k}": round(statistics.mean(passage_recall), 4) if passage_recall else 0.0,
+            "mrr": round(statistics.mean(rr), 4) if rr else 0.0,
+            "p50_ms": round(_pct(latency, 0.50), 2),
+            "p95_ms": round(_pct(latency, 0.95), 2),
+        }
+    return report
+
+
+def _bigram_tsvector(text: str) -> dict[str, list[int]]:
+    """ja_bigram_tsvector と同じ語と位置（通し番号 + 区間番号。区間の間は位置が1つ空く）。"""
+    positions: dict[str, set[int]] = {}
+    n = 0
+    for seg_no, tokens in chunk_bm25.bigram_segments(text):
+        for token in tokens:
+            n += 1
+            positions.setdefault(token, set()).add(min(n + seg_no, 16383))
+    return {token: sorted(pos) for token, pos in positions.items()}
+
+
+def _term_positions(tsv: dict[str, list[int]], token: str) -> set[int]:
+    # 1文字の区間は前方一致（'字':*）
+    if len(token) == 1:
+        return {p for lexeme, pos in tsv.items() if lexeme.startswith(token) for p in pos}
+    return set(tsv.get(token, ()))
+
+
+def _bigram_match(tsv: dict[str, list[int]], phrases: list[list[str]], mode: str) -> bool:
+    """ja_bigram_tsquery(q, mode) との @@。all は区間ごとに bi-gram が隣接して並び（<->）、全区間が揃うこと。"""
+    if mode == "any":
+        return any(_term_positions(tsv, t) for phrase in phrases for t in phrase)
+    for phrase in phrases:
+        heads = _term_positions(tsv, phrase[0])
+        rest = [_term_positions(tsv, t) for t in phrase[1:]]
+        if not any(all(p + i in pos for i, pos in enumerate(rest, start=1)) for p in heads):
+            return False
+    return bool(phrases)
+
+
+def _rank_cd(tsv: dict[str, list[int]], phrases: list[list[str]], mode: str) -> float:
+    """ts_rank_cd（重みなし・正規化なし）の再現: 問い合わせを満たす最小の区間（cover）ごとに 0.1 / (1 + 間の語数) を足す。
+
+    cover の探し方は Postgres（tsrank.c の Cover）と同じ。区間の判定でも隣接（<->）は位置で確かめる。
+    """
+    slots = [(pi, ti) for pi, phrase in enumerate(phrases) for ti in range(len(phrase))]
+    at: dict[int, set[tuple[int, int]]] = {}
+    for slot in slots:
+        for p in _term_positions(tsv, phrases[slot[0]][slot[1]]):
+            at.setdefault(p, set()).add(slot)
+    entries = sorted(at.items())
+
+    def satisfied(lo: int, hi: int) -> bool:
+        window = {slot: set() for slot in slots}
+        for p, found in entries[lo : hi + 1]:
+            for slot in found:
+                window[slot].add(p)
+        if mode == "any":
+            return any(window.values())
+        return all(
+            any(all(p + ti in window[(pi, ti)] for ti in range(1, len(phrase))) for p in window[(pi, 0)])
+            for pi, phrase in enumerate(phrases)
+        )
+
+    rank = 0.0
+    start = 0
+    while start < len(entries):
+        end = next((j for j in range(start, len(entries)) if satisfied(start, j)), None)
+        if end is None:
+            break
+        begin = next(i for i in range(end, start - 1, -1) if satisfied(i, end))
+        noise = (entries[end][0] - entries[begin][0]) - (end - begin)
+        if noise < 0:
+            noise = (end - begin) // 2
+        rank += 0.1 / (1 + noise)
+        start = begin + 1
+    return rank
+
+
+def local_modes(corpus: list[EvalChunk], index_dir: Path) -> dict[str, SearchFn]:
+    """DB を使わない検索（ILIKE 相当の部分一致、bi-gram 全文検索の再現、BM25、ハッシュ埋め込みの総当たり、hybrid）。"""
+    by_id = {f"{c.url}#{c.chunk_index}": c for c in corpus}
+    embedder = HashingEmbedder()
+    vectors = dict(zip(by_id, embedder.embed([c.content for c in corpus])))
+    tsvectors = {cid: _bigram_tsvector(c.content) for cid, c in by_id.items()}
+    modes: dict[str, SearchFn] = {}
+
+    def ilike(party: str, queries: list[str], k: int) -> list[tuple[str, int]]:
+        out: list[tuple[str, int]] = []
+        for q in queries:
+            out.extend(c.key for c in corpus if c.party == party and q.lower() in c.content.lower() and c.key not in out)
+        return out[:k]
+
+    def bigram_ranked(party: str, q: str, k: int) -> list[tuple[str, float]]:
+        # policy_index._search_bigram と同じく all で引けなければ any（同順位はコーパス順）
+        phrases = [tokens for _, tokens in chunk_bm25.bigram_segments(" ".join(q.split()))]
+        for mode in ("all", "any"):
+            scored = [
+                (cid, _rank_cd(tsvectors[cid], phrases, mode))
+                for cid, c in by_id.items()
+                if c.party == party and _bigram_match(tsvectors[cid], phrases, mode)
+            ]
+            if scored:
+                return sorted(scored, key=lambda kv: kv[1], reverse=True)[:k]
+        return []
+
+    def bigram(party: str, queries: list[str], k: int) -> list[tuple[str, int]]:
+        # search_policy_chunks と同じくクエリごとに k 件取り、チャンクごとに最大の順位で並べ直す
+        best: dict[str, float] = {}
+        for q in queries:
+            for cid, score in bigram_ranked(party, q, k):
+                best[cid] = max(score, best.get(cid, score))
+        return [by_id[cid].key for cid, _ in sorted(best.items(), key=lambda kv: kv[1], reverse=True)][:k]
+
+    def vector_ranked(party: str, q: str, k: int) -> list[tuple[str, float]]:
+        qv = embedder.embed([q])[0]
+        scored = [(cid, sum(a * b for a, b in zip(qv, vectors[cid]))) for cid, c in by_id.items() if c.party == party]
+        return sorted(scored, key=lambda kv: kv[1], reverse=True)[:k]
+
+    def vector(party: str, queries: list[str], k: int) -> list[tuple[str, int]]:
+        # 順位はコサイン類似度（1 - コサイン距離）。bigram と同じくチャンクごとに最大の順位で並べ直す
+        best: dict[str, float] = {}
+        for q in queries:
+            for cid, score in vector_ranked(party, q, k):
+                best[cid] = max(score, best.get(cid, score))
+        return [by_id[cid].key for cid, _ in sorted(best.items(), key=lambda kv: kv[1], reverse=True)][:k]
+
+    @dataclass
+    class _Chunk:
+        chunk_id: str
+        doc_id: str
+        chunk_index: int
+        content: str
+
+    chunks = {cid: _Chunk(cid, c.url, c.chunk_index, c.content) for cid, c in by_id.items()}
+
+    def hybrid(party: str, queries: list[str], k: int) -> list[tuple[str, int]]:
+        # policy_index._search_hybrid と同じ: クエリごとに bi-gram とベクトルの順位を取り、RRF で融合して MMR で絞る
+        depth = max(k * 3, 10)
+        rankings = []
+        for q in queries:
+            rankings.append([chunks[cid] for cid, _ in bigram_ranked(party, q, depth)])
+            rankings.append([chunks[cid] for cid, _ in vector_ranked(party, q, depth)])
+        hits = policy_index.diversify_hits(
+            policy_index.reciprocal_rank_fusion(r for r in rankings if r),
+            max_total=k,
+            per_doc=max(1, int(settings.policy_search_max_chunks_per_doc)),
+            lam=float(settings.policy_search_mmr_lambda),
+        )
+        return [by_id[h.chunk.chunk_id].key for h in hits]
+
+    modes["ilike"] = ilike
+    modes["bigram"] = bigram
+    modes["vector"] = vector
+    modes["hybrid"] = hybrid
+    if not chunk_bm25.available():
+        print("numpy is not installed; skipping bm25", file=sys.stderr)
+        return modes
+
+    index = chunk_bm25.build_index(index_dir, [(cid, c.party, content_hash(c.content), c.content) for cid, c in by_id.items()])
+
+    def bm25(party: str, queries: list[str], k: int) -> list[tuple[str, int]]:
+        best: dict[str, float] = {}
+        for q in queries:
+            for cid, score in index.search(party, q, k):
+                best[cid] = max(score, best.get(cid, score))
+        return [by_id[cid].key for cid, _ in sorted(best.items(), key=lambda kv: kv[1], reverse=True)][:k]
+
+    modes["bm25"] = bm25
+    return modes
+
+
+def load_postgres(db, fixture: dict, corpus: list[EvalChunk]) -> dict[str, uuid.UUID]:
+    """コーパスを DB に入れる（呼び出し側で最後に rollback する）。チャンクにはハッシュ埋め込みを付ける。"""
+    from src.db import models
+
+    party_ids = {key: uuid.uuid4() for key in fixture["parties"]}
+    for key, p in fixture["parties"].items():
+        db.add(models.PartyRegistry(party_id=party_ids[key], name_ja=p["name_ja"], official_home_url=p.get("official_url")))
+    db.flush()
+    doc_ids: dict[str, uuid.UUID] = {}
+    texts: dict[str, str] = {}
+    for page in fixture["pages"]:
+        text = "\n\n".join(" ".join(p["text"].split()) for p in page["paragraphs"])
+        doc_ids[page["url"]] = uuid.uuid4()
+        texts[page["url"]] = text
+        db.add(
+            models.PolicyDocument(
+                doc_id=doc_ids[page["url"]],
+                party_id=party_ids[page["party"]],
+                url=page["url"],
+                doc_type="html",
+                title=page.get("title"),
+                content_text=text,
+                hash=content_hash(text),
+            )
+        )
+    db.flush()
+    embedder = HashingEmbedder()
+    for c, vec in zip(corpus, embedder.embed([c.content for c in corpus])):
+        # 本番と同じく本文への位置で持つ（本文の部分文字列でないチャンクは複製）
+        start = texts[c.url].find(c.content)
+        db.add(
+            models.PolicyChunk(
+                doc_id=doc_ids[c.url],
+                party_id=party_ids[c.party],
+                chunk_index=c.chunk_index,
+                **chunk_values(c.content, (start, start + len(c.content)) if start >= 0 else None),
+                content_hash=content_hash(c.content),
+                embedding=vec,
+                embedding_model=embedder.name,
+            )
+        )
+    db.flush()
+    return party_ids
+
+
+def postgres_modes(db, party_ids: dict[str, uuid.UUID]) -> dict[str, SearchFn]:
+    from sqlalchemy import select
+
+    from src.db import models
+
+    def via_index(mode: str) -> SearchFn:
+        def search(party: str, queries: list[str], k: int) -> list[tuple[str, int]]:
+            hits = policy_index.search_policy_chunks(
+                db, party_id=party_ids[party], queries=queries, per_query=k, max_total=k, mode=mode
+            )
+            return [(h.chunk.source_url, h.chunk.chunk_index) for h in hits]
+
+        return search
+
+    def ilike(party: str, queries: list[str], k: int) -> list[tuple[str, int]]:
+        # simple モードの第2段（ILIKE の全件走査）だけを測る
+        C = models.PolicyChunk
+        out: list[tuple[str, int]] = []
+        for q in queries:
+            for url, idx in db.execute(
+                select(C.source_url, C.chunk_index).where(C.party_id == party_ids[party], C.content.ilike(f"%{q}%")).limit(k)
+            ):
+                key = (url, idx)
+                if key not in out:
+                    out.append(key)
+        return out[:k]
+
+    modes: dict[str, SearchFn] = {"ilike": ilike}
+    if chunk_bm25.available():
+        # 検索側は索引を作らない（get_index は読むだけ）ので、読み込んだコーパスから一時ディレクトリに作る
+        chunk_bm25.refresh(db, rebuild=True)
+    else:
+        print("numpy is not installed; bm25 falls back to bigram", file=sys.stderr)
+    for mode in [*policy_index.SEARCH_MODES, policy_index.HYBRID_MODE]:
+        modes[mode] = via_index(mode)
+    return modes
+
+
+def _migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "migrations"))
+    command.upgrade(cfg, "head")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Evaluate policy chunk retrieval (recall@k, passage recall@k, MRR, p50/p95 latency) on a labelled fixture corpus. "
+            "--engine postgres loads the corpus into DATABASE_URL inside a transaction that is rolled back; "
+            "--engine local needs no database and reproduces the bigram (default mode), vector and hybrid rankings of postgres."
+        )
+    )
+    parser.add_argument("--engine", choices=["postgres", "local"], default="postgres")
+    parser.add_argument("--fixture", default=str(FIXTURE), help="Fixture corpus (default: scripts/fixtures/policy_search_eval.json)")
+    parser.add_argument("--mode", action="append", default=[], help="Only run these modes (repeatable)")
+    parser.add_argument("--k", type=int, default=3, help="Results per party/topic (default: 3)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per party/topic for latency (default: 5)")
+    # フィクスチャのページは実サイトより短いので、既定のチャンク長（推定トークン数）も本番より小さくしてある
+    parser.add_argument("--chunk-size", type=int, default=240)
+    parser.add_argument("--min-size", type=int, default=120)
+    parser.add_argument("--overlap", type=int, default=40)
+    parser.add_argument("--min-overlap", type=int, default=30, help="Chars a chunk must share with a labelled paragraph")
+    parser.add_argument("--migrate", action="store_true", help="Run alembic upgrade head first (throwaway database)")
+    parser.add_argument("--json-out", default=None, help="Write the report as JSON (use as a later --baseline)")
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help=f"Compare with a previous --json-out report (checked-in gate: {BASELINE.relative_to(ROOT)})",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed drop in recall/MRR before failing (default: 0.02)")
+    args = parser.parse_args()
+
+    fixture = json.loads(Path(args.fixture).read_text(encoding="utf-8"))
+    corpus = build_corpus(
+        fixture,
+        chunker=lambda t: chunk_text(t, chunk_size=args.chunk_size, min_size=args.min_size, overlap=args.overlap),
+        min_overlap=args.min_overlap,
+    )
+    print(f"fixture: {len(fixture['pages'])} pages, {len(corpus)} chunks, {len(fixture['topics'])} topics", file=sys.stderr)
+
+    # 評価はネットワーク不要にする（ベクトルはハッシュ埋め込み、BM25 索引は一時ディレクトリ）
+    settings.embedding_provider = "hashing"
+    with tempfile.TemporaryDirectory(prefix="policy_eval_bm25_") as tmp:
+        settings.bm25_index_dir = tmp
+        if args.engine == "local":
+            report = evaluate(fixture, corpus, _only(local_modes(corpus, Path(tmp)), args.mode), k=args.k, repeat=args.repeat)
+        else:
+            if args.migrate:
+                _migrate()
+            from src.db import SessionLocal
+
+            db = SessionLocal()
+            try:
+                party_ids = load_postgres(db, fixture, corpus)
+                report = evaluate(fixture, corpus, _only(postgres_modes(db, party_ids), args.mode), k=args.k, repeat=args.repeat)
+            finally:
+                db.rollback()
+                db.close()
+
+    k = args.k
+    print(f"{'mode':8s} {'pairs':>5s} {'recall@' + str(k):>9s} {'passage@' + str(k):>10s} {'mrr':>6s} {'p50ms':>7s} {'p95ms':>7s}")
+    for mode, r in report.items():
+        print(
+            f"{mode:8s} {r['pairs']:5d} {r[f'recall@{k}']:9.3f} {r[f'passage_recall@{k}']:10.3f} "
+            f"{r['mrr']:6.3f} {r['p50_ms']:7.2f} {r['p95_ms']:7.2f}"
+        )
+    payload = {"engine": args.engine, "k": k, "chunking": [args.chunk_size, args.min_size, args.overlap], "modes": report}
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        failed = regressions(report, base, k=k, tolerance=args.tolerance)
+        if failed:
+            print("REGRESSION\n  " + "\n  ".join(failed), file=sys.stderr)
+            sys.exit(1)
+        print("no regression against baseline", file=sys.stderr)
+
+
+def regressions(report: dict[str, dict], base: dict, *, k: int, tolerance: float) -> list[str]:
+    """基準レポート（--json-out の出力）より recall/MRR が tolerance を超えて下がった項目。"""
+    failed = []
+    for mode, r in report.items():
+        old = (base.get("modes") or {}).get(mode)
+        if not old:
+            continue
+        for metric in (f"recall@{k}", f"passage_recall@{k}", "mrr"):
+            if metric in old and r[metric] < old[metric] - tolerance:
+                failed.append(f"{mode} {metric}: {old[metric]:.3f} -> {r[metric]:.3f}")
+    return failed
+
+
+def _only(modes: dict[str, SearchFn], wanted: list[str]) -> dict[str, SearchFn]:
+    return {m: fn for m, fn in modes.items() if not wanted or m in wanted}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.db import SessionLocal
+from src.services import policy_reextract
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild policy documents and chunks from archived raw responses (no network access)."
+    )
+    parser.add_argument("--party-id", default=None, help="Only re-extract documents of this party")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Documents per commit (default: settings)")
+    parser.add_argument("--refresh-pdf", action="store_true", help="Ignore the PDF text cache and extract again")
+    args = parser.parse_args()
+
+    db: Session = SessionLocal()
+    try:
+        stats = policy_reextract.reextract_policy_documents(
+            db,
+            party_id=args.party_id,
+            workers=args.workers,
+            refresh_pdf=args.refresh_pdf,
+            batch_size=args.batch_size,
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(stats.__dict__, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
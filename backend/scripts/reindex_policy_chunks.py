@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+# Ensure project root (backend/) is on sys.path so that `src` can be imported when running as a script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.db import SessionLocal
+from src.services import policy_reindex
+from src.services.chunking import CHUNK_TOKENS, MIN_CHUNK_TOKENS, OVERLAP_TOKENS
+
+
+def _print_progress(p: policy_reindex.ReindexProgress) -> None:
+    print(
+        f"[{p.state}] docs {p.documents_done}/{p.documents_total} "
+        f"chunks={p.chunks_written} reused={p.chunks_reused} "
+        f"({p.docs_per_sec} docs/s, {p.chunks_per_sec} chunks/s, {p.elapsed_sec}s)",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-chunk every policy document and atomically swap in the new policy_chunks generation."
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Chunking processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Documents per commit (default: 200)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_TOKENS, help=f"Max estimated tokens per chunk (default: {CHUNK_TOKENS})")
+    parser.add_argument("--min-size", type=int, default=MIN_CHUNK_TOKENS, help=f"Min estimated tokens before a cut (default: {MIN_CHUNK_TOKENS})")
+    parser.add_argument("--overlap", type=int, default=OVERLAP_TOKENS, help=f"Max tokens of whole sentences repeated from the previous chunk (default: {OVERLAP_TOKENS})")
+    args = parser.parse_args()
+
+    db: Session = SessionLocal()
+    try:
+        result = policy_reindex.reindex_policy_chunks(
+            db,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            chunk_size=args.chunk_size,
+            min_size=args.min_size,
+            overlap=args.overlap,
+            on_progress=_print_progress,
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(result.as_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 import re
-from html.parser import HTMLParser
 from typing import Iterable, List
 from urllib.parse import urljoin, urlparse
 
 from .base import PartyDocs, PolicyDocument, ResolvedParty
+from .text_extract import parse_html
 
 
 class CrawlerAgent:
@@ -21,26 +21,8 @@ class CrawlerAgent:
         return any(domain.endswith(ad) for ad in allowed_domains if ad)
 
     def _extract_links(self, html: str, base_url: str) -> List[str]:
-        class LinkParser(HTMLParser):
-            def __init__(self):
-                super().__init__()
-                self.links: List[str] = []
-
-            def handle_starttag(self, tag, attrs):
-                if tag != "a":
-                    return
-                href = None
-                for k, v in attrs:
-                    if k == "href":
-                        href = v
-                        break
-                if href:
-                    self.links.append(href)
-
-        parser = LinkParser()
-        parser.feed(html)
         links = []
-        for href in parser.links:
+        for href in parse_html(html).anchors:
             url = href if href.startswith("http") else urljoin(base_url, href)
             links.append(url)
         # uniq while preserving order
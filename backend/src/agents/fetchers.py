@@ -1,10 +1,106 @@
 from __future__ import annotations
 
+import io
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from typing import IO
+
 import httpx
 
 from ..settings import settings
 
 
+# 先頭バイトでの種別判定（Content-Typeが欠落/誤っている場合の補助）
+_BINARY_MAGIC = (
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+    b"GIF8",
+    b"PK\x03\x04",
+    b"\x1f\x8b",
+    b"RIFF",
+    b"ID3",
+    b"OggS",
+    b"\x1a\x45\xdf\xa3",
+)
+
+
+def classify_content(content_type: str, url: str, head: bytes = b"") -> str:
+    """レスポンスを html|pdf|markdown|text|other に分類する。"""
+    ct = (content_type or "").lower()
+    path = (url or "").lower().split("?", 1)[0]
+    if head.startswith(b"%PDF-") or "application/pdf" in ct:
+        return "pdf"
+    if path.endswith(".pdf") and (not ct or "octet-stream" in ct):
+        return "pdf"
+    if "text/markdown" in ct or path.endswith((".md", ".md/")):
+        return "markdown"
+    if "text/html" in ct or "application/xhtml" in ct:
+        return "html"
+    if "text/plain" in ct:
+        return "text"
+    if head.startswith(_BINARY_MAGIC) or (len(head) >= 12 and head[4:8] == b"ftyp"):
+        return "other"
+    sniff = head[:512].lstrip().lower()
+    if sniff.startswith((b"<!doctype html", b"<html", b"<head", b"<body")):
+        return "html"
+    if path.endswith("/") and not ct.startswith(("image/", "video/", "audio/")):
+        return "html"
+    return "other"
+
+
+def _max_bytes_for(kind: str) -> int:
+    if kind == "pdf":
+        return int(settings.fetch_max_bytes_pdf)
+    if kind in {"html", "markdown", "text"}:
+        return int(settings.fetch_max_bytes_html)
+    return 0
+
+
+@dataclass
+class FetchResult:
+    """ストリーミング取得の結果。大きい本文は一時ファイルに退避される。"""
+
+    url: str
+    status: int
+    headers: httpx.Headers
+    content_type: str = ""
+    encoding: str | None = None
+    kind: str = "other"
+    size: int = 0
+    skipped_reason: str | None = None
+    _data: bytes = b""
+    _spool: IO[bytes] | None = field(default=None, repr=False)
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 400 and self.skipped_reason is None
+
+    def open(self) -> IO[bytes]:
+        if self._spool is not None:
+            self._spool.seek(0)
+            return self._spool
+        return io.BytesIO(self._data)
+
+    def read_bytes(self) -> bytes:
+        if self._spool is not None:
+            self._spool.seek(0)
+            return self._spool.read()
+        return self._data
+
+    def text(self) -> str:
+        return self.read_bytes().decode(self.encoding or "utf-8", errors="ignore")
+
+    def save_to(self, path) -> None:
+        with open(path, "wb") as f:
+            shutil.copyfileobj(self.open(), f)
+
+    def close(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
 class HttpxFetcher:
     """実際にHTTP GETでページを取得するフェッチャ。"""
 
@@ -20,6 +116,100 @@ class HttpxFetcher:
         )
 
     def fetch(self, url: str, *, timeout: int | None = None) -> str:
-        resp = self.client.get(url, timeout=timeout or self.client.timeout)
-        resp.raise_for_status()
-        return resp.text
+        with self.client.stream("GET", url, timeout=timeout or self.client.timeout) as resp:
+            resp.raise_for_status()
+            data = _read_capped(resp, int(settings.fetch_max_bytes_html))
+            return data.decode(resp.encoding or "utf-8", errors="ignore")
+
+    def fetch_stream(
+        self,
+        url: str,
+        *,
+        kinds: set[str] | None = None,
+        timeout: int | None = None,
+        error_body_bytes: int = 8000,
+        max_bytes: int | None = None,
+        truncate: bool = False,
+    ) -> FetchResult:
+        """本文を読む前にヘッダ/先頭バイトで種別とサイズを判定し、種別ごとの上限を超える場合は打ち切る。
+
+        kinds に含まれない種別は本文を読まずに skipped_reason="unsupported_type" で返す。
+        max_bytes を渡すと種別ごとの上限の代わりに使う。truncate=True なら上限を超えた分は捨てて先頭だけを返す
+        （robots.txt のように先頭だけ読めばよいもの）。
+        """
+        accepted = kinds or {"html", "pdf", "markdown", "text"}
+        with self.client.stream("GET", url, timeout=timeout or self.client.timeout) as resp:
+            status = int(resp.status_code or 0)
+            content_type = (resp.headers.get("content-type") or "").lower()
+            result = FetchResult(
+                url=str(resp.url),
+                status=status,
+                headers=resp.headers,
+                content_type=content_type,
+                encoding=resp.encoding,
+            )
+            if status < 200 or status >= 400:
+                result._data = _read_capped(resp, error_body_bytes, truncate=True)
+                result.size = len(result._data)
+                return result
+
+            chunks = resp.iter_bytes()
+            head = b""
+            for part in chunks:
+                head += part
+                if len(head) >= 1024:
+                    break
+            result.kind = classify_content(content_type, result.url, head)
+            if result.kind not in accepted:
+                result.skipped_reason = "unsupported_type"
+                return result
+            limit = int(max_bytes) if max_bytes is not None else _max_bytes_for(result.kind)
+            declared = resp.headers.get("content-length")
+            if not truncate and declared and declared.isdigit() and limit and int(declared) > limit:
+                result.skipped_reason = "too_large"
+                result.size = int(declared)
+                return result
+
+            spool: IO[bytes] = tempfile.SpooledTemporaryFile(max_size=int(settings.fetch_spool_threshold_bytes))
+            size = 0
+            try:
+                for part in _chain(head, chunks):
+                    size += len(part)
+                    if limit and size > limit and truncate:
+                        spool.write(part[: len(part) - (size - limit)])
+                        size = limit
+                        break
+                    if limit and size > limit:
+                        result.skipped_reason = "too_large"
+                        result.size = size
+                        spool.close()
+                        return result
+                    spool.write(part)
+            except Exception:
+                spool.close()
+                raise
+            result.size = size
+            if size <= int(settings.fetch_spool_threshold_bytes):
+                spool.seek(0)
+                result._data = spool.read()
+                spool.close()
+            else:
+                result._spool = spool
+            return result
+
+
+def _chain(head: bytes, rest):
+    if head:
+        yield head
+    yield from rest
+
+
+def _read_capped(resp: httpx.Response, limit: int, *, truncate: bool = False) -> bytes:
+    buf = bytearray()
+    for part in resp.iter_bytes():
+        buf.extend(part)
+        if limit and len(buf) > limit:
+            if truncate:
+                return bytes(buf[:limit])
+            raise ValueError(f"response too large (> {limit} bytes)")
+    return bytes(buf)
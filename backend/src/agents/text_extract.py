@@ -1,38 +1,309 @@
 from __future__ import annotations
 
+import html as html_lib
 import re
-from html.parser import HTMLParser
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Mapping
 
+from ..settings import settings
+
+
+# 本文/スクリプト中に埋まったURL（markdownリンクやJSON内のURL）
+_MD_LINK_RE = re.compile(r"\[[^\]]+\]\(([^)\s]+)\)")
+_BARE_URL_RE = re.compile(r"https?://[^\s)\"'<>\\]+")
+
+# 本文に含めない要素（中身はマークアップとして解釈しない）。スクリプト/スタイル/noscript/テンプレートに加え、
+# フォームの入力値（textarea）や iframe 等の代替表示も本文ではない
+_SKIP_TAGS = ("script", "style", "noscript", "template", "textarea", "iframe", "noembed", "noframes", "xmp")
+_TAG_ATTRS = r"(?:[^>\"']|\"[^\"]*\"|'[^']*')*"
+_SKIP_ELEMENT = rf"<({'|'.join(_SKIP_TAGS)})\b{_TAG_ATTRS}>(.*?)(?:</\1\s*>|$)"
+
+
+@dataclass
+class ParsedHtml:
+    """HTMLを1回のパースで分解した結果。"""
+
+    text: str = ""
+    title: str = ""
+    canonical: str | None = None
+    # href 属性（出現順）。アンカーテキストは <a> のみ
+    links: list[str] = field(default_factory=list)
+    anchors: dict[str, str] = field(default_factory=dict)
+    embedded_links: list[str] = field(default_factory=list)
+
+
+class _PageBuilder:
+    """パーサのイベント（開始/終了タグ・テキスト）から ParsedHtml を組み立てる。各バックエンドで共通。"""
 
-class _TextExtractor(HTMLParser):
     def __init__(self):
-        super().__init__()
         self._parts: list[str] = []
-        self._skip_depth = 0
+        self._title: list[str] | None = None
+        self._anchor_href: str | None = None
+        self._anchor_text: list[str] = []
+        self.result = ParsedHtml()
+
+    def start(self, tag: str, attrs: Mapping[str, str] | None) -> None:
+        if tag == "title" and not self.result.title:
+            self._title = []
+        if not attrs:
+            return
+        href = (attrs.get("href") or "").strip()
+        if not href:
+            return
+        self.result.links.append(href)
+        if tag == "a":
+            self._flush_anchor()
+            self._anchor_href = href
+            self._anchor_text = []
+        elif tag == "link" and self.result.canonical is None and "canonical" in (attrs.get("rel") or "").lower().split():
+            self.result.canonical = href
 
-    def handle_starttag(self, tag, attrs):
-        if tag in {"script", "style", "noscript"}:
-            self._skip_depth += 1
+    def end(self, tag: str) -> None:
+        if tag == "title" and self._title is not None:
+            self.result.title = " ".join(" ".join(self._title).split())[:300]
+            self._title = None
+        elif tag == "a":
+            self._flush_anchor()
 
-    def handle_endtag(self, tag):
-        if tag in {"script", "style", "noscript"} and self._skip_depth > 0:
-            self._skip_depth -= 1
+    def embedded(self, data: str) -> None:
+        if "http" in data or "](" in data:
+            self.result.embedded_links.extend(markdown_links(data))
 
-    def handle_data(self, data):
-        if self._skip_depth > 0:
-            return
+    def data(self, data: str, *, unescape: bool = False) -> None:
+        self.embedded(data)
         t = data.strip()
-        if t:
-            self._parts.append(t)
+        if not t:
+            return
+        if unescape and "&" in t:
+            t = html_lib.unescape(t).strip()
+            if not t:
+                return
+        self._parts.append(t)
+        if self._title is not None:
+            self._title.append(t)
+        if self._anchor_href is not None:
+            self._anchor_text.append(t)
+
+    def _flush_anchor(self) -> None:
+        if self._anchor_href is None:
+            return
+        text = " ".join(" ".join(self._anchor_text).split())
+        self.result.anchors.setdefault(self._anchor_href, text[:200])
+        self._anchor_href = None
+
+    def finish(self) -> ParsedHtml:
+        self._flush_anchor()
+        text = "\n".join(self._parts)
+        text = re.sub(r"[ \t]+", " ", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        self.result.text = text.strip()
+        return self.result
+
+
+# 1回の走査でコメント/script等/title/タグを拾い、タグ間をテキストとして扱う（HTMLParserより大幅に速い）。
+# title の中身はブラウザ同様にタグを解釈しない
+_TOKEN_RE = re.compile(
+    r"<!--.*?(?:-->|$)"
+    rf"|{_SKIP_ELEMENT}"
+    rf"|<title\b{_TAG_ATTRS}>(.*?)(?:</title\s*>|$)"
+    rf"|<(/?)([a-zA-Z][\w:-]*)({_TAG_ATTRS})>"
+    r"|<[!?][^>]*>",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+# 木構造パーサに渡す前に除くもの（コメントと _SKIP_TAGS の要素）。パーサごとの解釈の違い
+# （head 内の noscript、textarea/iframe の中身、template の扱い等）を無くし、stdlib 実装と同じ結果にする
+_SKIP_RE = re.compile(rf"<!--.*?(?:-->|$)|{_SKIP_ELEMENT}", flags=re.IGNORECASE | re.DOTALL)
+# 除いた箇所の前後のテキストを別ノードに保つための空要素（meta は head/body のどちらでも挿入モードを変えない）
+_SKIP_PLACEHOLDER = "<meta>"
+_ATTR_RE = re.compile(r"([a-zA-Z_:][\w:.-]*)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>]+))")
+
+
+def _attrs(raw: str) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for m in _ATTR_RE.finditer(raw):
+        name = m.group(1).lower()
+        if name not in out:
+            value = m.group(2) if m.group(2) is not None else (m.group(3) if m.group(3) is not None else m.group(4))
+            out[name] = html_lib.unescape(value) if "&" in value else value
+    return out
+
+
+def _parse_stdlib(html: str) -> ParsedHtml:
+    b = _PageBuilder()
+    pos = 0
+    for m in _TOKEN_RE.finditer(html):
+        if m.start() > pos:
+            b.data(html[pos : m.start()], unescape=True)
+        pos = m.end()
+        if m.group(1) is not None:
+            # script/style/noscript 等は本文に含めないが、埋め込みURLは拾う
+            b.embedded(m.group(2))
+        elif m.group(3) is not None:
+            b.start("title", None)
+            b.data(m.group(3), unescape=True)
+            b.end("title")
+        elif m.group(5) is not None:
+            tag = m.group(5).lower()
+            if m.group(4):
+                b.end(tag)
+            else:
+                raw = m.group(6)
+                # 属性の解析は href を持つタグだけ
+                b.start(tag, _attrs(raw) if "href" in raw.lower() else None)
+    if pos < len(html):
+        b.data(html[pos:], unescape=True)
+    return b.finish()
+
+
+def _remove_skipped(html: str) -> tuple[str, list[str]]:
+    """コメントと本文に含めない要素を除いたHTMLと、除いた要素の中身（埋め込みURLを拾う用）を返す。"""
+    skipped: list[str] = []
+
+    def _repl(m: re.Match[str]) -> str:
+        if m.group(1) is not None:
+            skipped.append(m.group(2))
+        return _SKIP_PLACEHOLDER
+
+    return _SKIP_RE.sub(_repl, html), skipped
+
+
+def _finish_tree(
+    *,
+    texts: Iterable[str],
+    title: str,
+    hrefs: Iterable[tuple[str, str, str, Callable[[], str]]],
+    skipped: Iterable[str],
+) -> ParsedHtml:
+    """木構造パーサ向け: C実装側で集めた要素から ParsedHtml を組み立てる（Python側で全ノードを辿らない）。"""
+    b = _PageBuilder()
+    for data in skipped:
+        b.embedded(data)
+    for t in texts:
+        b.data(t)
+    result = b.finish()
+    result.title = " ".join(title.split())[:300]
+    for tag, href, rel, anchor_text in hrefs:
+        href = href.strip()
+        if not href:
+            continue
+        result.links.append(href)
+        if tag == "a":
+            result.anchors.setdefault(href, " ".join(anchor_text().split())[:200])
+        elif tag == "link" and result.canonical is None and "canonical" in rel.lower().split():
+            result.canonical = href
+    return result
+
+
+def _parse_lxml(html: str) -> ParsedHtml:
+    from lxml import etree  # type: ignore
+    from lxml import html as lxml_html  # type: ignore
+
+    html, skipped = _remove_skipped(html)
+    root = lxml_html.document_fromstring(html)
+    etree.strip_elements(root, etree.ProcessingInstruction, with_tail=False)
+    title = root.find(".//title")
+    hrefs = [
+        (el.tag, el.get("href") or "", el.get("rel") or "", lambda el=el: " ".join(el.itertext()))
+        for el in root.xpath("//*[@href]")
+    ]
+    return _finish_tree(
+        texts=root.itertext(),
+        title=title.text_content() if title is not None else "",
+        hrefs=hrefs,
+        skipped=skipped,
+    )
+
+
+def _parse_selectolax(html: str) -> ParsedHtml:
+    from selectolax.lexbor import LexborHTMLParser  # type: ignore
+
+    html, skipped = _remove_skipped(html)
+    tree = LexborHTMLParser(html)
+    title = tree.css_first("title")
+    hrefs = [
+        (node.tag, node.attributes.get("href") or "", node.attributes.get("rel") or "", lambda n=node: n.text(deep=True, separator=" "))
+        for node in tree.css("[href]")
+    ]
+    root = tree.root
+    return _finish_tree(
+        texts=(node.text_content or "" for node in root.traverse(include_text=True) if node.tag == "-text") if root is not None else (),
+        title=title.text(deep=True) if title is not None else "",
+        hrefs=hrefs,
+        skipped=skipped,
+    )
+
+
+HTML_BACKENDS: dict[str, Callable[[str], ParsedHtml]] = {
+    "stdlib": _parse_stdlib,
+    "lxml": _parse_lxml,
+    "selectolax": _parse_selectolax,
+}
+# auto で使うバックエンド（scripts/bench_html_extract.py で stdlib より速く、tests/test_text_extract_equivalence.py で
+# 結果が一致するもの。lxml は一致するが速度差がほぼ無いため明示指定時のみ）
+_AUTO_ORDER = ("selectolax",)
+
+_MODULES = {"lxml": "lxml.html", "selectolax": "selectolax.lexbor"}
+_resolved: dict[str, str] = {}
+
+
+def available_backends() -> list[str]:
+    """インストール済みで使えるバックエンド名（stdlib は常に含む）。"""
+    names = ["stdlib"]
+    for name, module in _MODULES.items():
+        try:
+            __import__(module)
+        except Exception:
+            continue
+        names.append(name)
+    return names
+
+
+def resolve_backend(name: str | None = None) -> str:
+    requested = (name or settings.html_parser_backend or "auto").lower()
+    if requested in _resolved:
+        return _resolved[requested]
+    available = available_backends()
+    if requested == "auto":
+        backend = next((b for b in _AUTO_ORDER if b in available), "stdlib")
+    else:
+        backend = requested if requested in available else "stdlib"
+    _resolved[requested] = backend
+    return backend
+
+
+def markdown_links(text: str) -> list[str]:
+    links: list[str] = []
+    for m in _MD_LINK_RE.finditer(text or ""):
+        links.append(m.group(1))
+    for m in _BARE_URL_RE.finditer(text or ""):
+        links.append(m.group(0))
+    return links
+
+
+def markdown_to_text(text: str) -> str:
+    t = re.sub(r"```.*?```", "", text or "", flags=re.DOTALL)
+    t = re.sub(r"`[^`]+`", "", t)
+    t = re.sub(r"\[(.*?)\]\((.*?)\)", r"\1", t)
+    t = re.sub(r"#+\s*", "", t)
+    t = re.sub(r"\s{2,}", " ", t)
+    return t.strip()
+
+
+def parse_html(html: str, *, backend: str | None = None) -> ParsedHtml:
+    """本文テキスト・リンク（アンカーテキスト付き）・title・canonical を1パスで取り出す。
 
-    def text(self) -> str:
-        return "\n".join(self._parts)
+    backend 未指定時は settings.html_parser_backend（auto なら selectolax が入っていればそれを使う）。
+    外部パーサが失敗した場合は stdlib 実装にフォールバックする。
+    """
+    html = html or ""
+    name = resolve_backend(backend)
+    if name != "stdlib" and html.strip():
+        try:
+            return HTML_BACKENDS[name](html)
+        except Exception:
+            pass
+    return _parse_stdlib(html)
 
 
-def html_to_text(html: str) -> str:
-    parser = _TextExtractor()
-    parser.feed(html)
-    text = parser.text()
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+def html_to_text(html: str, *, backend: str | None = None) -> str:
+    return parse_html(html, backend=backend).text
@@ -1,7 +1,7 @@
 import re
 import uuid
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
@@ -34,9 +34,12 @@ from ..services import party_registry
 from ..services import party_registry_auto
 from ..services import policy_sources
 from ..services import policy_crawler
+from ..services import policy_reindex
+from ..services import chunk_embedding
 from ..services import scoring_runs
 from ..services import snapshot_export
 from ..services import research_import
+from ..services import topic_chunks
 from ..settings import settings
 from ..services import topic_rubrics
 from ..agents import rubric_generator
@@ -122,19 +125,26 @@ def get_policy_sources(party_id: str, db: Session = Depends(get_db)) -> PolicySo
     sources = policy_sources.list_sources(db, party_id)
     return PolicySourceList(
         party_id=party.party_id,
-        sources=[{"base_url": s.base_url, "status": s.status} for s in sources],
+        sources=[{"base_url": s.base_url, "status": s.status, "deny_patterns": list(s.deny_patterns or [])} for s in sources],
     )
 
 
 @router.put("/parties/{party_id}/policy-sources", response_model=PolicySourceList, dependencies=[Depends(require_api_key)])
 def put_policy_sources(party_id: str, payload: PolicySourceUpdate, db: Session = Depends(get_db)) -> PolicySourceList:
+    base_urls = list(payload.base_urls)
+    deny_patterns = None
+    if payload.sources is not None:
+        base_urls = [s.base_url for s in payload.sources]
+        deny_patterns = {s.base_url: list(s.deny_patterns) for s in payload.sources}
     try:
-        sources = policy_sources.replace_sources(db, party_id, payload.base_urls)
-    except ValueError:
-        raise HTTPException(status_code=404, detail="party not found")
+        sources = policy_sources.replace_sources(db, party_id, base_urls, deny_patterns=deny_patterns)
+    except ValueError as e:
+        if str(e) == "party not found":
+            raise HTTPException(status_code=404, detail="party not found")
+        raise HTTPException(status_code=400, detail=str(e))
     return PolicySourceList(
         party_id=party_id,
-        sources=[{"base_url": s.base_url, "status": s.status} for s in sources],
+        sources=[{"base_url": s.base_url, "status": s.status, "deny_patterns": list(s.deny_patterns or [])} for s in sources],
     )
 
 
@@ -189,6 +199,73 @@ def import_research_pack_endpoint(payload: dict, db: Session = Depends(get_db))
         raise HTTPException(status_code=400, detail=str(e))
     return {"stats": stats.__dict__, "errors": errors}
 
+@router.post("/policy-chunks/reindex", response_model=AdminJobResponse, dependencies=[Depends(require_api_key)])
+def reindex_policy_chunks_endpoint(
+    background_tasks: BackgroundTasks,
+    workers: int | None = None,
+    batch_size: int = 200,
+) -> AdminJobResponse:
+    """全政策文書のチャンクを作り直す（完成後に policy_chunks を差し替える）。進捗は GET で確認する。"""
+    if not policy_reindex.claim_job():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="reindex job already running")
+    background_tasks.add_task(
+        policy_reindex.run_job,
+        workers=max(1, min(int(workers), 32)) if workers else None,
+        batch_size=max(10, min(int(batch_size), 2000)),
+    )
+    return AdminJobResponse(status="queued", detail="policy chunk reindex started")
+
+
+@router.get("/policy-chunks/reindex", dependencies=[Depends(require_api_key)])
+def reindex_policy_chunks_status() -> dict:
+    return policy_reindex.job_status()
+
+
+@router.post("/policy-chunks/embed", response_model=AdminJobResponse, dependencies=[Depends(require_api_key)])
+def embed_policy_chunks_endpoint(
+    background_tasks: BackgroundTasks,
+    batch_size: int | None = None,
+    limit: int | None = None,
+) -> AdminJobResponse:
+    """ベクトルが無いチャンクを埋め込む（embedding_provider の埋め込み器）。進捗は GET で確認する。"""
+    if not chunk_embedding.claim_job():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="embedding job already running")
+    background_tasks.add_task(
+        chunk_embedding.run_job,
+        batch_size=max(1, min(int(batch_size), 1000)) if batch_size else None,
+        limit=max(1, int(limit)) if limit else None,
+    )
+    return AdminJobResponse(status="queued", detail="policy chunk embedding started")
+
+
+@router.get("/policy-chunks/embed", dependencies=[Depends(require_api_key)])
+def embed_policy_chunks_status() -> dict:
+    return chunk_embedding.job_status()
+
+
+@router.post("/topic-chunks/refresh", dependencies=[Depends(require_api_key)])
+def refresh_topic_chunks_endpoint(
+    topic_id: str | None = None,
+    party_id: uuid.UUID | None = None,
+    db: Session = Depends(get_db),
+) -> dict:
+    """有効なトピック × 政党の上位チャンク（topic_party_chunks）のうち、古くなったものだけ作り直す。"""
+    stats = topic_chunks.refresh_topic_chunks(
+        db,
+        topic_ids=[topic_id] if topic_id else None,
+        party_ids=[party_id] if party_id else None,
+    )
+    return stats.__dict__
+
+
+@router.get("/topics/{topic_id}/index-chunks", dependencies=[Depends(require_api_key)])
+def list_topic_index_chunks(topic_id: str, party_id: uuid.UUID | None = None, db: Session = Depends(get_db)) -> list[dict]:
+    """保存済みの (トピック, 政党) ごとの上位チャンク（根拠の閲覧用）。stale=true の行は次の検索で作り直される。"""
+    if not topic_rubrics.get_topic(db, topic_id):
+        raise HTTPException(status_code=404, detail="topic not found")
+    return topic_chunks.list_topic_chunks(db, topic_id, party_id=party_id)
+
+
 @router.post("/dev/purge", response_model=AdminPurgeResponse, dependencies=[Depends(require_api_key)])
 def admin_purge_endpoint(req: AdminPurgeRequest, db: Session = Depends(get_db)) -> AdminPurgeResponse:
     if settings.admin_api_key is None:
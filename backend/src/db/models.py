@@ -1,13 +1,49 @@
 from enum import Enum
 
 import sqlalchemy as sa
-from sqlalchemy import Computed, Column, Enum as PgEnum, ForeignKey, Numeric, Text, text
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TIMESTAMP, UUID
+from sqlalchemy import Computed, Column, Enum as PgEnum, ForeignKey, Numeric, Text, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TIMESTAMP, TSVECTOR, UUID
+from sqlalchemy.orm import column_property, deferred
 from sqlalchemy.types import LargeBinary
 
 from . import Base
 
 
+class Vector(sa.types.UserDefinedType):
+    """pgvector の vector(dim) 型。Python 側は float のリストで扱う（pgvector の Python パッケージは使わない）。"""
+
+    cache_ok = True
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def get_col_spec(self, **kw) -> str:
+        return f"vector({self.dim})"
+
+    def bind_expression(self, bindvalue):
+        return sa.cast(bindvalue, self)
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            return "[" + ",".join(repr(float(v)) for v in value) + "]"
+
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None or isinstance(value, list):
+                return value
+            return [float(v) for v in str(value).strip("[]").split(",") if v]
+
+        return process
+
+
+# policy_chunks.embedding の次元（マイグレーション 20261019070000 と合わせる）
+EMBEDDING_DIM = 256
+
+
 class PartyStatus(str, Enum):
     candidate = "candidate"
     verified = "verified"
@@ -88,6 +124,8 @@ class PartyRegistry(Base):
         Text,
         Computed("lower(regexp_replace(name_ja, '\\\\s+', '', 'g'))", persisted=True),
     )
+    # 政策チャンクが変わるたびに増やす（topic_party_chunks の古い行の判定に使う）
+    index_generation = Column(sa.BigInteger, nullable=False, server_default=text("0"))
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
     updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
 
@@ -99,6 +137,8 @@ class PartyPolicySource(Base):
     party_id = Column(UUID(as_uuid=True), ForeignKey("party_registry.party_id", ondelete="CASCADE"), nullable=False)
     base_url = Column(Text, nullable=False)
     status = Column(Text, nullable=False, server_default=text("'active'"))
+    deny_patterns = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"))  # クロール除外URLの正規表現
+    repo_commit_sha = Column(Text)  # GitHub リポジトリ由来のサイトで最後に取り込んだコミット（同じなら再クロールしない）
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
     updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
 
@@ -114,6 +154,12 @@ class PolicyDocument(Base):
     content_text = Column(Text)
     fetched_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
     hash = Column(Text)
+    # ほぼ同一文書の検出用（SimHash と LSH バンド）。duplicate_of がある文書はチャンク化しない
+    simhash = Column(sa.BigInteger)
+    simhash_bands = Column(ARRAY(sa.Integer))
+    duplicate_of = Column(UUID(as_uuid=True), ForeignKey("policy_documents.doc_id", ondelete="SET NULL"))
+    # 取得時の生の本文（source_snapshots.content_hash）。抽出/チャンク化を変えたときに再取得せず作り直すため
+    raw_hash = Column(Text)
 
 
 class PolicyChunk(Base):
@@ -123,9 +169,35 @@ class PolicyChunk(Base):
     doc_id = Column(UUID(as_uuid=True), ForeignKey("policy_documents.doc_id", ondelete="CASCADE"), nullable=False)
     party_id = Column(UUID(as_uuid=True), ForeignKey("party_registry.party_id", ondelete="CASCADE"), nullable=False)
     chunk_index = Column(sa.Integer, nullable=False)
-    content = Column(Text, nullable=False)
-    embedding = Column(Text)  # placeholder (pgvector導入時に型変更)
+    # 本文は文書の content_text への位置 [start_offset, end_offset)（文字単位）で持つ。
+    # 文書の本文の部分文字列にならないチャンク（移行前に作られた行など）だけ本文を複製して content 列に持つ
+    content_copy = Column("content", Text)
+    start_offset = Column(sa.Integer)
+    end_offset = Column(sa.Integer)
+    content_hash = Column(Text)  # sha256(content)。再クロール時に変わらないチャンクを chunk_id ごと残すため
+    # 埋め込みベクトル（政党で絞った行をコサイン距離で全件比較して検索）と、それを作った埋め込み器の名前（embeddings.Embedder.name）
+    # 埋め込みは検索の並べ替えにだけ使うので遅延ロード
+    embedding = deferred(Column(Vector(EMBEDDING_DIM)))
+    embedding_model = Column(Text)
     meta = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    # 日本語 bi-gram の検索用ベクトル。(party_id, content_tsv) の GIN 索引で検索し、順位付けもこの列で行う。
+    # 本文が別の表にあるので生成列にはできず、トリガー（policy_chunks_fill_tsv）で書き込む。通常の読み込みでは不要なので遅延ロード
+    content_tsv = deferred(Column(TSVECTOR, info={"derived": True}))
+
+    # チャンクの本文・URL・タイトル（読み取り専用。書き込みは content_copy/start_offset/end_offset と meta に行う）
+    content = column_property(func.policy_chunk_body(content_copy, doc_id, start_offset, end_offset))
+    source_url = column_property(
+        func.coalesce(
+            meta.op("->>")("source_url"),
+            select(PolicyDocument.url).where(PolicyDocument.doc_id == doc_id).scalar_subquery(),
+        )
+    )
+    title = column_property(
+        func.coalesce(
+            meta.op("->>")("title"),
+            select(PolicyDocument.title).where(PolicyDocument.doc_id == doc_id).scalar_subquery(),
+        )
+    )
 
 
 class PartyDiscoveryEvent(Base):
@@ -184,6 +256,36 @@ class ScoreRun(Base):
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
 
 
+class TopicPartyChunks(Base):
+    """(トピック, 政党) ごとの検索上位チャンク（スコアリングの索引検索を毎回やり直さないための実体化）。"""
+
+    __tablename__ = "topic_party_chunks"
+
+    topic_id = Column(Text, ForeignKey("topics.topic_id", ondelete="CASCADE"), primary_key=True)
+    party_id = Column(UUID(as_uuid=True), ForeignKey("party_registry.party_id", ondelete="CASCADE"), primary_key=True)
+    # 計算時の party_registry.index_generation（現在の値と違えば古い）
+    index_generation = Column(sa.BigInteger, nullable=False)
+    # クエリ（トピック名+サブキーワード）と検索条件のハッシュ（変われば古い）
+    query_key = Column(Text, nullable=False)
+    # policy_chunks は再チャンク化で差し替えるので外部キーは張らない
+    chunk_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default=text("'{}'::uuid[]"))
+    ranks = Column(ARRAY(sa.Float), nullable=False, server_default=text("'{}'::double precision[]"))
+    computed_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
+
+
+class BoilerplateLines(Base):
+    """ホストごとに学習したサイト共通行（次回のクロールで標本が少ないときに使う）。"""
+
+    __tablename__ = "boilerplate_models"
+
+    # www. を除いた小文字のホスト名
+    host = Column(Text, primary_key=True)
+    lines = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"))
+    # 学習に使ったページ数
+    pages = Column(sa.Integer, nullable=False, server_default=text("0"))
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
+
+
 class TopicScore(Base):
     __tablename__ = "topic_scores"
 
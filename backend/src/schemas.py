@@ -129,6 +129,7 @@ class PartyUpdate(BaseModel):
 class PolicySourceItem(BaseModel):
     base_url: str
     status: str = "active"
+    deny_patterns: List[str] = Field(default_factory=list, description="クロール対象外にするURLの正規表現")
 
 
 class PolicySourceList(BaseModel):
@@ -138,6 +139,10 @@ class PolicySourceList(BaseModel):
 
 class PolicySourceUpdate(BaseModel):
     base_urls: List[str] = Field(default_factory=list)
+    sources: Optional[List[PolicySourceItem]] = Field(
+        default=None,
+        description="指定時は base_urls の代わりに使用（URLごとの deny_patterns を設定できる）",
+    )
 
 
 class PartyRegistryDiscoverRequest(BaseModel):
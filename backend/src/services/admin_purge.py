@@ -35,6 +35,7 @@ def purge(db: Session, *, targets: Iterable[Target], dry_run: bool = False) -> P
     if "policy" in normalized:
         statements.extend(
             [
+                ("topic_party_chunks", "DELETE FROM topic_party_chunks"),
                 ("policy_chunks", "DELETE FROM policy_chunks"),
                 ("policy_documents", "DELETE FROM policy_documents"),
             ]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..db import models
+
+
+def _norm_line(line: str) -> str:
+    return " ".join((line or "").split())
+
+
+def host_key(url: str) -> str:
+    """モデルを分ける単位（www. の有無は同じホストとみなす）。"""
+    return (urlparse(url).netloc or "").lower().removeprefix("www.")
+
+
+@dataclass
+class BoilerplateModel:
+    """1ホスト分のページ本文から、多くのページに繰り返し出る行（メニュー/フッター/サイドバー）を学習する。
+
+    今回のページ数が min_pages に届かないときは、前回学習した行（learned）で除去する。
+    """
+
+    min_pages: int = 3
+    min_ratio: float = 0.5
+    pages: int = 0
+    line_pages: Counter = field(default_factory=Counter)
+    learned: frozenset[str] = frozenset()
+    _boilerplate: set[str] | None = field(default=None, repr=False)
+
+    def add(self, text: str) -> None:
+        lines = {_norm_line(line) for line in (text or "").splitlines()}
+        lines.discard("")
+        self.line_pages.update(lines)
+        self.pages += 1
+        self._boilerplate = None
+
+    def boilerplate_lines(self) -> set[str]:
+        if self._boilerplate is None:
+            if self.pages < self.min_pages:
+                self._boilerplate = set(self.learned)
+            else:
+                threshold = max(self.min_pages, self.pages * self.min_ratio)
+                self._boilerplate = {line for line, n in self.line_pages.items() if n >= threshold}
+        return self._boilerplate
+
+    def strip(self, text: str) -> tuple[str, int]:
+        """繰り返し行を除いた本文と、除いた行数を返す。"""
+        boilerplate = self.boilerplate_lines()
+        if not boilerplate:
+            return text, 0
+        kept: list[str] = []
+        removed = 0
+        for line in (text or "").splitlines():
+            if _norm_line(line) in boilerplate:
+                removed += 1
+                continue
+            kept.append(line)
+        return "\n".join(kept).strip(), removed
+
+
+@dataclass
+class BoilerplateStripper:
+    """クロール中にホストごとの BoilerplateModel を育てる。"""
+
+    min_pages: int = 3
+    min_ratio: float = 0.5
+    models: dict[str, BoilerplateModel] = field(default_factory=dict)
+
+    def model_for(self, url: str) -> BoilerplateModel:
+        host = host_key(url)
+        model = self.models.get(host)
+        if model is None:
+            model = BoilerplateModel(min_pages=self.min_pages, min_ratio=self.min_ratio)
+            self.models[host] = model
+        return model
+
+    @property
+    def trained(self) -> dict[str, BoilerplateModel]:
+        """今回のページだけで学習できたホストのモデル。"""
+        return {host: m for host, m in self.models.items() if m.pages >= m.min_pages}
+
+    def summary(self) -> dict[str, dict[str, int]]:
+        return {
+            host: {"pages": m.pages, "boilerplate_lines": len(m.boilerplate_lines()), "learned_fallback": int(m.pages < m.min_pages)}
+            for host, m in self.models.items()
+        }
+
+
+def load_learned_lines(db: Session, stripper: BoilerplateStripper) -> int:
+    """前回までに学習した共通行を読み込む（今回の標本が少ないホストで使う）。読み込んだホスト数を返す。"""
+    n = 0
+    for host, lines in db.execute(select(models.BoilerplateLines.host, models.BoilerplateLines.lines)).all():
+        model = stripper.models.get(host)
+        if model is None:
+            model = BoilerplateModel(min_pages=stripper.min_pages, min_ratio=stripper.min_ratio)
+            stripper.models[host] = model
+        model.learned = frozenset(str(line) for line in (lines or []))
+        model._boilerplate = None
+        n += 1
+    return n
+
+
+def save_learned_lines(db: Session, stripper: BoilerplateStripper) -> int:
+    """今回学習できたホストの共通行を保存する（commit は呼び出し側）。保存したホスト数を返す。"""
+    rows = [
+        {"host": host, "lines": sorted(m.boilerplate_lines()), "pages": m.pages}
+        for host, m in stripper.trained.items()
+        if host
+    ]
+    if not rows:
+        return 0
+    T = models.BoilerplateLines
+    stmt = pg_insert(T).values(rows)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[T.host],
+            set_={"lines": stmt.excluded.lines, "pages": stmt.excluded.pages, "updated_at": func.now()},
+        )
+    )
+    return len(rows)
@@ -0,0 +1,427 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..settings import settings
+
+
+# プロセス内で政策チャンクを BM25 で検索する索引（policy_search_mode=bm25 のとき使う）。
+# 索引はセグメント（転置リストを NumPy 配列で保存したディレクトリ）の並びで、memory-map で読む。
+# チャンクが変わると差分だけ新しいセグメントに足し、古い行は削除済みとして扱う。
+#
+# 更新は scripts/build_bm25_index.py（--watch で定期実行）が行い、検索側は読むだけ。
+# 更新のたびに世代ディレクトリ（gen_*）を丸ごと作ってから rename で公開し、CURRENT の中身（世代名）を
+# os.replace で差し替える。引き継ぐセグメントはハードリンクなので、古い世代を消しても新しい世代は壊れず、
+# 読み込み済みの memory-map も読める。古い世代は _KEEP_GENERATIONS 個と _GC_GRACE_SEC 秒の猶予を残して消す。
+K1 = 1.2
+B = 0.75
+_FORMAT = 2
+_POINTER = "CURRENT"
+_KEEP_GENERATIONS = 2
+_GC_GRACE_SEC = 600.0
+# ja_bigram_tokens（SQL）の区切り文字（NFKC 後）。ロケールに依存しないようコードポイントで明示する。
+# migrations/versions/20261019120000_ja_bigram_explicit_separators.py の SEPARATORS と同じ
+_SEPARATORS = (
+    r"[\x09-\x0d\x20-\x2f\x3a-\x40\x5b-\x60\x7b-\x7e\u00a0-\u00bf\u00d7\u00f7\u2000-\u206f\u2190-\u27bf"
+    r"\u2985\u2986\u3000-\u3004\u3008-\u3020\u3030\u303d\u30fb]+"
+)
+_SPLIT_RE = re.compile(_SEPARATORS)
+# 差分セグメントがこの数を超えるか、削除済みの行がこの割合を超えたら全体を作り直す
+_MAX_SEGMENTS = 8
+_MAX_DELETED_RATIO = 0.2
+_FETCH_BATCH = 500
+
+
+def available() -> bool:
+    try:
+        import numpy  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def index_dir() -> Path:
+    if settings.bm25_index_dir:
+        return Path(settings.bm25_index_dir)
+    return Path(__file__).resolve().parents[2] / "cache" / "bm25"
+
+
+def bigram_tokens(text: str) -> list[str]:
+    """ja_bigram_tokens（SQL）と同じ分け方: NFKC・小文字化し、空白/記号で区切った区間ごとに文字 bi-gram にする。"""
+    out: list[str] = []
+    for seg in _SPLIT_RE.split(unicodedata.normalize("NFKC", text or "").lower()):
+        if not seg:
+            continue
+        if len(seg) == 1:
+            out.append(seg)
+            continue
+        out.extend(seg[i : i + 2] for i in range(len(seg) - 1))
+    return out
+
+
+def bigram_segments(text: str) -> list[tuple[int, list[str]]]:
+    """区間ごとの bi-gram を (区間番号, トークン) で返す。区間番号は ja_bigram_tokens の seg_no と同じ（空の区間も数える）。"""
+    out: list[tuple[int, list[str]]] = []
+    for seg_no, seg in enumerate(_SPLIT_RE.split(unicodedata.normalize("NFKC", text or "").lower()), start=1):
+        if seg:
+            out.append((seg_no, [seg] if len(seg) == 1 else [seg[i : i + 2] for i in range(len(seg) - 1)]))
+    return out
+
+
+def _write_segment(gen_dir: Path, rows: Sequence[tuple[str, str, str, str]]) -> str:
+    """(chunk_id, party_id, 指紋, 本文) から世代ディレクトリ内にセグメントを作り、その名前を返す。"""
+    import numpy as np  # type: ignore
+
+    vocab: dict[str, int] = {}
+    parties: dict[str, int] = {}
+    term_col: list[int] = []
+    doc_col: list[int] = []
+    tf_col: list[int] = []
+    doc_len = np.zeros(len(rows), dtype=np.int32)
+    doc_party = np.zeros(len(rows), dtype=np.int32)
+    for d, (_, party_id, _, content) in enumerate(rows):
+        counts = Counter(bigram_tokens(content))
+        doc_len[d] = sum(counts.values())
+        doc_party[d] = parties.setdefault(party_id, len(parties))
+        for tok, tf in counts.items():
+            term_col.append(vocab.setdefault(tok, len(vocab)))
+            doc_col.append(d)
+            tf_col.append(tf)
+
+    terms = np.asarray(term_col, dtype=np.int32)
+    # 語ごとに並べ替える（安定ソートなので各語の転置リストは文書番号順になる）
+    order = np.argsort(terms, kind="stable")
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=len(vocab)), out=offsets[1:])
+
+    name = f"seg_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    tmp = gen_dir / f"{name}.tmp"
+    tmp.mkdir(parents=True, exist_ok=True)
+    np.save(tmp / "offsets.npy", offsets)
+    np.save(tmp / "docs.npy", np.asarray(doc_col, dtype=np.int32)[order])
+    np.save(tmp / "tfs.npy", np.asarray(tf_col, dtype=np.int32)[order])
+    np.save(tmp / "doc_len.npy", doc_len)
+    np.save(tmp / "doc_party.npy", doc_party)
+    (tmp / "terms.json").write_text(json.dumps(list(vocab), ensure_ascii=False), encoding="utf-8")
+    (tmp / "chunks.json").write_text(
+        json.dumps(
+            {
+                "chunk_ids": [r[0] for r in rows],
+                "fingerprints": [r[2] for r in rows],
+                "parties": list(parties),
+            }
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp, gen_dir / name)
+    return name
+
+
+def _link_segment(src: Path, dst: Path) -> None:
+    """前の世代のセグメントを新しい世代にハードリンクで引き継ぐ（リンクできないファイルシステムではコピー）。"""
+    dst.mkdir(parents=True)
+    for f in src.iterdir():
+        try:
+            os.link(f, dst / f.name)
+        except OSError:
+            shutil.copy2(f, dst / f.name)
+
+
+class _Segment:
+    def __init__(self, path: Path, deleted: Iterable[str]):
+        import numpy as np  # type: ignore
+
+        self.name = path.name
+        self.term_ids = {t: i for i, t in enumerate(json.loads((path / "terms.json").read_text(encoding="utf-8")))}
+        info = json.loads((path / "chunks.json").read_text(encoding="utf-8"))
+        self.chunk_ids: list[str] = info["chunk_ids"]
+        self.fingerprints: list[str] = info["fingerprints"]
+        self.party_index = {p: i for i, p in enumerate(info["parties"])}
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.docs = np.load(path / "docs.npy", mmap_mode="r")
+        self.tfs = np.load(path / "tfs.npy", mmap_mode="r")
+        self.doc_len = np.load(path / "doc_len.npy", mmap_mode="r")
+        self.doc_party = np.load(path / "doc_party.npy", mmap_mode="r")
+        dead = set(deleted)
+        self.live = np.fromiter((cid not in dead for cid in self.chunk_ids), dtype=bool, count=len(self.chunk_ids))
+
+    def df(self, token: str) -> int:
+        tid = self.term_ids.get(token)
+        return 0 if tid is None else int(self.offsets[tid + 1] - self.offsets[tid])
+
+
+class Bm25Index:
+    """読み込んだ索引。文書数・平均長・df は全セグメントの合計（df は削除済みの行を含む近似）。"""
+
+    def __init__(self, gen_dir: Path, meta: dict[str, Any]):
+        self.root = gen_dir
+        self.meta = meta
+        deleted = meta.get("deleted") or {}
+        self.segments = [_Segment(gen_dir / name, deleted.get(name, [])) for name in meta.get("segments") or []]
+        self.n_docs = sum(int(s.live.sum()) for s in self.segments)
+        total_len = sum(int(s.doc_len[s.live].sum()) for s in self.segments)
+        self.avgdl = total_len / self.n_docs if self.n_docs else 0.0
+
+    def live_fingerprints(self) -> dict[str, tuple[str, str]]:
+        """chunk_id → (セグメント名, 指紋)。"""
+        out: dict[str, tuple[str, str]] = {}
+        for seg in self.segments:
+            for cid, fp, alive in zip(seg.chunk_ids, seg.fingerprints, seg.live):
+                if alive:
+                    out[cid] = (seg.name, fp)
+        return out
+
+    def search(self, party_id, q: str, limit: int) -> list[tuple[str, float]]:
+        import numpy as np  # type: ignore
+
+        tokens = list(dict.fromkeys(bigram_tokens(q)))
+        if not tokens or not self.n_docs:
+            return []
+        idf: dict[str, float] = {}
+        for tok in tokens:
+            df = sum(seg.df(tok) for seg in self.segments)
+            if df:
+                idf[tok] = math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+        party = str(party_id)
+        results: list[tuple[str, float]] = []
+        for seg in self.segments:
+            pidx = seg.party_index.get(party)
+            if pidx is None:
+                continue
+            docs_parts = []
+            weight_parts = []
+            for tok, w in idf.items():
+                tid = seg.term_ids.get(tok)
+                if tid is None:
+                    continue
+                lo, hi = int(seg.offsets[tid]), int(seg.offsets[tid + 1])
+                docs = seg.docs[lo:hi]
+                tf = seg.tfs[lo:hi].astype(np.float32)
+                dl = seg.doc_len[docs].astype(np.float32)
+                docs_parts.append(docs)
+                weight_parts.append(w * tf * (K1 + 1.0) / (tf + K1 * (1.0 - B + B * dl / self.avgdl)))
+            if not docs_parts:
+                continue
+            scores = np.bincount(np.concatenate(docs_parts), weights=np.concatenate(weight_parts), minlength=len(seg.chunk_ids))
+            hit = np.flatnonzero((scores > 0) & seg.live & (seg.doc_party == pidx))
+            top = hit[np.argsort(-scores[hit], kind="stable")[: max(1, int(limit))]]
+            results.extend((seg.chunk_ids[i], float(scores[i])) for i in top)
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results[: max(1, int(limit))]
+
+
+@dataclass
+class Bm25RefreshStats:
+    chunks: int = 0
+    added: int = 0
+    removed: int = 0
+    segments: int = 0
+    rebuilt: bool = False
+    elapsed_sec: float = 0.0
+
+
+def _new_generation_name() -> str:
+    return f"gen_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def _read_meta(gen_dir: Path) -> dict[str, Any] | None:
+    try:
+        meta = json.loads((gen_dir / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == _FORMAT else None
+
+
+def _write_meta(gen_dir: Path, meta: dict[str, Any]) -> None:
+    (gen_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+def _current_generation(root: Path) -> str | None:
+    try:
+        name = (root / _POINTER).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return name or None
+
+
+@contextmanager
+def _writer_lock(root: Path):
+    """更新は1つずつ（プロセス内はスレッドロック、プロセス間はファイルロック）。"""
+    root.mkdir(parents=True, exist_ok=True)
+    with _write_lock, open(root / ".lock", "a+") as f:
+        try:
+            import fcntl
+        except ImportError:  # Windows ではプロセス間の排他をしない
+            fcntl = None  # type: ignore[assignment]
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _publish(root: Path, tmp: Path, meta: dict[str, Any]) -> Bm25Index:
+    """組み立て終えた世代を rename で公開し、CURRENT を差し替える。_writer_lock の中で呼ぶ。"""
+    _write_meta(tmp, meta)
+    name = tmp.name.removesuffix(".tmp")
+    os.replace(tmp, root / name)
+    pointer = root / f"{_POINTER}.tmp"
+    pointer.write_text(name, encoding="utf-8")
+    os.replace(pointer, root / _POINTER)
+    _collect_garbage(root, current=name)
+    return Bm25Index(root / name, meta)
+
+
+def _collect_garbage(root: Path, *, current: str) -> None:
+    """古い世代と作りかけの残骸を消す。直近の世代と猶予時間内のものは読み込み中かもしれないので残す。"""
+    now = time.time()
+    generations: list[tuple[float, Path]] = []
+    for path in root.iterdir():
+        if path.is_dir() and path.name.startswith("gen_") and path.name != current:
+            try:
+                generations.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+    generations.sort(reverse=True)
+    for mtime, path in generations[_KEEP_GENERATIONS - 1 :]:
+        if now - mtime >= _GC_GRACE_SEC:
+            shutil.rmtree(path, ignore_errors=True)
+    # 旧形式（root 直下の meta.json とセグメント）
+    for path in root.iterdir():
+        if path.name.startswith("seg_") and path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+    (root / "meta.json").unlink(missing_ok=True)
+
+
+def build_index(root: Path, rows: Sequence[tuple[str, str, str, str]]) -> Bm25Index:
+    """(chunk_id, party_id, 指紋, 本文) から1セグメントの索引を root の新しい世代として作って読み込む（DB を使わない）。"""
+    with _writer_lock(root):
+        tmp = root / f"{_new_generation_name()}.tmp"
+        tmp.mkdir(parents=True)
+        try:
+            segments = [_write_segment(tmp, rows)] if rows else []
+            return _publish(root, tmp, {"format": _FORMAT, "segments": segments, "deleted": {}})
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+
+def _current_state(db: Session) -> dict[str, tuple[str, str]]:
+    """検索対象のチャンク: chunk_id → (party_id, 指紋)。非推奨（meta.deprecated）は含めない。"""
+    C = models.PolicyChunk
+    deprecated = func.coalesce(C.meta.op("->>")("deprecated"), "false") == "true"
+    fingerprint = func.coalesce(C.content_hash, func.md5(C.content))
+    rows = db.execute(select(C.chunk_id, C.party_id, fingerprint.label("fp"), deprecated.label("deprecated")))
+    return {str(r.chunk_id): (str(r.party_id), f"{r.fp}:{r.party_id}") for r in rows if not r.deprecated}
+
+
+def _fetch_rows(db: Session, state: dict[str, tuple[str, str]], chunk_ids: Sequence[str]) -> list[tuple[str, str, str, str]]:
+    C = models.PolicyChunk
+    rows: list[tuple[str, str, str, str]] = []
+    for i in range(0, len(chunk_ids), _FETCH_BATCH):
+        for r in db.execute(select(C.chunk_id, C.content).where(C.chunk_id.in_(chunk_ids[i : i + _FETCH_BATCH]))):
+            cid = str(r.chunk_id)
+            party_id, fp = state[cid]
+            rows.append((cid, party_id, fp, r.content or ""))
+    return rows
+
+
+_write_lock = threading.Lock()
+_load_lock = threading.Lock()
+_loaded: Bm25Index | None = None
+_loaded_generation: str | None = None
+
+
+def refresh(db: Session, *, rebuild: bool = False) -> Bm25RefreshStats:
+    """policy_chunks との差分を新しい世代として公開する（rebuild=True なら全体を作り直す）。
+
+    検索側からは呼ばない（scripts/build_bm25_index.py から呼ぶ）。変更が無ければ世代を作らない。
+    """
+    started = time.perf_counter()
+    stats = Bm25RefreshStats()
+    root = index_dir()
+    with _writer_lock(root):
+        state = _current_state(db)
+        stats.chunks = len(state)
+        current_name = _current_generation(root)
+        meta = None if rebuild or current_name is None else _read_meta(root / current_name)
+        segments: list[str] = list((meta or {}).get("segments") or [])
+        deleted: dict[str, list[str]] = dict((meta or {}).get("deleted") or {})
+        tmp = root / f"{_new_generation_name()}.tmp"
+        try:
+            if meta is not None:
+                current = Bm25Index(root / current_name, meta)
+                known = current.live_fingerprints()
+                removed = [(seg, cid) for cid, (seg, fp) in known.items() if state.get(cid, (None, None))[1] != fp]
+                added = [cid for cid, (_, fp) in state.items() if known.get(cid, (None, None))[1] != fp]
+                rows_total = sum(len(seg.chunk_ids) for seg in current.segments)
+                dead = sum(len(v) for v in deleted.values()) + len(removed)
+                if len(segments) >= _MAX_SEGMENTS or dead > _MAX_DELETED_RATIO * max(1, rows_total + len(added)):
+                    meta = None
+                elif added or removed:
+                    tmp.mkdir(parents=True)
+                    for seg in segments:
+                        _link_segment(root / current_name / seg, tmp / seg)
+                    for seg, cid in removed:
+                        deleted.setdefault(seg, []).append(cid)
+                    if added:
+                        segments.append(_write_segment(tmp, _fetch_rows(db, state, added)))
+                    _publish(root, tmp, {"format": _FORMAT, "segments": segments, "deleted": deleted})
+                    stats.added = len(added)
+                    stats.removed = len(removed)
+            if meta is None:
+                tmp.mkdir(parents=True, exist_ok=True)
+                rows = _fetch_rows(db, state, list(state))
+                segments = [_write_segment(tmp, rows)] if rows else []
+                _publish(root, tmp, {"format": _FORMAT, "segments": segments, "deleted": {}})
+                stats.added = len(state)
+                stats.rebuilt = True
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        stats.segments = len(segments)
+    stats.elapsed_sec = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def get_index() -> Bm25Index | None:
+    """検索用の索引を返す（読むだけ）。CURRENT が別の世代を指していれば読み直す。
+
+    索引が無ければ None（scripts/build_bm25_index.py で作る）。
+    """
+    global _loaded, _loaded_generation
+    if not available():
+        return None
+    root = index_dir()
+    name = _current_generation(root)
+    if name is None:
+        return None
+    if name == _loaded_generation and _loaded is not None:
+        return _loaded
+    with _load_lock:
+        if name != _loaded_generation or _loaded is None:
+            meta = _read_meta(root / name)
+            if meta is None:
+                return None
+            _loaded = Bm25Index(root / name, meta)
+            _loaded_generation = name
+        return _loaded
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal, models
+from ..settings import settings
+from .embeddings import Embedder, get_embedder
+from .policy_index import HYBRID_MODE
+from .topic_chunks import bump_index_generation
+
+
+@dataclass
+class EmbedProgress:
+    state: str = "idle"  # idle|running|done|error
+    model: str | None = None
+    chunks_total: int = 0
+    chunks_done: int = 0
+    chunks_failed: int = 0
+    batches: int = 0
+    elapsed_sec: float = 0.0
+    error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return round(self.chunks_done / self.elapsed_sec, 1) if self.elapsed_sec > 0 else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**self.__dict__, "chunks_per_sec": self.chunks_per_sec}
+
+
+def _missing(embedder: Embedder):
+    C = models.PolicyChunk
+    return or_(C.embedding.is_(None), C.embedding_model.is_distinct_from(embedder.name))
+
+
+def embed_policy_chunks(
+    db: Session,
+    *,
+    embedder: Embedder | None = None,
+    batch_size: int | None = None,
+    limit: int | None = None,
+    progress: EmbedProgress | None = None,
+    on_progress: Callable[[EmbedProgress], None] | None = None,
+) -> EmbedProgress:
+    """ベクトルが無い（または別の埋め込み器で作った）チャンクを batch_size 件ずつ埋め込み、バッチごとに commit する。
+
+    chunk_id 順に進むので、失敗したバッチは飛ばして次に進む（次回の実行で再試行される）。
+    """
+    emb = embedder or get_embedder()
+    size = max(1, int(batch_size or settings.embedding_batch_size))
+    p = progress or EmbedProgress()
+    p.state = "running"
+    p.model = emb.name
+    started = time.perf_counter()
+    C = models.PolicyChunk
+
+    def report() -> None:
+        p.elapsed_sec = round(time.perf_counter() - started, 2)
+        if on_progress is not None:
+            on_progress(p)
+
+    try:
+        p.chunks_total = int(db.scalar(select(func.count()).select_from(C).where(_missing(emb))) or 0)
+        if limit is not None:
+            p.chunks_total = min(p.chunks_total, int(limit))
+        db.commit()
+        report()
+        last = None
+        while p.chunks_done + p.chunks_failed < p.chunks_total:
+            q = select(C.chunk_id, C.party_id, C.content).where(_missing(emb))
+            if last is not None:
+                q = q.where(C.chunk_id > last)
+            rows = db.execute(q.order_by(C.chunk_id).limit(min(size, p.chunks_total - p.chunks_done - p.chunks_failed))).all()
+            db.commit()
+            if not rows:
+                break
+            last = rows[-1].chunk_id
+            try:
+                vectors = emb.embed([r.content or "" for r in rows])
+            except Exception as e:
+                p.chunks_failed += len(rows)
+                p.error = f"{type(e).__name__}: {e}"
+                report()
+                continue
+            db.execute(
+                update(C),
+                [{"chunk_id": r.chunk_id, "embedding": v, "embedding_model": emb.name} for r, v in zip(rows, vectors)],
+            )
+            if (settings.policy_search_mode or "").lower() in {"vector", HYBRID_MODE}:
+                # ベクトルを使う検索方式では、埋め込みが増えると topic_party_chunks の結果も変わる
+                bump_index_generation(db, {r.party_id for r in rows})
+            db.commit()
+            p.chunks_done += len(rows)
+            p.batches += 1
+            report()
+        p.state = "done"
+    except Exception as e:
+        db.rollback()
+        p.state = "error"
+        p.error = f"{type(e).__name__}: {e}"
+        report()
+        raise
+    report()
+    return p
+
+
+# 管理APIから起動するジョブ（プロセス内で同時に1つだけ）
+_job_lock = threading.Lock()
+_job = EmbedProgress()
+
+
+def job_status() -> dict[str, Any]:
+    return _job.as_dict()
+
+
+def claim_job() -> bool:
+    """ジョブを開始できれば True（実行中なら False）。"""
+    global _job
+    with _job_lock:
+        if _job.running:
+            return False
+        _job = EmbedProgress(state="running")
+        return True
+
+
+def run_job(**kwargs: Any) -> None:
+    """claim_job() の後にバックグラウンドで呼ぶ。進捗は job_status() で見る。"""
+    db = SessionLocal()
+    try:
+        embed_policy_chunks(db, progress=_job, **kwargs)
+    except Exception:
+        pass  # エラー内容は job_status() に残る
+    finally:
+        db.close()
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db import models
+from .topic_chunks import bump_index_generation
+
+
+# 既定のチャンク長（推定トークン数）。重なりは文単位で、この値以下の末尾の文だけを次のチャンクの先頭に付ける
+CHUNK_TOKENS = 512
+MIN_CHUNK_TOKENS = 256
+OVERLAP_TOKENS = 64
+
+# 文末（句点/感嘆符/疑問符、英文のピリオド+空白）で区切る
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？!?])|(?<=\.\s)")
+# 日本語の文字（かな/漢字/全角記号）はおおむね1文字1トークン、それ以外は空白区切りの語を4文字1トークンで見積もる
+_CJK_RE = re.compile(r"[\u3000-\u30ff\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+# 見出し: Markdown の #、記号（■◆●▼【 等）、「第1章」「1.」「(1)」「一、」などの番号で始まる短い行
+_HEADING_RE = re.compile(
+    r"^(?:#{1,6}\s|[■□◆◇●○▼▽▶►◎★☆【]|第[0-9０-９一二三四五六七八九十百]+[章節部条項編]"
+    r"|[0-9０-９]{1,2}[.．、)）]\s*\S|[(（][0-9０-９一二三四五六七八九十]{1,2}[)）]|[一二三四五六七八九十]{1,2}[、．.])"
+)
+_HEADING_MAX_CHARS = 60
+_SOFT_BREAK_RE = re.compile(r"[、，,;；:： ]")
+
+
+def estimate_tokens(text: str) -> int:
+    """LLM のトークン数の見積もり（トークナイザに依存しない概算）。"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + sum(-(-len(w) // 4) for w in _CJK_RE.sub(" ", text).split())
+
+
+def _is_heading(line: str, *, lone: bool) -> bool:
+    if len(line) > _HEADING_MAX_CHARS or line.endswith(("。", "、", "，", ",")):
+        return False
+    # 前後が空行の短い1行も見出しとみなす（文末記号で終わる行は本文）
+    return bool(_HEADING_RE.match(line)) or (lone and not line.endswith(("！", "？", "!", "?", ".")))
+
+
+def _split_long(sentence: str, max_tokens: int) -> list[str]:
+    """句点の無い長文（表/PDFの崩れ等）を読点や空白の位置で max_tokens 以下に割る。"""
+    out: list[str] = []
+    while estimate_tokens(sentence) > max_tokens:
+        n = max(1, len(sentence) * max_tokens // estimate_tokens(sentence))
+        while n > 1 and estimate_tokens(sentence[:n]) > max_tokens:
+            n = n * 9 // 10
+        soft = max((m.end() for m in _SOFT_BREAK_RE.finditer(sentence, 0, n)), default=0)
+        cut = soft if soft > n // 2 else n
+        out.append(sentence[:cut])
+        sentence = sentence[cut:]
+    if sentence:
+        out.append(sentence)
+    return out
+
+
+@dataclass
+class _Piece:
+    # 元の本文での位置 [start, end)（前後の空白は含めない）
+    start: int
+    end: int
+    tokens: int
+    heading: bool = False
+    # 区切り判定のハッシュに使う文（空白を詰めたもの。改行位置が変わっても区切りは動かない）
+    key: str = ""
+
+
+def _trimmed(text: str, start: int, end: int) -> tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _pieces(text: str, max_tokens: int) -> list[_Piece]:
+    """本文を見出しと文に分ける。空行/見出しまでの行は1つの段落として文に割る（位置は元の本文のまま）。"""
+    lines: list[tuple[int, int]] = []
+    pos = 0
+    for line in (text or "").splitlines(keepends=True):
+        lines.append(_trimmed(text, pos, pos + len(line)))
+        pos += len(line)
+    pieces: list[_Piece] = []
+    body: list[tuple[int, int]] = []
+
+    def flush_body() -> None:
+        if not body:
+            return
+        p_start, p_end = body[0][0], body[-1][1]
+        body.clear()
+        bounds = [p_start, *(p_start + m.start() for m in _SENTENCE_END_RE.finditer(text[p_start:p_end])), p_end]
+        for a, b in zip(bounds, bounds[1:]):
+            s_start, s_end = _trimmed(text, a, b)
+            if s_start >= s_end:
+                continue
+            for part in _split_long(text[s_start:s_end], max_tokens):
+                start, end = _trimmed(text, s_start, s_start + len(part))
+                s_start += len(part)
+                if start < end:
+                    chunk = text[start:end]
+                    pieces.append(_Piece(start, end, estimate_tokens(chunk), key=" ".join(chunk.split())))
+
+    for i, (start, end) in enumerate(lines):
+        if start >= end:
+            flush_body()
+            continue
+        line = " ".join(text[start:end].split())
+        lone = (i == 0 or lines[i - 1][0] >= lines[i - 1][1]) and (i + 1 == len(lines) or lines[i + 1][0] >= lines[i + 1][1])
+        if _is_heading(line, lone=lone):
+            flush_body()
+            pieces.append(_Piece(start, end, estimate_tokens(line), heading=True, key=line))
+        else:
+            body.append((start, end))
+    flush_body()
+    return pieces
+
+
+def _is_cut(sentence: str, divisor: int) -> bool:
+    return zlib.crc32(sentence.encode("utf-8")) % divisor == 0
+
+
+def chunk_spans(
+    text: str,
+    *,
+    chunk_size: int = CHUNK_TOKENS,
+    min_size: int = MIN_CHUNK_TOKENS,
+    overlap: int = OVERLAP_TOKENS,
+    cut_divisor: int = 3,
+) -> list[tuple[int, int]]:
+    """本文を検索用チャンクに分け、各チャンクの本文中の位置 [start, end) を返す（長さは推定トークン数。
+    内容で区切り位置を決める content-defined chunking）。
+
+    区切りは文末のうち「min_size 以上たまっていて、その文のハッシュが条件を満たす」位置か、
+    上限を超える直前。見出しの前では min_size の半分以上たまっていれば必ず区切る（見出しで終わるチャンクは作らない）。
+    区切りが位置ではなく内容で決まるため、文書の一部を直しても変更箇所の前後以外のチャンクは
+    同じ内容のまま残り、sync_chunks で再利用できる。
+    前のチャンクとの重なりは文単位で、末尾の overlap トークン以内の文だけを付ける（見出しから始まるチャンクには付けない）。
+    チャンクは本文の連続した部分なので、policy_chunks には位置だけを保存できる。
+    """
+    # 重なり分を足しても chunk_size に収まるよう本体の上限を決める
+    body_max = max(min_size, chunk_size - overlap)
+    raw: list[list[_Piece]] = []
+    cur: list[_Piece] = []
+    cur_tokens = 0
+    for piece in _pieces(text, body_max):
+        if cur and (
+            cur_tokens + piece.tokens > body_max or (piece.heading and cur_tokens >= min_size // 2)
+        ):
+            raw.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(piece)
+        cur_tokens += piece.tokens
+        if not piece.heading and cur_tokens >= min_size and _is_cut(piece.key, cut_divisor):
+            raw.append(cur)
+            cur, cur_tokens = [], 0
+    if cur:
+        raw.append(cur)
+
+    spans: list[tuple[int, int]] = []
+    for i, body in enumerate(raw):
+        start = body[0].start
+        if i > 0 and overlap > 0 and not body[0].heading:
+            budget = overlap
+            for piece in reversed(raw[i - 1]):
+                if piece.heading or piece.tokens > budget:
+                    break
+                start = piece.start
+                budget -= piece.tokens
+        spans.append((start, body[-1].end))
+    return spans
+
+
+def chunk_text(
+    text: str,
+    *,
+    chunk_size: int = CHUNK_TOKENS,
+    min_size: int = MIN_CHUNK_TOKENS,
+    overlap: int = OVERLAP_TOKENS,
+    cut_divisor: int = 3,
+) -> list[str]:
+    """chunk_spans の各チャンクの本文（元の本文の部分文字列）。"""
+    spans = chunk_spans(text, chunk_size=chunk_size, min_size=min_size, overlap=overlap, cut_divisor=cut_divisor)
+    return [text[start:end] for start, end in spans]
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChunkSyncStats:
+    inserted: int = 0
+    updated: int = 0
+    kept: int = 0
+    deleted: int = 0
+
+
+@dataclass
+class ExistingChunk:
+    chunk_id: Any
+    chunk_index: int
+    content_hash: str | None
+    meta: dict[str, Any] | None
+    party_id: Any
+    # 文書の本文への位置（本文を複製して持つ行は None）
+    start_offset: int | None = None
+    end_offset: int | None = None
+
+
+Span = tuple[int, int]
+
+
+@dataclass
+class ChunkPlan:
+    """既存チャンクと新しいチャンク列の差分。span が None のチャンクは本文を複製して持つ。"""
+
+    # (index, content, hash, meta, span)
+    inserts: list[tuple[int, str, str, dict[str, Any], Span | None]] = field(default_factory=list)
+    # (chunk_id, index, meta, span)
+    updates: list[tuple[Any, int, dict[str, Any], Span | None]] = field(default_factory=list)
+    kept: int = 0
+    deletes: list[Any] = field(default_factory=list)
+
+
+def plan_chunks(
+    existing: Sequence[ExistingChunk],
+    chunks: Sequence[tuple[str, dict[str, Any]]],
+    *,
+    party_id,
+    spans: Sequence[Span | None] | None = None,
+) -> ChunkPlan:
+    """内容ハッシュが同じ既存チャンクは残し（位置/meta だけ更新）、新規分を追加、消えた分を削除する計画を立てる。
+
+    spans（chunks と同じ順の本文中の位置。None の要素は本文を複製して持つ）を渡すと、チャンクは位置で持つ。
+    本文を複製して持つ既存チャンクや位置のずれたチャンクは、chunk_id を保ったまま位置を書き換える。
+    """
+    plan = ChunkPlan()
+    by_hash: dict[str, list[ExistingChunk]] = {}
+    for row in sorted(existing, key=lambda r: r.chunk_index):
+        if row.content_hash:
+            by_hash.setdefault(row.content_hash, []).append(row)
+        else:
+            plan.deletes.append(row.chunk_id)
+
+    for idx, (content, meta) in enumerate(chunks):
+        span = spans[idx] if spans is not None else None
+        h = content_hash(content)
+        pool = by_hash.get(h)
+        if pool:
+            row = pool.pop(0)
+            if (
+                row.chunk_index != idx
+                or row.meta != meta
+                or str(row.party_id) != str(party_id)
+                or (row.start_offset, row.end_offset) != (span or (None, None))
+            ):
+                plan.updates.append((row.chunk_id, idx, meta, span))
+            else:
+                plan.kept += 1
+            continue
+        plan.inserts.append((idx, content, h, meta, span))
+
+    plan.deletes.extend(row.chunk_id for rows in by_hash.values() for row in rows)
+    return plan
+
+
+def chunk_values(content: str, span: Span | None) -> dict[str, Any]:
+    """チャンク行の本文の列。位置で持つ行は本文を複製しない（content は policy_chunk_body() が文書から引く）。"""
+    if span is None:
+        return {"content_copy": content, "start_offset": None, "end_offset": None}
+    return {"content_copy": None, "start_offset": span[0], "end_offset": span[1]}
+
+
+def sync_chunks(
+    db: Session,
+    *,
+    doc: models.PolicyDocument,
+    party_id,
+    chunks: Sequence[tuple[str, dict[str, Any]]],
+    spans: Sequence[Span | None] | None = None,
+) -> ChunkSyncStats:
+    """文書のチャンクを差分更新する（内容ハッシュが同じチャンクは chunk_id を保ったまま残す）。
+
+    spans の各要素は chunks の本文の doc.content_text 中の位置（None なら本文を複製して保存する）。
+    """
+    C = models.PolicyChunk
+    rows = db.scalars(select(C).where(C.doc_id == doc.doc_id)).all()
+    by_id = {row.chunk_id: row for row in rows}
+    plan = plan_chunks(
+        [
+            ExistingChunk(r.chunk_id, r.chunk_index, r.content_hash, r.meta, r.party_id, r.start_offset, r.end_offset)
+            for r in rows
+        ],
+        chunks,
+        party_id=party_id,
+        spans=spans,
+    )
+    for chunk_id, idx, meta, span in plan.updates:
+        row = by_id[chunk_id]
+        row.chunk_index = idx
+        row.meta = meta
+        row.party_id = party_id
+        if span is not None:
+            row.content_copy = None
+            row.start_offset, row.end_offset = span
+        elif row.start_offset is not None:
+            row.content_copy, row.start_offset, row.end_offset = row.content, None, None
+    for idx, content, h, meta, span in plan.inserts:
+        db.add(
+            C(
+                doc_id=doc.doc_id,
+                party_id=party_id,
+                chunk_index=idx,
+                content_hash=h,
+                embedding=None,
+                meta=meta,
+                **chunk_values(content, span),
+            )
+        )
+    if plan.deletes:
+        db.query(C).filter(C.chunk_id.in_(plan.deletes)).delete(synchronize_session=False)
+    if plan.inserts or plan.updates or plan.deletes:
+        bump_index_generation(db, {party_id, *(r.party_id for r in rows)})
+    return ChunkSyncStats(inserted=len(plan.inserts), updated=len(plan.updates), kept=plan.kept, deleted=len(plan.deletes))
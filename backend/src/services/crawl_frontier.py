@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import heapq
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Generic, Iterable, TypeVar
+from urllib.parse import unquote, urlparse
+
+
+T = TypeVar("T")
+
+
+# アンカーテキスト/URL中に含まれると政策ページらしいキーワード（重み）
+POLICY_KEYWORDS: dict[str, float] = {
+    "政策": 3.0,
+    "公約": 3.0,
+    "マニフェスト": 3.0,
+    "manifesto": 3.0,
+    "policy": 2.5,
+    "policies": 2.5,
+    "seisaku": 2.5,
+    "koyaku": 2.5,
+    "提言": 2.0,
+    "重点": 1.5,
+    "ビジョン": 1.5,
+    "vision": 1.5,
+    "基本方針": 1.5,
+    "主張": 1.0,
+    "綱領": 1.0,
+}
+
+# 政策以外のページに多いキーワード（減点）
+NON_POLICY_KEYWORDS: tuple[str, ...] = (
+    "news",
+    "ニュース",
+    "お知らせ",
+    "event",
+    "イベント",
+    "calendar",
+    "カレンダー",
+    "blog",
+    "ブログ",
+    "contact",
+    "お問い合わせ",
+    "recruit",
+    "採用",
+    "donation",
+    "寄付",
+    "login",
+    "privacy",
+    "sitemap",
+    "tag",
+    "category",
+    "archive",
+    "page",
+)
+
+
+_TOKEN_SPLIT_RE = re.compile(r"[/\-_.?=&]+")
+
+
+@dataclass(frozen=True)
+class PriorityWeights:
+    anchor: float = 1.0
+    url: float = 0.8
+    pdf: float = 2.0
+    topic: float = 0.7
+    topic_cap: int = 3
+    non_policy: float = -1.5
+    depth: float = -0.5
+
+
+def link_priority(
+    url: str,
+    *,
+    anchor_text: str = "",
+    depth: int = 0,
+    topic_terms: Iterable[str] = (),
+    weights: PriorityWeights = PriorityWeights(),
+) -> float:
+    """リンクを取得する前に、政策関連度の推定スコアを付ける（大きいほど先に取得）。"""
+    try:
+        path = unquote(urlparse(url).path or "").lower()
+    except ValueError:
+        path = ""
+    anchor = " ".join((anchor_text or "").split()).lower()
+
+    score = 0.0
+    for kw, w in POLICY_KEYWORDS.items():
+        if kw in anchor:
+            score += weights.anchor * w
+        if kw in path:
+            score += weights.url * w
+    if path.endswith(".pdf"):
+        score += weights.pdf
+
+    matched = 0
+    for term in topic_terms:
+        t = (term or "").strip().lower()
+        if len(t) < 2:
+            continue
+        if t in anchor or t in path:
+            matched += 1
+            if matched >= weights.topic_cap:
+                break
+    score += weights.topic * matched
+
+    tokens = set(_TOKEN_SPLIT_RE.split(path))
+    if any((kw in tokens if kw.isascii() else kw in path) or kw in anchor for kw in NON_POLICY_KEYWORDS):
+        score += weights.non_policy
+    score += weights.depth * max(0, int(depth))
+    return round(score, 3)
+
+
+class CrawlFrontier(Generic[T]):
+    """クロール待ちURLの優先度付きキュー。mode="bfs" では従来通り投入順に取り出す。"""
+
+    def __init__(self, mode: str = "best_first") -> None:
+        self.mode = "bfs" if (mode or "").lower() == "bfs" else "best_first"
+        self._heap: list[tuple[float, int, T]] = []
+        self._fifo: deque[tuple[float, T]] = deque()
+        self._seq = 0
+
+    def push(self, item: T, priority: float = 0.0) -> None:
+        if self.mode == "bfs":
+            self._fifo.append((priority, item))
+            return
+        # 同点は投入順（= 浅い順）を保つ
+        heapq.heappush(self._heap, (-priority, self._seq, item))
+        self._seq += 1
+
+    def pop(self) -> tuple[T, float]:
+        if self.mode == "bfs":
+            priority, item = self._fifo.popleft()
+            return item, priority
+        neg, _, item = heapq.heappop(self._heap)
+        return item, -neg
+
+    def items(self) -> list[tuple[T, float]]:
+        """キュー内の要素を (item, priority) で返す（順不同）。"""
+        if self.mode == "bfs":
+            return [(item, priority) for priority, item in self._fifo]
+        return [(item, -neg) for neg, _, item in self._heap]
+
+    def __len__(self) -> int:
+        return len(self._fifo) if self.mode == "bfs" else len(self._heap)
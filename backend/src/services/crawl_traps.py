@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable
+from urllib.parse import parse_qsl, urlparse
+
+
+@dataclass(frozen=True)
+class TrapLimits:
+    max_path_depth: int = 8
+    max_segment_repeats: int = 2
+    max_query_params: int = 3
+    max_query_variants_per_path: int = 8
+    max_pages_per_pattern: int = 40
+
+
+# サイト内検索の結果ページ（無限に生成される）
+SEARCH_QUERY_KEYS = {"s", "q", "query", "search", "keyword", "keywords", "kw"}
+
+_NUMERIC_RE = re.compile(r"\d+")
+
+
+def compile_deny_patterns(patterns: Iterable[str]) -> list[re.Pattern[str]]:
+    """deny ルール（正規表現）をコンパイルする。不正なパターンは ValueError。"""
+    compiled: list[re.Pattern[str]] = []
+    for p in patterns or []:
+        pat = str(p or "").strip()
+        if not pat:
+            continue
+        try:
+            compiled.append(re.compile(pat))
+        except re.error as e:
+            raise ValueError(f"invalid deny pattern: {pat!r} ({e})") from e
+    return compiled
+
+
+def url_pattern(url: str) -> str:
+    """数字の連番を {n} に潰したURLパターン（ページ送り/日付/ID違いを同一視する）。"""
+    try:
+        p = urlparse(url)
+    except ValueError:
+        return url
+    path = _NUMERIC_RE.sub("{n}", p.path or "/")
+    keys = sorted({k for k, _ in parse_qsl(p.query, keep_blank_values=True)})
+    pattern = f"{p.netloc.lower()}{path}"
+    if keys:
+        pattern += "?" + "&".join(keys)
+    return pattern
+
+
+@dataclass
+class TrapDetector:
+    """カレンダー/ページ送り/タグ/検索結果などのクローラトラップを検出する。"""
+
+    limits: TrapLimits = field(default_factory=TrapLimits)
+    pattern_counts: dict[str, int] = field(default_factory=dict)
+    query_variants: dict[str, set[str]] = field(default_factory=dict)
+    hits: dict[str, int] = field(default_factory=dict)
+
+    def check(self, url: str, deny: Iterable[re.Pattern[str]] = ()) -> str | None:
+        reason = self._check(url, deny)
+        if reason:
+            self.hits[reason] = self.hits.get(reason, 0) + 1
+        return reason
+
+    def _check(self, url: str, deny: Iterable[re.Pattern[str]]) -> str | None:
+        for pat in deny:
+            if pat.search(url):
+                return "trap_deny_rule"
+        try:
+            p = urlparse(url)
+        except ValueError:
+            return None
+        segments = [s for s in (p.path or "").split("/") if s]
+        if len(segments) > self.limits.max_path_depth:
+            return "trap_path_depth"
+        counts: dict[str, int] = {}
+        for seg in segments:
+            counts[seg] = counts.get(seg, 0) + 1
+            if counts[seg] > self.limits.max_segment_repeats:
+                return "trap_repeated_segment"
+        params = parse_qsl(p.query, keep_blank_values=True)
+        if params:
+            keys = {k.lower() for k, _ in params}
+            if keys & SEARCH_QUERY_KEYS:
+                return "trap_search_query"
+            if len(keys) > self.limits.max_query_params:
+                return "trap_query_params"
+            variants = self.query_variants.get(p.netloc.lower() + (p.path or "/"))
+            if variants is not None and p.query not in variants and len(variants) >= self.limits.max_query_variants_per_path:
+                return "trap_query_variants"
+        if self.pattern_counts.get(url_pattern(url), 0) >= self.limits.max_pages_per_pattern:
+            return "trap_pattern_budget"
+        return None
+
+    def admit(self, url: str) -> None:
+        """フロンティアに投入したURLをパターン予算に計上する。"""
+        pattern = url_pattern(url)
+        self.pattern_counts[pattern] = self.pattern_counts.get(pattern, 0) + 1
+        try:
+            p = urlparse(url)
+        except ValueError:
+            return
+        if p.query:
+            self.query_variants.setdefault(p.netloc.lower() + (p.path or "/"), set()).add(p.query)
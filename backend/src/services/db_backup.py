@@ -83,12 +83,18 @@ def _jsonable(value: Any, *, include_binaries: bool) -> Any:
 def _iter_export_columns(model: type) -> list[sa.Column]:
     cols: list[sa.Column] = []
     for col in model.__table__.columns:  # type: ignore[attr-defined]
-        if getattr(col, "computed", None) is not None:
+        # 生成列とトリガーで書く列（policy_chunks.content_tsv）は書き戻せないので含めない
+        if getattr(col, "computed", None) is not None or col.info.get("derived"):
             continue
         cols.append(col)
     return cols
 
 
+def _attr_key(model: type, col: sa.Column) -> str:
+    """列に対応する ORM の属性名（policy_chunks.content は content_copy）。"""
+    return model.__mapper__.get_property_by_column(col).key  # type: ignore[attr-defined]
+
+
 def export_backup(
     db: Session,
     *,
@@ -104,12 +110,13 @@ def export_backup(
     for name in table_names:
         model = EXPORT_TABLES[name]
         cols = _iter_export_columns(model)
-        rows = db.query(model).all()
+        # 表の列を Core で読む（ORM で読むと遅延ロードの列（embedding 等）が1行ごとに SELECT を出す）
+        rows = db.execute(sa.select(*cols)).all()
         payload_rows: list[dict[str, Any]] = []
         for row in rows:
             rec: dict[str, Any] = {}
             for col in cols:
-                rec[col.name] = _jsonable(getattr(row, col.name), include_binaries=include_binaries)
+                rec[col.name] = _jsonable(row._mapping[col], include_binaries=include_binaries)
             payload_rows.append(rec)
         tables[name] = payload_rows
 
@@ -221,6 +228,9 @@ def import_backup(
             continue
 
         cols_by_name = {c.name: c for c in _iter_export_columns(model)}
+        if name == "policy_documents":
+            # duplicate_of は同じ表への外部キーなので、紐付け先（正の文書）を先に入れる
+            rows = sorted(rows, key=lambda r: bool(isinstance(r, dict) and r.get("duplicate_of")))
         count = 0
         for rec in rows:
             if not isinstance(rec, dict):
@@ -231,7 +241,7 @@ def import_backup(
                 if col is None:
                     continue
                 allow_binary = allow_binary_snapshots and (name == "source_snapshots")
-                obj_kwargs[key] = _coerce_for_column(col, val, allow_binary=allow_binary)
+                obj_kwargs[_attr_key(model, col)] = _coerce_for_column(col, val, allow_binary=allow_binary)
             db.add(model(**obj_kwargs))
             count += 1
         db.flush()
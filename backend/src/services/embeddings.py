@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+from collections import Counter
+from typing import Protocol, Sequence
+
+from ..db.models import EMBEDDING_DIM
+from ..settings import settings
+from .chunk_bm25 import bigram_tokens
+
+
+class Embedder(Protocol):
+    """文章を EMBEDDING_DIM 次元のベクトルにする。name は policy_chunks.embedding_model に保存する。"""
+
+    name: str
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        ...
+
+
+def _normalize(vec: list[float]) -> list[float]:
+    norm = math.sqrt(sum(v * v for v in vec))
+    return [v / norm for v in vec] if norm > 0 else vec
+
+
+class HashingEmbedder:
+    """ネットワーク不要の埋め込み: 文字 bi-gram を符号付き feature hashing で固定次元に落とす（TF は対数で抑える）。"""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        # 区切り文字を明示した bi-gram（v2）。分け方が変わったら名前を変えて埋め込みを作り直させる
+        self.name = f"hashing-bigram-v2-{dim}"
+
+    def _embed_one(self, text: str) -> list[float]:
+        vec = [0.0] * self.dim
+        for tok, tf in Counter(bigram_tokens(text)).items():
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += (1.0 + math.log(tf)) * (1.0 if (h >> 63) & 1 else -1.0)
+        return _normalize(vec)
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        return [self._embed_one(t) for t in texts]
+
+
+class OpenAIEmbedder:
+    """OpenAI の embeddings API（text-embedding-3-* は dimensions で次元を指定できる）。"""
+
+    def __init__(self, api_key: str, model: str = "text-embedding-3-small", dim: int = EMBEDDING_DIM):
+        import httpx
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key, http_client=httpx.Client(timeout=30, follow_redirects=True))
+        self.model = model
+        self.dim = dim
+        self.name = f"openai:{model}:{dim}"
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        res = self.client.embeddings.create(model=self.model, input=[t or " " for t in texts], dimensions=self.dim)
+        return [_normalize(list(d.embedding)) for d in sorted(res.data, key=lambda d: d.index)]
+
+
+class GeminiEmbedder:
+    """Gemini の embed_content（output_dimensionality で次元を指定する）。"""
+
+    def __init__(self, api_key: str, model: str = "models/text-embedding-004", dim: int = EMBEDDING_DIM):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model = model
+        self.dim = dim
+        self.name = f"gemini:{model}:{dim}"
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        res = self.genai.embed_content(
+            model=self.model,
+            content=[t or " " for t in texts],
+            task_type="retrieval_document",
+            output_dimensionality=self.dim,
+        )
+        return [_normalize(list(v)) for v in res["embedding"]]
+
+
+_lock = threading.Lock()
+_embedders: dict[str, Embedder] = {}
+_query_cache: dict[tuple[str, str], list[float]] = {}
+_QUERY_CACHE_MAX = 2048
+
+
+def get_embedder(provider: str | None = None) -> Embedder:
+    """設定（embedding_provider）の埋め込み器。API キーが無い場合はハッシュ埋め込みにする。"""
+    requested = (provider or settings.embedding_provider or "hashing").lower()
+    with _lock:
+        if requested in _embedders:
+            return _embedders[requested]
+        embedder: Embedder
+        if requested == "openai" and settings.openai_api_key:
+            embedder = OpenAIEmbedder(settings.openai_api_key, model=settings.embedding_model or "text-embedding-3-small")
+        elif requested == "gemini" and settings.gemini_api_key:
+            embedder = GeminiEmbedder(settings.gemini_api_key, model=settings.embedding_model or "models/text-embedding-004")
+        else:
+            embedder = HashingEmbedder()
+        _embedders[requested] = embedder
+        return embedder
+
+
+def embed_query(embedder: Embedder, text: str) -> list[float]:
+    """検索クエリの埋め込み（同じクエリを政党ごとに何度も引くので、プロセス内でキャッシュする）。"""
+    key = (embedder.name, text)
+    with _lock:
+        cached = _query_cache.get(key)
+    if cached is not None:
+        return cached
+    vec = embedder.embed([text])[0]
+    with _lock:
+        if len(_query_cache) >= _QUERY_CACHE_MAX:
+            _query_cache.clear()
+        _query_cache[key] = vec
+    return vec
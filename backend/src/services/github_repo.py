@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import posixpath
+import tarfile
+import tempfile
+from dataclasses import dataclass
+from typing import Iterator
+from urllib.parse import quote, unquote, urlparse
+
+import httpx
+
+from ..settings import settings
+
+
+GITHUB_API = "https://api.github.com"
+_MARKDOWN_SUFFIXES = (".md", ".markdown")
+
+
+@dataclass(frozen=True)
+class GithubSite:
+    """GitHub リポジトリの markdown をそのまま表示している政策サイト（settings.github_policy_sites）。"""
+
+    host: str
+    repo: str  # owner/name
+    view_prefix: str = "/view/"
+    ref: str = "HEAD"
+
+    def repo_path(self, url: str) -> str | None:
+        """サイトのURLをリポジトリ内パスに変換する（対象外のURLは None）。"""
+        try:
+            parsed = urlparse(url)
+        except ValueError:
+            return None
+        if parsed.netloc.lower() != self.host:
+            return None
+        prefix = "/" + self.view_prefix.strip("/") + "/"
+        if not parsed.path.startswith(prefix):
+            return None
+        return unquote(parsed.path[len(prefix) :].strip("/"))
+
+    def view_url(self, repo_path: str) -> str:
+        prefix = "/" + self.view_prefix.strip("/") + "/"
+        return f"https://{self.host}{prefix}{quote(repo_path.strip('/'))}"
+
+    def resolve_link(self, base_repo_path: str, link: str) -> str:
+        """markdown 内の相対リンクをサイトのURLにする。"""
+        if link.startswith("http://") or link.startswith("https://"):
+            return link
+        if link.startswith("#"):
+            return ""
+        base_dir = posixpath.dirname(base_repo_path or "")
+        return self.view_url(posixpath.normpath(posixpath.join(base_dir, link)))
+
+    def contents_api_url(self, repo_path: str) -> str:
+        return f"{GITHUB_API}/repos/{self.repo}/contents/{quote(repo_path)}"
+
+
+def github_sites() -> dict[str, GithubSite]:
+    sites: dict[str, GithubSite] = {}
+    for host, conf in (settings.github_policy_sites or {}).items():
+        host = host.lower()
+        if isinstance(conf, str):
+            conf = {"repo": conf}
+        if not conf.get("repo"):
+            continue
+        sites[host] = GithubSite(
+            host=host,
+            repo=conf["repo"].strip("/"),
+            view_prefix=conf.get("view_prefix") or "/view/",
+            ref=conf.get("ref") or "HEAD",
+        )
+    return sites
+
+
+def github_site_for(url: str) -> GithubSite | None:
+    try:
+        host = (urlparse(url).netloc or "").lower()
+    except ValueError:
+        return None
+    return github_sites().get(host)
+
+
+def api_headers(accept: str = "application/vnd.github+json") -> dict[str, str]:
+    headers = {"Accept": accept}
+    if settings.github_token:
+        # 未認証だと 60 リクエスト/時 に制限される
+        headers["Authorization"] = f"Bearer {settings.github_token}"
+    return headers
+
+
+def latest_commit_sha(client: httpx.Client, site: GithubSite) -> str:
+    """ref の最新コミットSHA（1リクエスト）。"""
+    resp = client.get(
+        f"{GITHUB_API}/repos/{site.repo}/commits/{quote(site.ref)}",
+        headers=api_headers("application/vnd.github.sha"),
+    )
+    resp.raise_for_status()
+    sha = resp.text.strip()
+    if len(sha) != 40:
+        raise ValueError(f"unexpected commit sha: {sha[:60]!r}")
+    return sha
+
+
+def iter_markdown_files(client: httpx.Client, site: GithubSite, sha: str, *, prefix: str = "") -> Iterator[tuple[str, str]]:
+    """コミットの tarball を1回で取得し、prefix 配下の markdown を (リポジトリ内パス, 本文) で返す。"""
+    limit = int(settings.github_tarball_max_bytes)
+    with tempfile.SpooledTemporaryFile(max_size=int(settings.fetch_spool_threshold_bytes)) as spool:
+        with client.stream("GET", f"{GITHUB_API}/repos/{site.repo}/tarball/{sha}", headers=api_headers()) as resp:
+            resp.raise_for_status()
+            size = 0
+            for part in resp.iter_bytes():
+                size += len(part)
+                if limit and size > limit:
+                    raise ValueError(f"repository tarball too large (> {limit} bytes)")
+                spool.write(part)
+        spool.seek(0)
+        prefix = prefix.strip("/")
+        with tarfile.open(fileobj=spool, mode="r:gz") as tar:
+            for member in tar:
+                if not member.isfile() or not member.name.lower().endswith(_MARKDOWN_SUFFIXES):
+                    continue
+                # 先頭要素は "<owner>-<repo>-<sha>/"
+                _, _, path = member.name.partition("/")
+                if prefix and not (path == prefix or path.startswith(prefix + "/")):
+                    continue
+                f = tar.extractfile(member)
+                if f is None:
+                    continue
+                yield path, f.read().decode("utf-8", errors="ignore")
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import IO, Any
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..settings import settings
+from .chunking import ExistingChunk, Span, chunk_spans, chunk_values, content_hash, plan_chunks
+from .near_dup import link_near_duplicate
+from .raw_archive import RawBody, archive_stream, store_bodies
+from .topic_chunks import bump_index_generation
+from .url_canon import url_key
+
+
+@dataclass
+class PendingDocument:
+    party_id: Any
+    url: str
+    doc_type: str
+    content_text: str
+    title: str | None = None
+    # チャンクの本文中の位置。None なら本文から chunk_spans で作る
+    spans: list[Span] | None = None
+    # 取得した生の本文（source_snapshots に保存し、raw_hash で参照する）
+    raw: RawBody | None = None
+    # 保存済みの生の本文の内容ハッシュ（PolicyIndexWriter.archive_stream で先に保存したもの）
+    raw_hash: str | None = None
+    # 同じページの別の表記（リダイレクトや rel=canonical の前に取得した URL）。この表記で保存された文書も同じ文書として扱う
+    aliases: tuple[str, ...] = ()
+
+    @property
+    def raw_content_hash(self) -> str | None:
+        return self.raw.content_hash if self.raw is not None else self.raw_hash
+
+
+@dataclass
+class IndexWriteStats:
+    documents_written: int = 0
+    documents_unchanged: int = 0
+    near_duplicates: int = 0
+    url_variants_merged: int = 0
+    chunks_inserted: int = 0
+    chunks_updated: int = 0
+    chunks_kept: int = 0
+    chunks_deleted: int = 0
+    raw_archived: int = 0
+    raw_bytes_archived: int = 0
+    batches: int = 0
+    rows: int = 0
+    elapsed_sec: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return round(self.rows / self.elapsed_sec, 1) if self.elapsed_sec > 0 else 0.0
+
+
+def _as_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+@dataclass
+class _StoredUrl:
+    doc_id: Any
+    url: str
+    is_canonical: bool
+    fetched_at: Any
+
+
+class PolicyIndexWriter:
+    """政策文書とチャンクをまとめて書き込む。
+
+    文書は batch_size 件ごとに INSERT ... ON CONFLICT (url) DO UPDATE 1文で upsert し、
+    チャンクは差分（plan_chunks）を複数行 INSERT / 主キー一括 UPDATE / IN 句 DELETE で反映して、
+    バッチごとに commit する。長いクロールでもロックとセッション内のオブジェクトを抱え続けない。
+    同じ URL がバッチ内に複数回来た場合は後勝ち。
+    同じ url_key の文書が別の表記の URL で保存されていれば（URL を正規化する前に作られた行）、
+    その行の URL を付け替えて使い、同じキーの残りの行は消す。
+
+
+    rebuild=True はアーカイブからの再抽出用: 本文が同じ文書もチャンクを作り直し、fetched_at は更新しない。
+    """
+
+    def __init__(self, db: Session, *, batch_size: int | None = None, rebuild: bool = False):
+        self.db = db
+        self.batch_size = max(1, batch_size or settings.index_write_batch_size)
+        self.rebuild = rebuild
+        self.stats = IndexWriteStats()
+        # ほぼ同一としてチャンク化しなかった文書（クロールログの skipped に載せる）
+        self.skipped: list[dict[str, Any]] = []
+        self._pending: dict[str, PendingDocument] = {}
+        # チャンクが変わった政党（書き込み後に topic_party_chunks を作り直す対象）
+        self.changed_party_ids: set[Any] = set()
+        # 政党ごとの url_key → 保存済みの文書（最初に使うときに1回だけ読む）
+        self._stored_urls: dict[Any, dict[str, list[_StoredUrl]]] = {}
+
+    def add(self, doc: PendingDocument) -> None:
+        self._pending.pop(doc.url, None)
+        self._pending[doc.url] = doc
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def close(self) -> IndexWriteStats:
+        self.flush()
+        return self.stats
+
+    def archive_stream(self, url: str, fp: IO[bytes], *, kind: str, content_type: str | None = None) -> str:
+        """大きい本文を一時ファイルから直接 source_snapshots に書く（次の flush で commit される）。
+
+        文書には返した内容ハッシュを PendingDocument.raw_hash で渡す。圧縮した本文を溜めないためのもの。
+        """
+        content_hash, archived, archived_bytes = archive_stream(self.db, url, fp, kind=kind, content_type=content_type)
+        self.stats.raw_archived += archived
+        self.stats.raw_bytes_archived += archived_bytes
+        return content_hash
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        started = time.perf_counter()
+        pending = list(self._pending.values())
+        self._pending.clear()
+        rows = self._write_batch(pending)
+        self.db.commit()
+        self.stats.batches += 1
+        self.stats.rows += rows
+        self.stats.elapsed_sec += time.perf_counter() - started
+
+    def _stored_url_index(self, party_id: uuid.UUID) -> dict[str, list[_StoredUrl]]:
+        index = self._stored_urls.get(party_id)
+        if index is None:
+            Doc = models.PolicyDocument
+            index = {}
+            for r in self.db.execute(
+                select(Doc.doc_id, Doc.url, Doc.duplicate_of, Doc.fetched_at).where(Doc.party_id == party_id)
+            ):
+                index.setdefault(url_key(r.url), []).append(_StoredUrl(r.doc_id, r.url, r.duplicate_of is None, r.fetched_at))
+            self._stored_urls[party_id] = index
+        return index
+
+    def _merge_url_variants(self, pending: list[PendingDocument]) -> int:
+        """保存済みの文書のうち url_key が同じで表記が違うものを、今回の URL の1行にまとめる。
+
+        残す行は今回と同じ URL の行、無ければ近重複でなく最後に取得した行。残す行の URL を今回の URL に付け替え、
+        残りの行は近重複の参照を残す行に向けてから消す（チャンクも消える）。付け替えた行と消した行の数を返す。
+        """
+        Doc = models.PolicyDocument
+        rows = 0
+        for p in pending:
+            party_id = _as_uuid(p.party_id)
+            index = self._stored_url_index(party_id)
+            keys = {k for k in (url_key(u) for u in (p.url, *p.aliases)) if k}
+            stored = [s for k in keys for s in index.pop(k, [])]
+            if stored:
+                keep = max(stored, key=lambda s: (s.url == p.url, s.is_canonical, s.fetched_at))
+                drop = [s.doc_id for s in stored if s is not keep]
+                if drop:
+                    self.db.execute(
+                        update(Doc).where(Doc.duplicate_of.in_(drop), Doc.doc_id != keep.doc_id).values(duplicate_of=keep.doc_id)
+                    )
+                    self.db.execute(delete(Doc).where(Doc.doc_id.in_(drop)))
+                    # 消したチャンクを topic_party_chunks が参照しているかもしれない
+                    bump_index_generation(self.db, {party_id})
+                    self.changed_party_ids.add(party_id)
+                renamed = keep.url != p.url
+                if renamed:
+                    self.db.execute(update(Doc).where(Doc.doc_id == keep.doc_id).values(url=p.url))
+                    keep = _StoredUrl(keep.doc_id, p.url, keep.is_canonical, keep.fetched_at)
+                self.stats.url_variants_merged += len(drop) + int(renamed)
+                rows += len(drop) + int(renamed)
+                index[url_key(p.url)] = [keep]
+        return rows
+
+    def _write_batch(self, pending: list[PendingDocument]) -> int:
+        db = self.db
+        Doc = models.PolicyDocument
+        hashes = {p.url: content_hash(p.content_text) for p in pending}
+        archived, archived_bytes = store_bodies(db, ((p.url, p.raw) for p in pending if p.raw is not None))
+        self.stats.raw_archived += archived
+        self.stats.raw_bytes_archived += archived_bytes
+        rows = archived
+        if not self.rebuild:
+            rows += self._merge_url_variants(pending)
+        has_chunks = select(models.PolicyChunk.chunk_id).where(models.PolicyChunk.doc_id == Doc.doc_id).exists()
+        existing = {
+            row.url: row
+            for row in db.execute(
+                select(
+                    Doc.url, Doc.doc_id, Doc.hash, Doc.simhash, Doc.raw_hash, Doc.duplicate_of, has_chunks.label("has_chunks")
+                ).where(Doc.url.in_(list(hashes)))
+            )
+        }
+
+        changed: list[PendingDocument] = []
+        unchanged_urls: list[str] = []
+        raw_updates: list[dict[str, Any]] = []
+        for p in pending:
+            row = existing.get(p.url)
+            # 本文が同じでも SimHash 未計算（導入前の文書）なら近重複判定のため作り直す。
+            # 近重複の文書は毎回判定し直す（正の文書が消えるか変わっていれば自分のチャンクを作る）。
+            # 近重複でないのにチャンクが無い文書（正の文書が消えて duplicate_of が NULL になったもの）も作り直す
+            if (
+                not self.rebuild
+                and row is not None
+                and row.hash == hashes[p.url]
+                and (row.simhash is not None or len((p.content_text or "").strip()) < settings.near_dup_min_chars)
+                and row.duplicate_of is None
+                and (row.has_chunks or not (p.content_text or "").strip())
+            ):
+                unchanged_urls.append(p.url)
+                # 抽出後の本文が同じでも生の本文は変わりうる（日付やスクリプトだけの差分）
+                if p.raw_content_hash is not None and row.raw_hash != p.raw_content_hash:
+                    raw_updates.append({"doc_id": row.doc_id, "raw_hash": p.raw_content_hash})
+            else:
+                changed.append(p)
+
+        if unchanged_urls:
+            # sitemap の lastmod 比較に使うため、最終取得時刻は内容が同じでも更新する
+            db.execute(update(Doc).where(Doc.url.in_(unchanged_urls)).values(fetched_at=func.now()))
+            if raw_updates:
+                db.execute(update(Doc), raw_updates)
+            self.stats.documents_unchanged += len(unchanged_urls)
+            rows += len(unchanged_urls)
+        if not changed:
+            return rows
+
+        stmt = pg_insert(Doc).values(
+            [
+                {
+                    "party_id": _as_uuid(p.party_id),
+                    "url": p.url,
+                    "doc_type": p.doc_type,
+                    "title": p.title,
+                    "content_text": p.content_text,
+                    "hash": hashes[p.url],
+                    "raw_hash": p.raw_content_hash,
+                }
+                for p in changed
+            ]
+        )
+        set_ = {
+            "doc_type": stmt.excluded.doc_type,
+            "title": stmt.excluded.title,
+            "content_text": stmt.excluded.content_text,
+            "hash": stmt.excluded.hash,
+            "raw_hash": func.coalesce(stmt.excluded.raw_hash, Doc.raw_hash),
+        }
+        if not self.rebuild:
+            set_["fetched_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=[Doc.url], set_=set_)
+        doc_ids = {row.url: row.doc_id for row in db.execute(stmt.returning(Doc.doc_id, Doc.url))}
+        for p in changed:
+            stored = self._stored_urls.get(_as_uuid(p.party_id))
+            if stored is not None:
+                stored[url_key(p.url)] = [_StoredUrl(doc_ids[p.url], p.url, True, datetime.now(timezone.utc))]
+        self.stats.documents_written += len(changed)
+        rows += len(changed)
+
+        docs = {
+            d.url: d
+            for d in db.scalars(
+                select(Doc).where(Doc.doc_id.in_(list(doc_ids.values()))).execution_options(populate_existing=True)
+            )
+        }
+        chunk_rows: dict[Any, list[ExistingChunk]] = {doc_id: [] for doc_id in doc_ids.values()}
+        for r in db.execute(
+            select(
+                models.PolicyChunk.chunk_id,
+                models.PolicyChunk.doc_id,
+                models.PolicyChunk.chunk_index,
+                models.PolicyChunk.content_hash,
+                models.PolicyChunk.meta,
+                models.PolicyChunk.party_id,
+                models.PolicyChunk.start_offset,
+                models.PolicyChunk.end_offset,
+            ).where(models.PolicyChunk.doc_id.in_(list(doc_ids.values())))
+        ):
+            chunk_rows[r.doc_id].append(
+                ExistingChunk(r.chunk_id, r.chunk_index, r.content_hash, r.meta, r.party_id, r.start_offset, r.end_offset)
+            )
+
+        inserts: list[dict[str, Any]] = []
+        updates: list[dict[str, Any]] = []
+        deletes: list[Any] = []
+        touched: set[Any] = set()
+        for p in changed:
+            doc = docs[p.url]
+            party_id = _as_uuid(p.party_id)
+            # バッチ内の先行文書も候補になるよう、SimHash を書き出してから1件ずつ順に判定する
+            db.flush()
+            canonical = link_near_duplicate(db, doc, p.content_text or "")
+            if canonical is not None:
+                chunks: list[tuple[str, dict[str, Any]]] = []
+                spans: list[Span] = []
+                self.stats.near_duplicates += 1
+                self.skipped.append({"url": p.url, "reason": "near_duplicate", "duplicate_of": canonical.url})
+            else:
+                # チャンクは本文への位置だけを持ち、URL/タイトルは文書から引く
+                text = p.content_text or ""
+                spans = p.spans if p.spans is not None else chunk_spans(text)
+                chunks = [(text[start:end], {}) for start, end in spans]
+            plan = plan_chunks(chunk_rows[doc.doc_id], chunks, party_id=party_id, spans=spans)
+            inserts.extend(
+                {
+                    "doc_id": doc.doc_id,
+                    "party_id": party_id,
+                    "chunk_index": idx,
+                    "content_hash": h,
+                    "meta": meta,
+                    **chunk_values(content, span),
+                }
+                for idx, content, h, meta, span in plan.inserts
+            )
+            updates.extend(
+                {
+                    "chunk_id": chunk_id,
+                    "chunk_index": idx,
+                    "meta": meta,
+                    "party_id": party_id,
+                    # 本文を複製して持っていた行も位置で持つ行に置き換える
+                    "content_copy": None,
+                    "start_offset": span[0],
+                    "end_offset": span[1],
+                }
+                for chunk_id, idx, meta, span in plan.updates
+            )
+            deletes.extend(plan.deletes)
+            self.stats.chunks_kept += plan.kept
+            if plan.inserts or plan.updates or plan.deletes:
+                touched.add(party_id)
+                touched.update(r.party_id for r in chunk_rows[doc.doc_id])
+        db.flush()
+
+        if deletes:
+            db.execute(delete(models.PolicyChunk).where(models.PolicyChunk.chunk_id.in_(deletes)))
+        if updates:
+            db.execute(update(models.PolicyChunk), updates)
+        if inserts:
+            # 複数行 VALUES にまとめて送られる（insertmanyvalues）
+            db.execute(insert(models.PolicyChunk), inserts)
+        if touched:
+            # topic_party_chunks の該当政党の行を古いものとして扱わせる
+            bump_index_generation(db, touched)
+            self.changed_party_ids.update(touched)
+        self.stats.chunks_inserted += len(inserts)
+        self.stats.chunks_updated += len(updates)
+        self.stats.chunks_deleted += len(deletes)
+        return rows + len(inserts) + len(updates) + len(deletes)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..settings import settings
+
+
+SIMHASH_BITS = 64
+# 64bit を 16bit x 4 バンドに分ける。ハミング距離 3 以下なら鳩の巣原理で少なくとも1バンドが一致する
+BAND_BITS = 16
+BANDS = SIMHASH_BITS // BAND_BITS
+SHINGLE_CHARS = 4
+
+
+def _shingles(text: str) -> Counter:
+    # 日本語は空白で単語が分かれないため、空白を除いた文字 n-gram を特徴量にする
+    t = "".join((text or "").split())
+    if len(t) <= SHINGLE_CHARS:
+        return Counter([t]) if t else Counter()
+    return Counter(t[i : i + SHINGLE_CHARS] for i in range(len(t) - SHINGLE_CHARS + 1))
+
+
+# 各ビットを FIELD_BITS 幅のフィールドに広げた値を足し合わせ、64個のカウンタを多倍長整数1本で同時に数える
+FIELD_BITS = 32
+_FIELD_MASK = (1 << FIELD_BITS) - 1
+_SPREAD_BYTE = [
+    sum(1 << (bit * FIELD_BITS) for bit in range(8) if (byte >> bit) & 1)
+    for byte in range(256)
+]
+
+
+def simhash(text: str) -> int:
+    """本文の 64bit SimHash（符号なし）。"""
+    shingles = _shingles(text)
+    total = 0
+    acc = 0
+    for shingle, count in shingles.items():
+        digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        spread = 0
+        for i, byte in enumerate(digest):
+            spread |= _SPREAD_BYTE[byte] << (i * 8 * FIELD_BITS)
+        acc += spread * count
+        total += count
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        # そのビットが立っているシングルの重みが過半なら 1
+        if ((acc >> (bit * FIELD_BITS)) & _FIELD_MASK) * 2 > total:
+            value |= 1 << bit
+    return value
+
+
+def to_signed(value: int) -> int:
+    """BIGINT に入れるため符号付き 64bit に変換する。"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def hamming(a: int, b: int) -> int:
+    mask = (1 << SIMHASH_BITS) - 1
+    return bin((a ^ b) & mask).count("1")
+
+
+def lsh_bands(value: int) -> list[int]:
+    """LSH 用のバンド値（バンド番号を上位に埋めて列を1本にまとめる）。"""
+    mask = (1 << BAND_BITS) - 1
+    return [(i << BAND_BITS) | ((value >> (i * BAND_BITS)) & mask) for i in range(BANDS)]
+
+
+def link_near_duplicate(db: Session, doc: models.PolicyDocument, text: str) -> models.PolicyDocument | None:
+    """doc に SimHash を付け、同じ政党の既存文書にほぼ同一のものがあれば duplicate_of で紐付けて返す。
+
+    紐付け先は常に duplicate_of を持たない文書（正）で、doc を正としていた文書も同じ先に付け替える
+    （B→A→C のような連鎖を作らない）。短すぎる本文は SimHash が安定しないため対象外（紐付けは解除する）。
+    """
+    if len((text or "").strip()) < settings.near_dup_min_chars:
+        doc.simhash = None
+        doc.simhash_bands = None
+        doc.duplicate_of = None
+        return None
+
+    value = simhash(text)
+    doc.simhash = to_signed(value)
+    doc.simhash_bands = lsh_bands(value)
+    candidates = db.scalars(
+        select(models.PolicyDocument).where(
+            models.PolicyDocument.party_id == doc.party_id,
+            models.PolicyDocument.doc_id != doc.doc_id,
+            models.PolicyDocument.duplicate_of.is_(None),
+            models.PolicyDocument.simhash_bands.overlap(doc.simhash_bands),
+        )
+    ).all()
+    best = None
+    best_distance = settings.near_dup_max_hamming + 1
+    for cand in candidates:
+        if cand.simhash is None:
+            continue
+        distance = hamming(value, cand.simhash)
+        # 同距離なら先に登録された文書を正とする
+        if distance < best_distance or (distance == best_distance and best is not None and cand.fetched_at < best.fetched_at):
+            best = cand
+            best_distance = distance
+    doc.duplicate_of = best.doc_id if best is not None else None
+    if best is not None:
+        db.execute(
+            update(models.PolicyDocument)
+            .where(models.PolicyDocument.duplicate_of == doc.doc_id)
+            .values(duplicate_of=best.doc_id)
+            .execution_options(synchronize_session="fetch")
+        )
+    return best
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from ..settings import settings
+
+
+# 一時ファイルへ書き出すときに一度に読む大きさ
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class PdfText:
+    text: str
+    error: str | None = None
+    sha256: str = ""
+    cached: bool = False
+
+
+def _extract_worker(path: str, max_pages: int) -> tuple[str, str | None]:
+    """子プロセス側で pypdf → pdfminer の順に本文抽出する（PDFはファイルのパスで受け取る）。"""
+    try:
+        from pypdf import PdfReader  # type: ignore
+    except Exception:
+        PdfReader = None  # type: ignore[assignment]
+    try:
+        from pdfminer.high_level import extract_text  # type: ignore
+    except Exception:
+        extract_text = None  # type: ignore[assignment]
+
+    if PdfReader is None and extract_text is None:
+        return "", "extractor_missing"
+
+    last_err = "unknown"
+    if PdfReader is not None:
+        try:
+            reader = PdfReader(path)
+        except Exception as e:
+            reader = None
+            last_err = f"pypdf:{type(e).__name__}"
+        if reader is not None:
+            parts: list[str] = []
+            for i, page in enumerate(reader.pages):
+                if max_pages and i >= max_pages:
+                    break
+                try:
+                    parts.append(page.extract_text() or "")
+                except Exception:
+                    continue
+            text = "\n".join([p for p in parts if p]).strip()
+            if text:
+                return text, None
+
+    if extract_text is not None:
+        try:
+            text = extract_text(path, maxpages=max_pages or 0) or ""
+        except Exception as e:
+            text = ""
+            last_err = f"pdfminer:{type(e).__name__}"
+        if text.strip():
+            return text.strip(), None
+
+    return "", f"extract_failed:{last_err}"
+
+
+def _worker_loop(conn) -> None:
+    """ワーカープロセスの本体。(パス, ページ上限) を受け取って抽出結果を返す。None で終了。"""
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        path, max_pages = msg
+        try:
+            conn.send(_extract_worker(path, max_pages))
+        except Exception as e:
+            conn.send(("", f"extract_error:{type(e).__name__}"))
+
+
+# 1ワーカーが処理したらプロセスを作り直す件数（抽出器のメモリ増加対策）
+_MAX_TASKS_PER_WORKER = 50
+
+
+class _Worker:
+    def __init__(self, ctx) -> None:
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_loop, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+        self.tasks = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+    def kill(self) -> None:
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+
+class _ExtractorPool:
+    """PDF抽出用のワーカープロセス群。
+
+    タイムアウトはPDF1件ごとで、タイムアウトしたワーカーだけを止める（他のワーカーで実行中の抽出は続く）。
+    ワーカーは _MAX_TASKS_PER_WORKER 件処理したら、その抽出が終わった時点で作り直す。
+    """
+
+    def __init__(self) -> None:
+        self._idle: list[_Worker] = []
+        self._busy = 0
+        self._cond = threading.Condition()
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while not self._idle and self._busy >= max(1, int(settings.pdf_extract_workers)):
+                self._cond.wait()
+            self._busy += 1
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return _Worker(multiprocessing.get_context("spawn"))
+        except Exception:
+            self._release(None)
+            raise
+
+    def _release(self, worker: _Worker | None) -> None:
+        with self._cond:
+            self._busy -= 1
+            if worker is not None:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    def run(self, path: str, *, timeout: float, max_pages: int) -> tuple[str, str | None]:
+        try:
+            worker: _Worker | None = self._acquire()
+        except Exception as e:
+            return "", f"extract_error:{type(e).__name__}"
+        try:
+            worker.conn.send((path, max_pages))
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                worker = None
+                return "", "extract_timeout"
+            text, err = worker.conn.recv()
+            worker.tasks += 1
+            if worker.tasks >= _MAX_TASKS_PER_WORKER:
+                worker.stop()
+                worker = None
+            return text, err
+        except Exception as e:
+            # ワーカーが落ちた（抽出器のクラッシュ等）
+            if worker is not None:
+                worker.kill()
+                worker = None
+            return "", f"extract_error:{type(e).__name__}"
+        finally:
+            self._release(worker)
+
+    def reset(self) -> None:
+        """待機中のワーカーを止める（実行中のものは終わり次第 _release で戻る）。"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for w in idle:
+            w.stop()
+
+
+_POOL = _ExtractorPool()
+atexit.register(_POOL.reset)
+
+
+def _cache_dir() -> Path:
+    if settings.pdf_text_cache_dir:
+        return Path(settings.pdf_text_cache_dir)
+    return Path(__file__).resolve().parents[2] / "cache" / "pdf_text"
+
+
+def _cache_load(sha256: str) -> PdfText | None:
+    path = _cache_dir() / f"{sha256}.json"
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    # 抽出器の設定（ページ上限）が変わった場合は作り直す
+    if data.get("max_pages") != int(settings.pdf_max_pages):
+        return None
+    if data.get("error") == "extract_timeout" and float(data.get("timeout") or 0) < float(settings.pdf_extract_timeout_sec):
+        return None
+    return PdfText(text=data.get("text") or "", error=data.get("error"), sha256=sha256, cached=True)
+
+
+def _cache_store(result: PdfText) -> None:
+    # 抽出器が無い環境での失敗は環境依存なのでキャッシュしない
+    if result.error == "extractor_missing" or (result.error or "").startswith("extract_error:"):
+        return
+    d = _cache_dir()
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+        tmp = d / f"{result.sha256}.json.tmp"
+        tmp.write_text(
+            json.dumps(
+                {
+                    "text": result.text,
+                    "error": result.error,
+                    "max_pages": int(settings.pdf_max_pages),
+                    "timeout": float(settings.pdf_extract_timeout_sec),
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        tmp.replace(d / f"{result.sha256}.json")
+    except OSError:
+        pass
+
+
+def _spool_to_file(data: bytes | IO[bytes]) -> tuple[str, str]:
+    """PDFを一時ファイルに書き出しながら SHA-256 を取る。(パス, ハッシュ) を返す（パスは呼び出し側で消す）。
+
+    ワーカーにはパスだけを渡す（本文を bytes に読み込んでプロセス間で pickle しない）。
+    """
+    h = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="pdf_extract_", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if isinstance(data, (bytes, bytearray)):
+                h.update(data)
+                out.write(data)
+            else:
+                data.seek(0)
+                while part := data.read(_COPY_CHUNK_BYTES):
+                    h.update(part)
+                    out.write(part)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, h.hexdigest()
+
+
+def extract_pdf_text(data: bytes | IO[bytes], *, refresh: bool = False) -> PdfText:
+    """PDF本文を抽出する（SHA-256 でキャッシュし、別プロセスでタイムアウト付きで実行する）。
+
+    同じPDFが複数のURL/政党から参照されていても解析は1回で済む。タイムアウトしたPDFも結果として
+    キャッシュするため、再クロールのたびに同じPDFで詰まることはない。
+    refresh=True ならキャッシュを読まずに抽出し直す（抽出器を更新した後の再抽出用）。
+    """
+    path, sha256 = _spool_to_file(data)
+    try:
+        cached = None if refresh else _cache_load(sha256)
+        if cached is not None:
+            return cached
+        text, err = _POOL.run(
+            path,
+            timeout=float(settings.pdf_extract_timeout_sec),
+            max_pages=int(settings.pdf_max_pages),
+        )
+    finally:
+        os.unlink(path)
+    result = PdfText(text=text, error=err, sha256=sha256)
+    _cache_store(result)
+    return result
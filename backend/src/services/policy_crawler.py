@@ -7,18 +7,28 @@ import base64
 import json
 import posixpath
 from pathlib import Path
-from typing import Iterable
-from urllib.parse import quote, unquote, urljoin, urlparse
+from urllib.parse import urljoin, urlparse
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ..agents.debug import ensure_run_dir, save_json
 from ..agents.fetchers import HttpxFetcher
-from ..agents.text_extract import html_to_text
+from ..agents.text_extract import markdown_links, markdown_to_text, parse_html
 from ..db import models
 from ..settings import settings
+from . import topic_chunks
+from .boilerplate import BoilerplateStripper, host_key, load_learned_lines, save_learned_lines
+from .chunking import chunk_spans
+from .crawl_frontier import CrawlFrontier, link_priority
+from .crawl_traps import TrapDetector, compile_deny_patterns
+from .github_repo import GithubSite, api_headers, github_site_for, iter_markdown_files, latest_commit_sha
+from .index_writer import PendingDocument, PolicyIndexWriter
+from .pdf_extract import extract_pdf_text
 from .policy_sources import list_sources
+from .raw_archive import RawBody, pack_body
+from .robots_sitemap import HostThrottle, collect_sitemap_entries, get_robots
+from .url_canon import UrlDeduper, canonicalize_url, url_key
 
 
 @dataclass
@@ -27,64 +37,27 @@ class CrawlStats:
     fetched_pdf: int = 0
     skipped: int = 0
     errors: int = 0
-
-
-class _LinkExtractor:
-    def __init__(self) -> None:
-        self.links: list[str] = []
-
-    def feed(self, html: str) -> None:
-        for m in re.finditer(r'href=[\"\\\']([^\"\\\']+)', html or "", flags=re.IGNORECASE):
-            self.links.append(m.group(1))
-
-
-def _markdown_links(text: str) -> list[str]:
-    links: list[str] = []
-    for m in re.finditer(r"\[[^\]]+\]\(([^)]+)\)", text or ""):
-        links.append(m.group(1))
-    for m in re.finditer(r"(https?://[^\s)]+)", text or ""):
-        links.append(m.group(1))
-    return links
-
-
-def _markdown_to_text(text: str) -> str:
-    t = re.sub(r"```.*?```", "", text or "", flags=re.DOTALL)
-    t = re.sub(r"`[^`]+`", "", t)
-    t = re.sub(r"\[(.*?)\]\((.*?)\)", r"\1", t)
-    t = re.sub(r"#+\s*", "", t)
-    t = re.sub(r"\s{2,}", " ", t)
-    return t.strip()
-
-def _policy_view_repo_path(url: str) -> str | None:
-    try:
-        parsed = urlparse(url)
-    except Exception:
-        return None
-    if parsed.netloc.lower() != "policy.team-mir.ai":
-        return None
-    if not parsed.path.startswith("/view/"):
-        return None
-    path = parsed.path[len("/view/") :]
-    path = path.strip("/")
-    if not path:
-        return ""
-    return unquote(path)
-
-
-def _policy_view_url_for_path(repo_path: str) -> str:
-    path = repo_path.strip("/")
-    encoded = quote(path)
-    return f"https://policy.team-mir.ai/view/{encoded}"
-
-
-def _policy_view_resolve_link(base_repo_path: str, link: str) -> str:
-    if link.startswith("http://") or link.startswith("https://"):
-        return link
-    if link.startswith("#"):
-        return ""
-    base_dir = posixpath.dirname(base_repo_path or "")
-    joined = posixpath.normpath(posixpath.join(base_dir, link))
-    return _policy_view_url_for_path(joined)
+    duplicates: int = 0
+    fetches_saved: int = 0
+    trap_skipped: int = 0
+    robots_disallowed: int = 0
+    sitemap_seeded: int = 0
+    unchanged_skipped: int = 0
+    pdf_cache_hits: int = 0
+    boilerplate_lines_removed: int = 0
+    boilerplate_chunks_saved: int = 0
+    boilerplate_chars_saved: int = 0
+    near_duplicates: int = 0
+    chunks_inserted: int = 0
+    chunks_kept: int = 0
+    chunks_deleted: int = 0
+    write_batches: int = 0
+    write_rows_per_sec: float = 0.0
+    github_repos_synced: int = 0
+    github_repos_unchanged: int = 0
+    raw_archived: int = 0
+    raw_bytes_archived: int = 0
+    topic_chunks_refreshed: int = 0
 
 
 def _normalize_url(url: str) -> str:
@@ -151,6 +124,100 @@ def _base_path_from_url(url: str) -> str:
     return path
 
 
+BASE_URL_PRIORITY = 100.0
+
+
+def _active_topic_terms(db: Session) -> list[str]:
+    terms: list[str] = []
+    for t in db.scalars(select(models.Topic).where(models.Topic.is_active.is_(True))):
+        terms.append(t.name or "")
+        terms.extend(str(k) for k in (t.search_subkeywords or []) if isinstance(k, str))
+    out: list[str] = []
+    seen: set[str] = set()
+    for t in terms:
+        tn = " ".join(t.split())
+        if not tn or tn in seen:
+            continue
+        seen.add(tn)
+        out.append(tn)
+    return out
+
+
+def _seed_from_sitemaps(
+    db: Session,
+    *,
+    party_id,
+    sources: list[tuple[str, str, str, list[re.Pattern[str]]]],
+    fetcher: HttpxFetcher,
+    robots_for,
+    queue: CrawlFrontier,
+    dedup: UrlDeduper,
+    traps: TrapDetector,
+    max_depth: int,
+    topic_terms: list[str],
+    stats: CrawlStats,
+    log: dict[str, list[dict]],
+) -> None:
+    """sitemap.xml のURLのうち、政策URL配下のものをフロンティアに投入する。lastmod が前回取得以前なら取得しない。"""
+    last_fetched: dict[str, object] = {
+        url_key(u): fetched_at
+        for u, fetched_at in db.execute(
+            select(models.PolicyDocument.url, models.PolicyDocument.fetched_at).where(models.PolicyDocument.party_id == party_id)
+        ).all()
+    }
+    entries_by_host: dict[str, list] = {}
+    for base_url, domain, base_path, deny in sources:
+        if github_site_for(base_url) is not None:
+            continue
+        host = (urlparse(base_url).netloc or "").lower()
+        if host not in entries_by_host:
+            robots = robots_for(base_url)
+            sitemaps = list(robots.sitemaps) if robots is not None else []
+            if not sitemaps:
+                scheme = urlparse(base_url).scheme or "https"
+                sitemaps = [f"{scheme}://{host}/sitemap.xml"]
+            entries_by_host[host] = collect_sitemap_entries(fetcher, sitemaps)
+        for entry in entries_by_host[host]:
+            url = canonicalize_url(entry.url)
+            if not url or not _same_domain(url, domain) or not _path_allowed(url, base_path):
+                continue
+            if dedup.seen(url):
+                dedup.add(entry.url)
+                continue
+            fetched_at = last_fetched.get(url_key(url))
+            if entry.lastmod is not None and fetched_at is not None and fetched_at >= entry.lastmod:
+                dedup.add(entry.url)
+                stats.unchanged_skipped += 1
+                log["skipped"].append({"url": url, "reason": "sitemap_unchanged"})
+                continue
+            trap = traps.check(url, deny)
+            if trap:
+                stats.trap_skipped += 1
+                log["skipped"].append({"url": url, "reason": trap})
+                continue
+            if dedup.add(entry.url):
+                traps.admit(url)
+                stats.sitemap_seeded += 1
+                priority = link_priority(url, depth=1, topic_terms=topic_terms)
+                queue.push((url, domain, base_path, max_depth - 1, deny), priority)
+
+
+def _canonical_for_page(href: str | None, page_url: str, domain: str) -> str | None:
+    canonical = _safe_urljoin(page_url, href) if href else None
+    if not canonical or not _same_domain(canonical, domain):
+        return None
+    canonical = canonicalize_url(canonical)
+    if not canonical:
+        return None
+    # 全ページでトップを canonical 指定しているサイトがあるため、下層ページからトップへの指定は無視する
+    try:
+        if (urlparse(canonical).path or "/") == "/" and (urlparse(page_url).path or "/") != "/":
+            return None
+    except ValueError:
+        return None
+    return canonical
+
+
 def _hash_text(text: str) -> str:
     h = hashlib.sha256()
     h.update((text or "").encode("utf-8"))
@@ -162,112 +229,112 @@ def _hash_bytes(data: bytes) -> str:
     return h.hexdigest()
 
 
-def _chunk_text(text: str, *, chunk_size: int = 800, overlap: int = 120) -> list[str]:
-    t = " ".join((text or "").split())
-    if not t:
-        return []
-    chunks: list[str] = []
-    start = 0
-    while start < len(t):
-        end = min(len(t), start + chunk_size)
-        chunks.append(t[start:end])
-        if end == len(t):
-            break
-        start = max(0, end - overlap)
-    return chunks
-
-
-def _extract_pdf_text(data: bytes) -> tuple[str, str | None]:
-    try:
-        from pypdf import PdfReader  # type: ignore
-    except Exception:
-        PdfReader = None  # type: ignore[assignment]
-    try:
-        from pdfminer.high_level import extract_text  # type: ignore
-    except Exception:
-        extract_text = None  # type: ignore[assignment]
-
-    if PdfReader is None and extract_text is None:
-        return "", "extractor_missing"
-
-    if PdfReader is not None:
-        try:
-            reader = PdfReader(data)
-        except Exception as e:
-            reader = None
-            last_err = f"pypdf:{type(e).__name__}"
-        if reader is not None:
-            parts: list[str] = []
-            for page in reader.pages:
-                try:
-                    parts.append(page.extract_text() or "")
-                except Exception:
-                    continue
-            text = "\n".join([p for p in parts if p]).strip()
-            if text:
-                return text, None
-
-    if extract_text is not None:
-        try:
-            text = extract_text(data) or ""
-        except Exception as e:
-            text = ""
-            last_err = f"pdfminer:{type(e).__name__}"
-        if text.strip():
-            return text.strip(), None
-
-    return "", f"extract_failed:{locals().get('last_err', 'unknown')}"
-    try:
-        reader = PdfReader(data)
-    except Exception:
-        return ""
-    parts: list[str] = []
-    for page in reader.pages:
-        try:
-            parts.append(page.extract_text() or "")
-        except Exception:
-            continue
-    return "\n".join([p for p in parts if p]).strip()
+def _archive(data: bytes, *, kind: str, content_type: str | None = None, encoding: str | None = None) -> RawBody | None:
+    """再抽出用に生の本文を圧縮して持つ（settings.crawl_archive_raw=false なら保存しない）。"""
+    if not settings.crawl_archive_raw:
+        return None
+    return pack_body(data, kind=kind, content_type=content_type, encoding=encoding)
 
 
-def _upsert_document(
-    db: Session,
+def _store_stripped_pages(
     *,
     party_id,
-    url: str,
-    doc_type: str,
-    content_text: str,
-    title: str | None = None,
-) -> models.PolicyDocument:
-    content_hash = _hash_text(content_text)
-    doc = db.scalar(select(models.PolicyDocument).where(models.PolicyDocument.url == url))
-    if doc and doc.hash == content_hash:
-        return doc
-    if not doc:
-        doc = models.PolicyDocument(party_id=party_id, url=url, doc_type=doc_type)
-        db.add(doc)
-    doc.title = title
-    doc.content_text = content_text
-    doc.hash = content_hash
-    db.flush()
-    return doc
-
-
-def _replace_chunks(db: Session, *, doc: models.PolicyDocument, party_id, chunks: Iterable[str]) -> None:
-    db.query(models.PolicyChunk).filter(models.PolicyChunk.doc_id == doc.doc_id).delete()
-    for idx, text in enumerate(chunks):
-        db.add(
-            models.PolicyChunk(
-                doc_id=doc.doc_id,
+    pages: list[tuple[str, str, str | None, RawBody | None, dict]],
+    stripper: BoilerplateStripper,
+    writer: PolicyIndexWriter,
+    stats: CrawlStats,
+    log: dict[str, list[dict]],
+) -> None:
+    # 取得の記録（fetched_html / log["fetched"]）は除去の結果が決まるここで付ける。各ページは fetched か skipped の一方にだけ入る
+    for doc_url, text, title, raw, fetched in pages:
+        stripped, removed = stripper.model_for(doc_url).strip(text)
+        if not stripped:
+            # ページ全体がサイト共通部分（一覧/タグページ等）だった
+            stats.skipped += 1
+            log["skipped"].append({"url": doc_url, "reason": "boilerplate_only"})
+            continue
+        stats.fetched_html += 1
+        log["fetched"].append(fetched)
+        spans = chunk_spans(stripped)
+        if removed:
+            stats.boilerplate_lines_removed += removed
+            stats.boilerplate_chunks_saved += len(chunk_spans(text)) - len(spans)
+            stats.boilerplate_chars_saved += len(text) - len(stripped)
+        writer.add(
+            PendingDocument(
                 party_id=party_id,
-                chunk_index=idx,
-                content=text,
-                embedding=None,
-                meta={"source_url": doc.url, "title": doc.title},
+                url=doc_url,
+                doc_type="html",
+                content_text=stripped,
+                title=title,
+                spans=spans,
+                raw=raw,
+                aliases=(fetched["url"],),
             )
         )
 
 
+def _sync_github_source(
+    *,
+    source: models.PartyPolicySource,
+    site: GithubSite,
+    base_url: str,
+    deny: list[re.Pattern[str]],
+    fetcher: HttpxFetcher,
+    writer: PolicyIndexWriter,
+    visited: set[str],
+    dedup: UrlDeduper,
+    stats: CrawlStats,
+    log: dict[str, list[dict]],
+) -> bool:
+    """GitHub リポジトリ由来のサイトを tarball 1回で取り込む。コミットが前回と同じなら何もしない。
+
+    取り込めなかった場合は False（呼び出し側で contents API による巡回に切り替える）。
+    """
+    try:
+        sha = latest_commit_sha(fetcher.client, site)
+        if sha == source.repo_commit_sha:
+            stats.github_repos_unchanged += 1
+            log["skipped"].append({"url": base_url, "reason": "github_repo_unchanged", "commit": sha})
+            return True
+        files = 0
+        for path, text in iter_markdown_files(fetcher.client, site, sha, prefix=site.repo_path(base_url) or ""):
+            url = site.view_url(path)
+            if any(pat.search(url) for pat in deny):
+                stats.trap_skipped += 1
+                log["skipped"].append({"url": url, "reason": "trap_deny_rule"})
+                continue
+            text_clean = markdown_to_text(text)
+            if not text_clean:
+                stats.skipped += 1
+                log["skipped"].append({"url": url, "reason": "github_file_text_empty"})
+                continue
+            dedup.add(url)
+            visited.add(url_key(url))
+            writer.add(
+                PendingDocument(
+                    party_id=source.party_id,
+                    url=url,
+                    doc_type="markdown",
+                    content_text=text_clean,
+                    title=posixpath.basename(path),
+                    raw=_archive(text.encode("utf-8"), kind="markdown"),
+                )
+            )
+            files += 1
+    except Exception as e:
+        stats.errors += 1
+        log["errors"].append({"url": base_url, "reason": "github_repo_error", "detail": str(e)})
+        return False
+    # 文書を書き込んでからコミットを記録する（途中で失敗したら次回も取り込み直す）
+    writer.flush()
+    source.repo_commit_sha = sha
+    stats.github_repos_synced += 1
+    stats.fetched_html += files
+    log["fetched"].append({"url": base_url, "type": "github_tarball", "commit": sha, "files": files})
+    return True
+
+
 def crawl_party_policy_sources(
     db: Session,
     *,
@@ -285,9 +352,28 @@ def crawl_party_policy_sources(
 
     fetcher = HttpxFetcher(timeout=30)
     stats = CrawlStats()
+    # visited/dedup は正規化キー（url_key）で管理し、表記ゆれURLの重複取得を防ぐ
     visited: set[str] = set()
-    queue: list[tuple[str, str, str, int]] = []
+    dedup = UrlDeduper()
+    traps = TrapDetector()
+    trapped: set[str] = set()
+    # 政策関連度の高いリンクから取得する（settings.crawl_frontier_mode="bfs" で従来の幅優先）
+    queue: CrawlFrontier[tuple[str, str, str, int, list[re.Pattern[str]]]] = CrawlFrontier(settings.crawl_frontier_mode)
+    topic_terms = _active_topic_terms(db)
+    stripper = (
+        BoilerplateStripper(min_pages=settings.boilerplate_min_pages, min_ratio=settings.boilerplate_min_ratio)
+        if settings.boilerplate_strip
+        else None
+    )
+    if stripper is not None:
+        load_learned_lines(db, stripper)
+    # 共通行の学習が済むまで保持する HTML（ホストごとに先頭 settings.boilerplate_warmup_pages 件まで）
+    warmup_html: dict[str, list[tuple[str, str, str | None, RawBody | None, dict]]] = {}
+    # 文書/チャンクは settings.index_write_batch_size 件ごとにまとめて書き込み、その都度 commit する
+    writer = PolicyIndexWriter(db)
     invalid_base_urls: list[str] = []
+    invalid_deny: list[str] = []
+    repo_sources: list[tuple[models.PartyPolicySource, GithubSite, str, str, str, list[re.Pattern[str]]]] = []
     for s in sources:
         base_url = _normalize_url(s.base_url)
         if not base_url:
@@ -297,31 +383,92 @@ def crawl_party_policy_sources(
         except ValueError:
             invalid_base_urls.append(base_url)
             continue
+        base_url = canonicalize_url(base_url) or base_url
         base_path = _base_path_from_url(base_url)
-        queue.append((base_url, pu.netloc, base_path, max_depth))
+        try:
+            deny = compile_deny_patterns(s.deny_patterns or [])
+        except ValueError:
+            deny = []
+            invalid_deny.append(base_url)
+        site = github_site_for(base_url)
+        if site is not None and site.repo_path(base_url) is not None:
+            # GitHub リポジトリ由来のサイトは tarball で一括取得する（下で処理）
+            if dedup.add(base_url):
+                repo_sources.append((s, site, base_url, pu.netloc, base_path, deny))
+            continue
+        if dedup.add(base_url):
+            queue.push((base_url, pu.netloc, base_path, max_depth, deny), BASE_URL_PRIORITY)
 
     log: dict[str, list[dict]] = {"fetched": [], "skipped": [], "errors": []}
     for u in invalid_base_urls:
         stats.skipped += 1
         log["errors"].append({"url": u, "reason": "invalid_base_url"})
-    if not queue:
+    for u in invalid_deny:
+        log["errors"].append({"url": u, "reason": "invalid_deny_patterns"})
+    if not len(queue) and not repo_sources:
         if invalid_base_urls:
             raise ValueError(f"no valid policy source urls (invalid: {', '.join(invalid_base_urls[:3])})")
         raise ValueError("no valid policy source urls")
+    for source, site, base_url, domain, base_path, deny in repo_sources:
+        synced = _sync_github_source(
+            source=source,
+            site=site,
+            base_url=base_url,
+            deny=deny,
+            fetcher=fetcher,
+            writer=writer,
+            visited=visited,
+            dedup=dedup,
+            stats=stats,
+            log=log,
+        )
+        if not synced:
+            queue.push((base_url, domain, base_path, max_depth, deny), BASE_URL_PRIORITY)
+    robots_by_host: dict[str, object] = {}
+    throttle = HostThrottle()
+
+    def _robots_for(u: str):
+        if not settings.crawl_respect_robots:
+            return None
+        host = (urlparse(u).netloc or "").lower()
+        if host not in robots_by_host:
+            robots_by_host[host] = get_robots(fetcher, u)
+        return robots_by_host[host]
+
+    if settings.crawl_use_sitemaps:
+        _seed_from_sitemaps(
+            db,
+            party_id=party_id,
+            sources=[(u, d, bp, dn) for (u, d, bp, _, dn), _ in queue.items()],
+            fetcher=fetcher,
+            robots_for=_robots_for,
+            queue=queue,
+            dedup=dedup,
+            traps=traps,
+            max_depth=max_depth,
+            topic_terms=topic_terms,
+            stats=stats,
+            log=log,
+        )
+
     run_dir = None
     if settings.agent_save_runs:
         run_dir = ensure_run_dir(Path(__file__).resolve().parents[2] / "runs" / "policy_crawl")
-    while queue and len(visited) < max_urls:
-        url, domain, base_path, depth = queue.pop(0)
-        if url in visited:
+    attempted = 0
+    while len(queue) and attempted < max_urls:
+        (url, domain, base_path, depth, deny), priority = queue.pop()
+        key = url_key(url)
+        if key in visited:
             continue
-        visited.add(url)
+        visited.add(key)
+        attempted += 1
 
-        repo_path = _policy_view_repo_path(url)
+        site = github_site_for(url)
+        repo_path = site.repo_path(url) if site is not None else None
         if repo_path is not None:
-            api_url = f"https://api.github.com/repos/team-mirai/policy/contents/{quote(repo_path)}"
+            # tarball で取り込めなかった場合のフォールバック（contents API をディレクトリ/ファイルごとに辿る）
             try:
-                resp = fetcher.client.get(api_url, headers={"Accept": "application/vnd.github.v3+json"})
+                resp = fetcher.client.get(site.contents_api_url(repo_path), headers=api_headers("application/vnd.github.v3+json"))
             except Exception as e:
                 stats.errors += 1
                 log["errors"].append({"url": url, "reason": "github_api_error", "detail": str(e)})
@@ -347,11 +494,12 @@ def crawl_party_policy_sources(
                     item_type = item.get("type")
                     if not path or item_type not in {"file", "dir"}:
                         continue
-                    next_url = _policy_view_url_for_path(path)
-                    if next_url not in visited:
-                        queue.append((next_url, domain, base_path, depth - 1))
+                    next_url = site.view_url(path)
+                    if dedup.add(next_url):
+                        next_priority = link_priority(next_url, anchor_text=path, depth=max_depth - depth + 1, topic_terms=topic_terms)
+                        queue.push((next_url, domain, base_path, depth - 1, deny), next_priority)
                 stats.fetched_html += 1
-                log["fetched"].append({"url": url, "type": "github_dir", "status": status})
+                log["fetched"].append({"url": url, "type": "github_dir", "status": status, "priority": priority})
                 continue
 
             if isinstance(payload, dict) and payload.get("type") == "file":
@@ -370,36 +518,51 @@ def crawl_party_policy_sources(
                     stats.skipped += 1
                     log["skipped"].append({"url": url, "reason": "github_file_empty"})
                     continue
-                text_clean = _markdown_to_text(text)
+                text_clean = markdown_to_text(text)
                 if not text_clean:
                     stats.skipped += 1
                     log["skipped"].append({"url": url, "reason": "github_file_text_empty"})
                     continue
-                doc = _upsert_document(db, party_id=party_id, url=url, doc_type="markdown", content_text=text_clean, title=str(name))
-                _replace_chunks(db, doc=doc, party_id=party_id, chunks=_chunk_text(text_clean))
+                writer.add(
+                    PendingDocument(
+                        party_id=party_id,
+                        url=url,
+                        doc_type="markdown",
+                        content_text=text_clean,
+                        title=str(name),
+                        raw=_archive(raw, kind="markdown"),
+                    )
+                )
                 stats.fetched_html += 1
-                log["fetched"].append({"url": url, "type": "markdown", "status": status})
-                for raw_link in _markdown_links(text):
-                    next_url = _policy_view_resolve_link(repo_path, raw_link)
-                    if next_url and next_url not in visited:
-                        queue.append((next_url, domain, base_path, depth - 1))
+                log["fetched"].append({"url": url, "type": "markdown", "status": status, "priority": priority})
+                for raw_link in markdown_links(text):
+                    next_url = site.resolve_link(repo_path, raw_link)
+                    if next_url and dedup.add(next_url):
+                        next_priority = link_priority(next_url, depth=max_depth - depth + 1, topic_terms=topic_terms)
+                        queue.push((next_url, domain, base_path, depth - 1, deny), next_priority)
                 continue
 
+        robots = _robots_for(url)
+        if robots is not None:
+            if not robots.allowed(url):
+                stats.robots_disallowed += 1
+                log["skipped"].append({"url": url, "reason": "robots_disallowed"})
+                continue
+            throttle.wait(url, robots.crawl_delay)
         try:
-            resp = fetcher.client.get(url, timeout=fetcher.client.timeout)
+            resp = fetcher.fetch_stream(url)
         except Exception as e:
             stats.errors += 1
             log["errors"].append({"url": url, "reason": "fetch_error", "detail": str(e)})
             continue
 
-        status = int(getattr(resp, "status_code", 0) or 0)
+        status = resp.status
         if status < 200 or status >= 400:
             stats.skipped += 1
             entry: dict = {"url": url, "reason": f"http_{status}"}
             if status in {401, 403, 429}:
                 try:
-                    body = (resp.content or b"")[:8000]
-                    snippet = body.decode(resp.encoding or "utf-8", errors="ignore").strip()
+                    snippet = resp.text().strip()
                     if snippet:
                         entry["body_snippet"] = snippet[:800]
                 except Exception:
@@ -410,62 +573,117 @@ def crawl_party_policy_sources(
                         entry[hk] = hv
             log["skipped"].append(entry)
             continue
+        if resp.skipped_reason:
+            # 本文を読む前に種別/サイズで打ち切ったもの（動画/画像/巨大ファイル等）
+            stats.skipped += 1
+            reason = "non_html" if resp.skipped_reason == "unsupported_type" else resp.skipped_reason
+            log["skipped"].append({"url": url, "reason": reason, "content_type": resp.content_type, "size": resp.size})
+            continue
 
-        content_type = (resp.headers.get("content-type") or "").lower()
-        body = resp.content or b""
-        if url.lower().endswith(".pdf") or "application/pdf" in content_type:
-            text, err = _extract_pdf_text(body)
-            if not text:
+        # リダイレクト先が既に処理済みなら同一ページとして扱う
+        doc_url = url
+        final_url = canonicalize_url(resp.url) or url
+        final_key = url_key(final_url)
+        if final_key and final_key != key:
+            if final_key in visited:
+                resp.close()
+                stats.duplicates += 1
+                log["skipped"].append({"url": url, "reason": "duplicate_redirect", "final_url": final_url})
+                continue
+            dedup.alias(final_url)
+            visited.add(final_key)
+            doc_url = final_url
+
+        if resp.kind == "pdf":
+            pdf = extract_pdf_text(resp.open())
+            if pdf.cached:
+                stats.pdf_cache_hits += 1
+            if not pdf.text:
                 saved_path = None
-                if run_dir is not None:
-                    digest = _hash_bytes(body)[:12]
-                    saved_path = str(run_dir / f"pdf_failed_{digest}.pdf")
+                if run_dir is not None and not pdf.cached:
+                    saved_path = str(run_dir / f"pdf_failed_{pdf.sha256[:12]}.pdf")
                     try:
-                        Path(saved_path).write_bytes(body)
+                        resp.save_to(saved_path)
                     except Exception:
                         saved_path = None
+                resp.close()
                 stats.skipped += 1
-                entry = {"url": url, "reason": err or "pdf_text_empty"}
+                entry = {"url": url, "reason": pdf.error or "pdf_text_empty"}
                 if saved_path:
                     entry["saved_path"] = saved_path
                 log["skipped"].append(entry)
                 continue
-            doc = _upsert_document(db, party_id=party_id, url=url, doc_type="pdf", content_text=text, title=None)
-            _replace_chunks(db, doc=doc, party_id=party_id, chunks=_chunk_text(text))
+            # PDF は大きいので一時ファイルから少しずつハッシュ・圧縮して先に保存し、文書には内容ハッシュだけ持たせる
+            raw_hash = None
+            if settings.crawl_archive_raw:
+                raw_hash = writer.archive_stream(doc_url, resp.open(), kind="pdf", content_type=resp.content_type)
+            resp.close()
+            writer.add(
+                PendingDocument(party_id=party_id, url=doc_url, doc_type="pdf", content_text=pdf.text, raw_hash=raw_hash, aliases=(url,))
+            )
             stats.fetched_pdf += 1
-            log["fetched"].append({"url": url, "type": "pdf", "status": status})
+            log["fetched"].append({"url": url, "type": "pdf", "status": status, "priority": priority, "pdf_cached": pdf.cached})
             continue
 
-        is_markdown = "text/markdown" in content_type or url.lower().endswith(".md") or url.lower().endswith(".md/")
-        is_text = "text/plain" in content_type
-        if (not is_markdown) and (not is_text) and "text/html" not in content_type and not url.endswith("/"):
-            stats.skipped += 1
-            log["skipped"].append({"url": url, "reason": "non_html"})
-            continue
-        html = body.decode(resp.encoding or "utf-8", errors="ignore")
-        text = _markdown_to_text(html) if is_markdown else html_to_text(html)
+        is_markdown = resp.kind == "markdown"
+        is_text = resp.kind == "text"
+        body = resp.text()
+        raw_body = _archive(resp.read_bytes(), kind=resp.kind, content_type=resp.content_type, encoding=resp.encoding)
+        resp.close()
+        anchors: dict[str, str] = {}
+        title = None
+        if is_markdown:
+            text = markdown_to_text(body)
+            link_candidates = markdown_links(body)
+        else:
+            page = parse_html(body)
+            text = page.text
+            title = page.title or None
+            anchors = page.anchors
+            # HTML内に埋まったURL（markdownやJSON）も拾う
+            link_candidates = page.links + page.embedded_links
+            canonical = _canonical_for_page(page.canonical, doc_url, domain) if not is_text else None
+            if canonical:
+                canonical_key = url_key(canonical)
+                if canonical_key != url_key(doc_url):
+                    if canonical_key in visited:
+                        stats.duplicates += 1
+                        log["skipped"].append({"url": url, "reason": "duplicate_canonical", "canonical": canonical})
+                        continue
+                    dedup.alias(canonical)
+                    visited.add(canonical_key)
+                doc_url = canonical
         if not text:
             stats.skipped += 1
             log["skipped"].append({"url": url, "reason": "html_text_empty"})
         else:
             doc_type = "markdown" if is_markdown else ("text" if is_text else "html")
-            doc = _upsert_document(db, party_id=party_id, url=url, doc_type=doc_type, content_text=text, title=None)
-            _replace_chunks(db, doc=doc, party_id=party_id, chunks=_chunk_text(text))
-            stats.fetched_html += 1
-            log["fetched"].append({"url": url, "type": doc_type, "status": status})
+            fetched = {"url": url, "type": doc_type, "status": status, "priority": priority}
+            if doc_type == "html" and stripper is not None:
+                # サイト共通のメニュー/フッターはホストの先頭ページから学習する。学習中のページだけ保持し、
+                # 学習が済んだらまとめて、以後は取得ごとに除去して書き込む（モデルは以後固定）
+                model = stripper.model_for(doc_url)
+                page_entry = (doc_url, text, title, raw_body, fetched)
+                if model.pages < settings.boilerplate_warmup_pages:
+                    model.add(text)
+                    held = warmup_html.setdefault(host_key(doc_url), [])
+                    held.append(page_entry)
+                    if model.pages >= settings.boilerplate_warmup_pages:
+                        _store_stripped_pages(party_id=party_id, pages=held, stripper=stripper, writer=writer, stats=stats, log=log)
+                        held.clear()
+                else:
+                    _store_stripped_pages(party_id=party_id, pages=[page_entry], stripper=stripper, writer=writer, stats=stats, log=log)
+            else:
+                writer.add(
+                    PendingDocument(
+                        party_id=party_id, url=doc_url, doc_type=doc_type, content_text=text, title=title, raw=raw_body, aliases=(url,)
+                    )
+                )
+                stats.fetched_html += 1
+                log["fetched"].append(fetched)
 
         if depth <= 0:
             continue
-        link_candidates: list[str] = []
-        if is_markdown:
-            link_candidates.extend(_markdown_links(html))
-        else:
-            extractor = _LinkExtractor()
-            extractor.feed(html)
-            link_candidates.extend(extractor.links)
-            # HTML内に埋まったURL（markdownやJSON）も拾う
-            link_candidates.extend(_markdown_links(html))
-
         for raw in link_candidates:
             href = _normalize_url(raw)
             if not href:
@@ -474,7 +692,7 @@ def crawl_party_policy_sources(
                 stats.skipped += 1
                 log["skipped"].append({"url": href, "reason": "skip_non_http"})
                 continue
-            next_url = _safe_urljoin(url, href)
+            next_url = _safe_urljoin(final_url, href)
             if not next_url:
                 stats.skipped += 1
                 log["skipped"].append({"url": href, "reason": "invalid_url"})
@@ -487,14 +705,72 @@ def crawl_party_policy_sources(
                 continue
             if not _path_allowed(next_url, base_path):
                 continue
-            if next_url not in visited:
-                queue.append((next_url, domain, base_path, depth - 1))
-
+            # 重複取得を抑止した件数は表記ゆれごとに数えるため、dedup には正規化前のURLを渡す
+            link_url = next_url
+            next_url = canonicalize_url(next_url) or next_url
+            if dedup.seen(next_url):
+                dedup.add(link_url)
+                continue
+            next_key = url_key(next_url)
+            if next_key in trapped:
+                continue
+            trap = traps.check(next_url, deny)
+            if trap:
+                trapped.add(next_key)
+                stats.trap_skipped += 1
+                log["skipped"].append({"url": next_url, "reason": trap})
+                continue
+            if dedup.add(link_url):
+                traps.admit(next_url)
+                next_priority = link_priority(
+                    next_url,
+                    anchor_text=anchors.get(raw, ""),
+                    depth=max_depth - depth + 1,
+                    topic_terms=topic_terms,
+                )
+                queue.push((next_url, domain, base_path, depth - 1, deny), next_priority)
+
+    if stripper is not None:
+        # ページ数が学習件数に届かなかったホストの分
+        for held in warmup_html.values():
+            _store_stripped_pages(party_id=party_id, pages=held, stripper=stripper, writer=writer, stats=stats, log=log)
+
+    written = writer.close()
+    if stripper is not None:
+        save_learned_lines(db, stripper)
+    stats.near_duplicates = written.near_duplicates
+    stats.chunks_inserted = written.chunks_inserted
+    stats.chunks_kept = written.chunks_kept + written.chunks_updated
+    stats.chunks_deleted = written.chunks_deleted
+    stats.write_batches = written.batches
+    stats.write_rows_per_sec = written.rows_per_sec
+    stats.raw_archived = written.raw_archived
+    stats.raw_bytes_archived = written.raw_bytes_archived
+    log["skipped"].extend(writer.skipped)
+    stats.fetches_saved = dedup.fetches_saved
     db.commit()
 
+    if writer.changed_party_ids:
+        # チャンクが変わった政党の分だけ、有効なトピックの上位チャンク（topic_party_chunks）を作り直す
+        try:
+            refreshed = topic_chunks.refresh_topic_chunks(db, party_ids=list(writer.changed_party_ids))
+            stats.topic_chunks_refreshed = refreshed.refreshed_pairs
+        except Exception as e:
+            db.rollback()
+            log["errors"].append({"url": "", "reason": f"topic_chunks_refresh_failed: {type(e).__name__}: {e}"})
+
     if settings.agent_save_runs:
         if run_dir is None:
             run_dir = ensure_run_dir(Path(__file__).resolve().parents[2] / "runs" / "policy_crawl")
-        save_json(True, run_dir / f"crawl_{party_id}.json", {"stats": stats.__dict__, "log": log})
+        save_json(
+            True,
+            run_dir / f"crawl_{party_id}.json",
+            {
+                "stats": stats.__dict__,
+                "traps": traps.hits,
+                "boilerplate": stripper.summary() if stripper is not None else {},
+                "log": log,
+            },
+        )
 
     return stats
@@ -1,18 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import Float, Integer, bindparam, column, func, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import Session
+from sqlalchemy.types import Text
 
 from ..db import models
+from ..settings import settings
+from . import chunk_bm25, embeddings
 
 
 @dataclass
 class PolicyChunkHit:
     chunk: models.PolicyChunk
     rank: float
+    # 指定の方式で引けず bi-gram 検索に切り替えたときの理由（timeout / embed_error / no_vectors / bm25_unavailable）
+    fallback: str | None = None
 
 
 def _normalize_queries(queries: Iterable[str]) -> list[str]:
@@ -27,6 +34,211 @@ def _normalize_queries(queries: Iterable[str]) -> list[str]:
     return out
 
 
+def _rank_rows(db: Session, *, party_id, tsv, tsq, limit: int) -> list[tuple[models.PolicyChunk, float]]:
+    non_deprecated = func.coalesce(models.PolicyChunk.meta.op("->>")("deprecated"), "false") != "true"
+    rank = func.ts_rank_cd(tsv, tsq)
+    stmt = (
+        select(models.PolicyChunk, rank.label("rank"))
+        .where(models.PolicyChunk.party_id == party_id)
+        .where(non_deprecated)
+        .where(tsv.op("@@")(tsq))
+        .order_by(rank.desc())
+        .limit(max(1, int(limit)))
+    )
+    return [(chunk, float(score or 0.0)) for chunk, score in db.execute(stmt).all()]
+
+
+def _search_simple(db: Session, *, party_id, q: str, limit: int) -> list[tuple[models.PolicyChunk, float]]:
+    """従来方式: 'simple' 設定の全文検索、ヒットが無ければ ILIKE の全件走査。"""
+    tsv = func.to_tsvector("simple", models.PolicyChunk.content)
+    rows = _rank_rows(db, party_id=party_id, tsv=tsv, tsq=func.plainto_tsquery("simple", q), limit=limit)
+    if rows:
+        return rows
+    non_deprecated = func.coalesce(models.PolicyChunk.meta.op("->>")("deprecated"), "false") != "true"
+    ilike_stmt = (
+        select(models.PolicyChunk)
+        .where(models.PolicyChunk.party_id == party_id)
+        .where(non_deprecated)
+        .where(models.PolicyChunk.content.ilike(f"%{q}%"))
+        .limit(max(1, int(limit)))
+    )
+    return [(chunk, 0.0) for chunk in db.scalars(ilike_stmt).all()]
+
+
+def _search_bigram(db: Session, *, party_id, q: str, limit: int) -> list[tuple[models.PolicyChunk, float]]:
+    """文字 bi-gram の保存列 content_tsv と (party_id, content_tsv) の索引で検索する。
+
+    まず空白区切りの各語を部分一致で AND 検索し、ヒットが無ければいずれかの bi-gram を含むものを順位順に返す。
+    """
+    tsv = models.PolicyChunk.content_tsv
+    for mode in ("all", "any"):
+        rows = _rank_rows(db, party_id=party_id, tsv=tsv, tsq=func.ja_bigram_tsquery(q, mode), limit=limit)
+        if rows:
+            return rows
+    return []
+
+
+def _load_ranked(db: Session, ranked: Sequence[tuple[str, float]]) -> list[tuple[models.PolicyChunk, float]]:
+    if not ranked:
+        return []
+    ids = list(dict.fromkeys(cid for cid, _ in ranked))
+    chunks = {str(c.chunk_id): c for c in db.scalars(select(models.PolicyChunk).where(models.PolicyChunk.chunk_id.in_(ids)))}
+    return [(chunks[cid], score) for cid, score in ranked if cid in chunks]
+
+
+def _search_bm25(db: Session, *, party_id, q: str, limit: int) -> list[tuple[models.PolicyChunk, float]]:
+    """プロセス内の BM25 索引（chunk_bm25）で検索する。索引を使えない環境では bi-gram 検索にする。"""
+    return _search_with_fallback(db, "bm25", party_id=party_id, q=q, limit=limit)[0]
+
+
+def _vector_rows(db: Session, *, party_id, q: str, limit: int) -> tuple[list[tuple[models.PolicyChunk, float]], str | None]:
+    """埋め込みのコサイン距離で近い順に返す。順位は 1 - コサイン距離。
+
+    政党のチャンクは多くても数千件なので、政党で絞った行（btree 索引）を MATERIALIZED CTE に取り出してから
+    全件の距離で並べる（近似索引は使わない）。近似索引で全政党から近傍を取ってから政党で絞ると、
+    小さい政党では k 件に届かず結果も実行ごとに揺れるため。
+    (行, 空の理由) を返す。理由は vector_search_timeout_ms を超えた "timeout"、
+    クエリを埋め込めなかった（API/ネットワークのエラー）"embed_error"、その政党にベクトルがまだ無い "no_vectors"。
+    """
+    embedder = embeddings.get_embedder()
+    try:
+        query_vec = embeddings.embed_query(embedder, q)
+    except Exception:
+        # 埋め込み API の失敗で採点全体を止めない（呼び出し側が bi-gram 検索に切り替え、理由を残す）
+        return [], "embed_error"
+    C = models.PolicyChunk
+    non_deprecated = func.coalesce(C.meta.op("->>")("deprecated"), "false") != "true"
+    candidates = (
+        select(C.chunk_id, C.embedding)
+        .where(C.party_id == party_id)
+        .where(C.embedding_model == embedder.name)
+        .where(non_deprecated)
+        .cte("candidates")
+        .prefix_with("MATERIALIZED")
+    )
+    distance = candidates.c.embedding.op("<=>", return_type=Float)(query_vec)
+    stmt = (
+        select(C, (1.0 - distance).label("rank"))
+        .join(candidates, C.chunk_id == candidates.c.chunk_id)
+        .order_by(distance, C.chunk_id)
+        .limit(max(1, int(limit)))
+    )
+    try:
+        # 時間上限はセーブポイント内で変え、終わったら戻す（タイムアウト時はセーブポイントの巻き戻しで戻る）
+        with db.begin_nested():
+            prev = db.execute(text("SELECT current_setting('statement_timeout')")).scalar_one()
+            db.execute(
+                text("SELECT set_config('statement_timeout', :t, true)"),
+                {"t": str(max(1, int(settings.vector_search_timeout_ms)))},
+            )
+            rows = [(chunk, float(score or 0.0)) for chunk, score in db.execute(stmt).all()]
+            db.execute(text("SELECT set_config('statement_timeout', :t, true)"), {"t": prev})
+    except OperationalError:
+        return [], "timeout"
+    return rows, (None if rows else "no_vectors")
+
+
+def _search_vector(db: Session, *, party_id, q: str, limit: int) -> list[tuple[models.PolicyChunk, float]]:
+    """ベクトル検索。時間上限を超えたか、その政党にベクトルがまだ無い場合は bi-gram 検索にする。"""
+    return _search_with_fallback(db, "vector", party_id=party_id, q=q, limit=limit)[0]
+
+
+def _search_with_fallback(
+    db: Session, key: str, *, party_id, q: str, limit: int
+) -> tuple[list[tuple[models.PolicyChunk, float]], str | None]:
+    """方式 key で検索する。bi-gram 検索に切り替えた場合はその理由も返す（切り替えなければ None）。"""
+    if key == "vector":
+        rows, reason = _vector_rows(db, party_id=party_id, q=q, limit=limit)
+        if reason is None:
+            return rows, None
+        return _search_bigram(db, party_id=party_id, q=q, limit=limit), reason
+    if key == "bm25":
+        index = chunk_bm25.get_index()
+        if index is None:
+            return _search_bigram(db, party_id=party_id, q=q, limit=limit), "bm25_unavailable"
+        return _load_ranked(db, index.search(party_id, q, limit)), None
+    return SEARCH_MODES.get(key, _search_bigram)(db, party_id=party_id, q=q, limit=limit), None
+
+
+SEARCH_MODES = {"bigram": _search_bigram, "simple": _search_simple, "bm25": _search_bm25, "vector": _search_vector}
+# 複数の順位リストを融合する方式（search_policy_chunks の hybrid）
+HYBRID_MODE = "hybrid"
+# Reciprocal Rank Fusion の定数（1 / (RRF_K + 順位) を足し合わせる）
+RRF_K = 60
+
+_similarity_embedder = embeddings.HashingEmbedder()
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[models.PolicyChunk]], *, k: int = RRF_K) -> list[PolicyChunkHit]:
+    scores: dict[str, float] = {}
+    chunks: dict[str, models.PolicyChunk] = {}
+    for ranking in rankings:
+        for pos, chunk in enumerate(ranking, start=1):
+            key = str(chunk.chunk_id)
+            chunks[key] = chunk
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + pos)
+    return [PolicyChunkHit(chunk=chunks[key], rank=score) for key, score in sorted(scores.items(), key=lambda kv: kv[1], reverse=True)]
+
+
+def diversify_hits(hits: Sequence[PolicyChunkHit], *, max_total: int, per_doc: int, lam: float) -> list[PolicyChunkHit]:
+    """MMR で選ぶ: 関連度（最大値で正規化）と、選択済みチャンクとの類似度の最大値の重み付き差が大きい順。
+
+    類似度は本文の bi-gram ハッシュ埋め込みのコサイン（隣り合うチャンクの重なりはコサインに表れる）。
+    1文書から選ぶのは per_doc 件まで。隣り合うチャンクを同一とみなすと、段落がチャンク境界をまたぐとき
+    後半のチャンクが無関係なチャンクより後ろに回ってしまう。
+    """
+    if not hits:
+        return []
+    top = max(h.rank for h in hits) or 1.0
+    vectors = _similarity_embedder.embed([h.chunk.content or "" for h in hits])
+    remaining = list(range(len(hits)))
+    chosen: list[int] = []
+    per_doc_count: dict[str, int] = {}
+    while remaining and len(chosen) < max_total:
+        best, best_score = None, None
+        for i in remaining:
+            doc = str(hits[i].chunk.doc_id)
+            if per_doc_count.get(doc, 0) >= per_doc:
+                continue
+            sim = max((sum(a * b for a, b in zip(vectors[i], vectors[j])) for j in chosen), default=0.0)
+            score = lam * hits[i].rank / top - (1.0 - lam) * sim
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        chosen.append(best)
+        remaining.remove(best)
+        doc = str(hits[best].chunk.doc_id)
+        per_doc_count[doc] = per_doc_count.get(doc, 0) + 1
+    return [hits[i] for i in chosen]
+
+
+def _search_hybrid(db: Session, *, party_id, queries: Sequence[str], per_query: int, max_total: int) -> list[PolicyChunkHit]:
+    """字句（bi-gram）とベクトル（無ければ BM25）の順位をクエリごとに取り、RRF で融合してから MMR で絞る。"""
+    depth = max(int(per_query) * 3, 10)
+    bm25 = None
+    rankings: list[list[models.PolicyChunk]] = []
+    fallback: str | None = None
+    for q in queries:
+        rankings.append([c for c, _ in _search_bigram(db, party_id=party_id, q=q, limit=depth)])
+        dense, reason = _vector_rows(db, party_id=party_id, q=q, limit=depth)
+        if reason is not None:
+            fallback = fallback or reason
+            bm25 = bm25 or chunk_bm25.get_index()
+            if bm25 is not None:
+                dense = _load_ranked(db, bm25.search(party_id, q, depth))
+        rankings.append([c for c, _ in dense])
+    hits = diversify_hits(
+        reciprocal_rank_fusion(r for r in rankings if r),
+        max_total=max(1, int(max_total)),
+        per_doc=max(1, int(settings.policy_search_max_chunks_per_doc)),
+        lam=float(settings.policy_search_mmr_lambda),
+    )
+    for hit in hits:
+        hit.fallback = fallback
+    return hits
+
+
 def search_policy_chunks(
     db: Session,
     *,
@@ -34,42 +246,198 @@ def search_policy_chunks(
     queries: Sequence[str],
     per_query: int = 3,
     max_total: int = 6,
+    mode: str | None = None,
 ) -> list[PolicyChunkHit]:
     norm_queries = _normalize_queries(queries)
     if not norm_queries:
         return []
 
+    key = (mode or settings.policy_search_mode or "bigram").lower()
+    if key == HYBRID_MODE:
+        return _search_hybrid(db, party_id=party_id, queries=norm_queries, per_query=per_query, max_total=max_total)
     hits: dict[str, PolicyChunkHit] = {}
-    tsv = func.to_tsvector("simple", models.PolicyChunk.content)
-    non_deprecated = func.coalesce(models.PolicyChunk.meta.op("->>")("deprecated"), "false") != "true"
     for q in norm_queries:
-        tsq = func.plainto_tsquery("simple", q)
-        rank = func.ts_rank_cd(tsv, tsq)
-        stmt = (
-            select(models.PolicyChunk, rank.label("rank"))
-            .where(models.PolicyChunk.party_id == party_id)
-            .where(non_deprecated)
-            .where(tsv.op("@@")(tsq))
-            .order_by(rank.desc())
-            .limit(max(1, int(per_query)))
-        )
-        rows = db.execute(stmt).all()
-        if not rows:
-            ilike_stmt = (
-                select(models.PolicyChunk)
-                .where(models.PolicyChunk.party_id == party_id)
-                .where(non_deprecated)
-                .where(models.PolicyChunk.content.ilike(f"%{q}%"))
-                .limit(max(1, int(per_query)))
-            )
-            rows = [(chunk, 0.0) for chunk in db.scalars(ilike_stmt).all()]
-        for chunk, score_val in rows:
-            score = float(score_val or 0.0)
-            key = str(chunk.chunk_id)
-            existing = hits.get(key)
+        rows, fallback = _search_with_fallback(db, key, party_id=party_id, q=q, limit=per_query)
+        for chunk, score in rows:
+            chunk_key = str(chunk.chunk_id)
+            existing = hits.get(chunk_key)
             if existing and existing.rank >= score:
                 continue
-            hits[key] = PolicyChunkHit(chunk=chunk, rank=score)
+            hits[chunk_key] = PolicyChunkHit(chunk=chunk, rank=score, fallback=fallback)
 
     ordered = sorted(hits.values(), key=lambda h: h.rank, reverse=True)
     return ordered[: max(1, int(max_total))]
+
+
+@dataclass
+class MultiPartySearchResult:
+    hits_by_party: dict[str, list[PolicyChunkHit]] = field(default_factory=dict)
+    statements: int = 0
+    # 政党ごと・クエリごとに search_policy_chunks で引いた場合の SQL 数（第2段の検索を含む）
+    legacy_round_trips: int = 0
+
+    @property
+    def round_trips_saved(self) -> int:
+        return max(0, self.legacy_round_trips - self.statements)
+
+    def hits_for(self, party_id) -> list[PolicyChunkHit]:
+        return self.hits_by_party.get(str(party_id), [])
+
+
+# 方式ごとの (第1段, 第2段)。各段は (FROM に足す tsquery, 一致条件, 順位)。q.term がクエリ。第2段は第1段が0件の (政党, クエリ) だけ引く
+_MULTI_STAGES: dict[str, tuple[tuple[str, str, str], tuple[str, str, str]]] = {
+    "bigram": (
+        (", ja_bigram_tsquery(q.term, 'all') AS tq", "c.content_tsv @@ tq", "ts_rank_cd(c.content_tsv, tq)"),
+        (", ja_bigram_tsquery(q.term, 'any') AS tq", "c.content_tsv @@ tq", "ts_rank_cd(c.content_tsv, tq)"),
+    ),
+    # c.content は本文の複製を持つ行にしか無いので、本文は policy_chunk_body() で引く
+    "simple": (
+        (
+            ", plainto_tsquery('simple', q.term) AS tq",
+            "to_tsvector('simple', policy_chunk_body(c.content, c.doc_id, c.start_offset, c.end_offset)) @@ tq",
+            "ts_rank_cd(to_tsvector('simple', policy_chunk_body(c.content, c.doc_id, c.start_offset, c.end_offset)), tq)",
+        ),
+        ("", "policy_chunk_body(c.content, c.doc_id, c.start_offset, c.end_offset) ILIKE '%' || q.term || '%'", "CAST(0 AS real)"),
+    ),
+}
+
+
+def _stage_sql(pairs: str, stage: tuple[str, str, str]) -> str:
+    tq, match, rank = stage
+    return f"""
+      SELECT q.party_id, q.qi, h.chunk_id, h.rank
+      FROM {pairs} q
+      CROSS JOIN LATERAL (
+        SELECT c.chunk_id, {rank} AS rank
+        FROM policy_chunks c{tq}
+        WHERE c.party_id = q.party_id
+          AND coalesce(c.meta ->> 'deprecated', 'false') <> 'true'
+          AND {match}
+        ORDER BY rank DESC
+        LIMIT :per_query
+      ) h"""
+
+
+def _multi_search_sql(mode: str) -> str:
+    first, second = _MULTI_STAGES[mode]
+    return f"""
+    WITH pairs AS (
+      SELECT p.party_id, t.term, t.qi
+      FROM (SELECT DISTINCT unnest(CAST(:party_ids AS uuid[])) AS party_id) p
+      CROSS JOIN unnest(CAST(:queries AS text[])) WITH ORDINALITY AS t(term, qi)
+    ),
+    first_hits AS ({_stage_sql("pairs", first)}
+    ),
+    missed AS (
+      SELECT * FROM pairs
+      WHERE NOT EXISTS (SELECT 1 FROM first_hits f WHERE f.party_id = pairs.party_id AND f.qi = pairs.qi)
+    ),
+    second_hits AS ({_stage_sql("missed", second)}
+    ),
+    best AS (
+      SELECT DISTINCT ON (party_id, chunk_id) party_id, chunk_id, rank, qi
+      FROM (SELECT * FROM first_hits UNION ALL SELECT * FROM second_hits) h
+      ORDER BY party_id, chunk_id, rank DESC, qi
+    )
+    SELECT party_id, chunk_id, rank,
+           row_number() OVER (PARTITION BY party_id ORDER BY rank DESC, qi, chunk_id) AS pos,
+           (SELECT count(*) FROM missed) AS missed_pairs
+    FROM best
+    """
+
+
+def _multi_bm25(
+    db: Session,
+    index: chunk_bm25.Bm25Index,
+    result: MultiPartySearchResult,
+    queries: Sequence[str],
+    *,
+    per_query: int,
+    max_total: int,
+) -> MultiPartySearchResult:
+    """BM25 索引はプロセス内で引き、全政党分のチャンクを1文で読み込む。"""
+    ranked_by_party: dict[str, list[tuple[str, float]]] = {}
+    for party in result.hits_by_party:
+        best: dict[str, float] = {}
+        for q in queries:
+            for cid, score in index.search(party, q, per_query):
+                best[cid] = max(score, best.get(cid, score))
+        ranked_by_party[party] = sorted(best.items(), key=lambda r: r[1], reverse=True)[: max(1, int(max_total))]
+    loaded = _load_ranked(db, [r for ranked in ranked_by_party.values() for r in ranked])
+    chunks = {str(chunk.chunk_id): chunk for chunk, _ in loaded}
+    result.statements = 1 if loaded else 0
+    for party, ranked in ranked_by_party.items():
+        result.hits_by_party[party] = [PolicyChunkHit(chunk=chunks[cid], rank=score) for cid, score in ranked if cid in chunks]
+    result.legacy_round_trips = len(result.hits_by_party) * len(queries)
+    return result
+
+
+def search_policy_chunks_multi(
+    db: Session,
+    *,
+    party_ids: Sequence[Any],
+    queries: Sequence[str],
+    per_query: int = 3,
+    max_total: int = 6,
+    mode: str | None = None,
+) -> MultiPartySearchResult:
+    """複数政党 × 複数クエリの検索を1文の SQL で行う（政党ごとに search_policy_chunks を呼ぶのと同じ結果）。
+
+    (政党, クエリ) ごとに LATERAL で上位 per_query 件を取り、第1段が0件の組だけ第2段で引き直す。
+    政党ごとにチャンクの重複を最高順位で除き、順位順に max_total 件までを返す。
+    """
+    norm_queries = _normalize_queries(queries)
+    parties = list(dict.fromkeys(str(p) for p in party_ids if p is not None))
+    result = MultiPartySearchResult(hits_by_party={p: [] for p in parties})
+    if not norm_queries or not parties:
+        return result
+
+    key = (mode or settings.policy_search_mode or "bigram").lower()
+    fallback: str | None = None
+    if key == "bm25":
+        index = chunk_bm25.get_index()
+        if index is not None:
+            return _multi_bm25(db, index, result, norm_queries, per_query=per_query, max_total=max_total)
+        fallback = "bm25_unavailable"
+    if key in {"vector", HYBRID_MODE}:
+        # クエリの埋め込みはキャッシュされるので、政党ごとに引いても埋め込みは1クエリ1回
+        for party in parties:
+            result.hits_by_party[party] = search_policy_chunks(
+                db, party_id=party, queries=norm_queries, per_query=per_query, max_total=max_total, mode=key
+            )
+        result.statements = result.legacy_round_trips = len(parties) * len(norm_queries)
+        return result
+    top = (
+        text(_multi_search_sql(key if key in _MULTI_STAGES else "bigram"))
+        .bindparams(
+            bindparam("party_ids", type_=ARRAY(UUID(as_uuid=False))),
+            bindparam("queries", type_=ARRAY(Text)),
+        )
+        .columns(
+            column("party_id", UUID(as_uuid=False)),
+            column("chunk_id", UUID(as_uuid=False)),
+            column("rank", Float),
+            column("pos", Integer),
+            column("missed_pairs", Integer),
+        )
+        .subquery("top")
+    )
+    stmt = (
+        select(models.PolicyChunk, top.c.party_id, top.c.rank, top.c.missed_pairs)
+        .join(top, models.PolicyChunk.chunk_id == top.c.chunk_id)
+        .where(top.c.pos <= max(1, int(max_total)))
+        .order_by(top.c.party_id, top.c.pos)
+    )
+    pairs = len(parties) * len(norm_queries)
+    missed = pairs
+    for chunk, party_id, score, missed_pairs in db.execute(
+        stmt,
+        {"party_ids": parties, "queries": norm_queries, "per_query": max(1, int(per_query))},
+    ):
+        result.hits_by_party.setdefault(str(party_id), []).append(
+            PolicyChunkHit(chunk=chunk, rank=float(score or 0.0), fallback=fallback)
+        )
+        missed = int(missed_pairs)
+    result.statements = 1
+    result.legacy_round_trips = pairs + missed
+    return result
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..agents.text_extract import markdown_to_text, parse_html
+from ..db import models
+from ..settings import settings
+from .boilerplate import BoilerplateStripper, load_learned_lines
+from .chunking import chunk_spans
+from .index_writer import PendingDocument, PolicyIndexWriter
+from .pdf_extract import extract_pdf_text
+from .raw_archive import load_bodies, unpack_body
+
+
+@dataclass
+class ReextractStats:
+    parties: int = 0
+    documents: int = 0
+    missing_raw: int = 0
+    extract_failed: int = 0
+    boilerplate_only: int = 0
+    boilerplate_lines_removed: int = 0
+    documents_written: int = 0
+    near_duplicates: int = 0
+    chunks_inserted: int = 0
+    chunks_kept: int = 0
+    chunks_deleted: int = 0
+    elapsed_sec: float = 0.0
+
+
+def _extract_worker(kind: str, compressed: bytes, encoding: str | None) -> tuple[str, str | None]:
+    """子プロセス側で HTML/markdown/テキストの本文を取り出す（クロール時と同じ処理）。"""
+    body = unpack_body(compressed).decode(encoding or "utf-8", errors="ignore")
+    if kind == "markdown":
+        return markdown_to_text(body), None
+    page = parse_html(body)
+    return page.text, page.title or None
+
+
+def _extract_pdf(compressed: bytes, refresh: bool) -> tuple[str, str | None]:
+    return extract_pdf_text(unpack_body(compressed), refresh=refresh).text, None
+
+
+def reextract_policy_documents(
+    db: Session,
+    *,
+    party_id=None,
+    workers: int | None = None,
+    refresh_pdf: bool = False,
+    batch_size: int | None = None,
+) -> ReextractStats:
+    """source_snapshots に保存した生の本文から文書とチャンクを作り直す（ネットワークは使わない）。
+
+    抽出は生の本文（内容ハッシュ）ごとに1回、HTML等はプロセスプール、PDF は pdf_extract のプールで並列に行う。
+    HTML のサイト共通行はクロール時と同様に政党ごと・ホストごとに学習し直して除去する。
+    生の本文が無い文書（アーカイブ導入前に取得したもの等）はそのまま残す。
+    """
+    started = time.perf_counter()
+    stats = ReextractStats()
+    D = models.PolicyDocument
+    q = select(D.doc_id, D.party_id, D.url, D.doc_type, D.title, D.raw_hash)
+    if party_id is not None:
+        q = q.where(D.party_id == party_id)
+    by_party: dict[object, list] = {}
+    for row in db.execute(q.order_by(D.fetched_at.asc())):
+        stats.documents += 1
+        if not row.raw_hash:
+            stats.missing_raw += 1
+            continue
+        by_party.setdefault(row.party_id, []).append(row)
+
+    writer = PolicyIndexWriter(db, batch_size=batch_size, rebuild=True)
+    ctx = multiprocessing.get_context("spawn")
+    procs = ProcessPoolExecutor(max_workers=max(1, workers or multiprocessing.cpu_count()), mp_context=ctx)
+    threads = ThreadPoolExecutor(max_workers=max(1, int(settings.pdf_extract_workers)))
+    with procs, threads:
+        for pid, docs in by_party.items():
+            stats.parties += 1
+            bodies = load_bodies(db, (d.raw_hash for d in docs))
+            # 同じ本文は1回だけ抽出する
+            futures = {}
+            for h, (compressed, meta) in bodies.items():
+                kind = meta.get("kind") or "html"
+                if kind == "pdf":
+                    futures[h] = threads.submit(_extract_pdf, compressed, refresh_pdf)
+                else:
+                    futures[h] = procs.submit(_extract_worker, kind, compressed, meta.get("encoding"))
+            extracted: dict[str, tuple[str, str | None]] = {}
+            for h, fut in futures.items():
+                try:
+                    extracted[h] = fut.result()
+                except Exception:
+                    extracted[h] = ("", None)
+
+            stripper = (
+                BoilerplateStripper(min_pages=settings.boilerplate_min_pages, min_ratio=settings.boilerplate_min_ratio)
+                if settings.boilerplate_strip
+                else None
+            )
+            if stripper is not None:
+                load_learned_lines(db, stripper)
+                for d in docs:
+                    if d.doc_type == "html" and d.raw_hash in extracted:
+                        stripper.model_for(d.url).add(extracted[d.raw_hash][0])
+
+            for d in docs:
+                if d.raw_hash not in bodies:
+                    stats.missing_raw += 1
+                    continue
+                text, title = extracted[d.raw_hash]
+                if not text:
+                    stats.extract_failed += 1
+                    continue
+                spans = None
+                if d.doc_type == "html" and stripper is not None:
+                    text, removed = stripper.model_for(d.url).strip(text)
+                    if not text:
+                        stats.boilerplate_only += 1
+                        continue
+                    stats.boilerplate_lines_removed += removed
+                    spans = chunk_spans(text)
+                writer.add(
+                    PendingDocument(
+                        party_id=pid,
+                        url=d.url,
+                        doc_type=d.doc_type,
+                        content_text=text,
+                        title=title if d.doc_type in {"html", "text"} else d.title,
+                        spans=spans,
+                    )
+                )
+            writer.flush()
+
+    written = writer.close()
+    stats.documents_written = written.documents_written
+    stats.near_duplicates = written.near_duplicates
+    stats.chunks_inserted = written.chunks_inserted
+    stats.chunks_kept = written.chunks_kept + written.chunks_updated
+    stats.chunks_deleted = written.chunks_deleted
+    stats.elapsed_sec = round(time.perf_counter() - started, 2)
+    return stats
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import multiprocessing
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence
+
+from sqlalchemy import MetaData, insert, or_, select, text
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal, models
+from .chunking import CHUNK_TOKENS, MIN_CHUNK_TOKENS, OVERLAP_TOKENS, chunk_spans, content_hash
+from .topic_chunks import bump_index_generation
+
+
+# 新しい世代のチャンクを組み立てる影テーブル。完成後に policy_chunks と1トランザクションで差し替える
+LIVE_TABLE = "policy_chunks"
+SHADOW_TABLE = "policy_chunks_next"
+# 研究パック由来の文書は項目ごとの meta を持つチャンクなので、本文から作り直さずそのまま引き継ぐ（位置も本文も変わらない）
+_COPY_DOC_TYPES = {"deep_research"}
+
+_live = models.PolicyChunk.__table__
+_shadow = _live.to_metadata(MetaData(), name=SHADOW_TABLE)
+# 生成列とトリガーで書く列（content_tsv）は、読み書きする列から除く
+_COLUMNS = [c for c in _live.columns if c.computed is None and not c.info.get("derived")]
+
+
+@dataclass
+class ReindexProgress:
+    state: str = "idle"  # idle|building|indexing|swapping|done|error
+    documents_total: int = 0
+    documents_done: int = 0
+    chunks_written: int = 0
+    chunks_reused: int = 0
+    catch_up_documents: int = 0
+    catch_up_embeddings: int = 0
+    batches: int = 0
+    elapsed_sec: float = 0.0
+    error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.state in {"building", "indexing", "swapping"}
+
+    @property
+    def docs_per_sec(self) -> float:
+        return round(self.documents_done / self.elapsed_sec, 1) if self.elapsed_sec > 0 else 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return round(self.chunks_written / self.elapsed_sec, 1) if self.elapsed_sec > 0 else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**self.__dict__, "docs_per_sec": self.docs_per_sec, "chunks_per_sec": self.chunks_per_sec}
+
+
+def _chunk_worker(args: tuple[str, int, int, int]) -> list[tuple[int, int, str]]:
+    """(開始位置, 終了位置, 内容ハッシュ) の列。本文はワーカーから送り返さない。"""
+    content, chunk_size, min_size, overlap = args
+    spans = chunk_spans(content, chunk_size=chunk_size, min_size=min_size, overlap=overlap)
+    return [(start, end, content_hash(content[start:end])) for start, end in spans]
+
+
+def _prepare_shadow(db: Session) -> list[tuple[str, str]]:
+    """影テーブルを作り直す。構築後に付ける索引の (本来の名前, 影テーブル向けDDL) を返す。"""
+    db.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+    db.execute(text(f"CREATE TABLE {SHADOW_TABLE} (LIKE {LIVE_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"))
+    # content_tsv を書くトリガーは投入前に付ける（LIKE ではトリガーは写らない。名前は表ごとなのでそのまま使える）
+    for row in db.execute(
+        text("SELECT pg_get_triggerdef(oid) AS tgdef FROM pg_trigger WHERE tgrelid = CAST(:t AS regclass) AND NOT tgisinternal"),
+        {"t": LIVE_TABLE},
+    ):
+        db.execute(text(re.sub(r" ON (?:\S+\.)?" + LIVE_TABLE + r"\b", f" ON {SHADOW_TABLE}", row.tgdef, count=1)))
+    constraints = db.execute(
+        text(
+            "SELECT conname, contype, pg_get_constraintdef(oid) AS condef FROM pg_constraint "
+            "WHERE conrelid = CAST(:t AS regclass) AND contype IN ('p', 'u', 'f')"
+        ),
+        {"t": LIVE_TABLE},
+    ).all()
+    ddl: list[tuple[str, str]] = []
+    for c in constraints:
+        if c.contype == "f":
+            # 外部キーは先に付ける（構築中に削除された文書のチャンクは影テーブルからも消える）
+            db.execute(text(f'ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT "{c.conname}" {c.condef}'))
+        else:
+            ddl.append((c.conname, f'ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT "{c.conname}_next" {c.condef}'))
+    backed = {c.conname for c in constraints if c.contype != "f"}
+    for row in db.execute(
+        text("SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :t"),
+        {"t": LIVE_TABLE},
+    ):
+        if row.indexname in backed:
+            continue
+        # 索引は一括投入の後に作る（投入中に GIN などを更新し続けない）
+        ddl.append(
+            (
+                row.indexname,
+                re.sub(
+                    r"^(CREATE (?:UNIQUE )?INDEX )\S+( ON (?:ONLY )?)(?:\S+\.)?" + LIVE_TABLE + r"\b",
+                    lambda m: f'{m.group(1)}"{row.indexname}_next"{m.group(2)}{SHADOW_TABLE}',
+                    row.indexdef,
+                ),
+            )
+        )
+    db.commit()
+    return ddl
+
+
+def _doc_state(db: Session) -> dict[Any, tuple]:
+    D = models.PolicyDocument
+    return {
+        r.doc_id: (r.hash, r.duplicate_of, r.doc_type)
+        for r in db.execute(select(D.doc_id, D.hash, D.duplicate_of, D.doc_type))
+    }
+
+
+def _build_rows(
+    db: Session,
+    doc_ids: Sequence[Any],
+    *,
+    params: tuple[int, int, int],
+    pool: ProcessPoolExecutor | None,
+) -> tuple[list[dict[str, Any]], int]:
+    """文書の新しいチャンク行を作る。内容が同じチャンクは chunk_id と embedding を引き継ぐ。"""
+    D = models.PolicyDocument
+    docs = db.execute(
+        select(D.doc_id, D.party_id, D.doc_type, D.content_text, D.duplicate_of).where(D.doc_id.in_(doc_ids))
+    ).all()
+    existing: dict[Any, list] = {}
+    for r in db.execute(select(*_COLUMNS).where(_live.c.doc_id.in_(doc_ids)).order_by(_live.c.chunk_index)):
+        existing.setdefault(r.doc_id, []).append(r)
+
+    rows: list[dict[str, Any]] = []
+    reused = 0
+    targets = []
+    for d in docs:
+        if d.duplicate_of is not None:
+            continue
+        if d.doc_type in _COPY_DOC_TYPES:
+            old = existing.get(d.doc_id, [])
+            rows.extend(dict(r._mapping) for r in old)
+            reused += len(old)
+            continue
+        targets.append(d)
+    args = [(d.content_text or "", *params) for d in targets]
+    chunk_lists = pool.map(_chunk_worker, args, chunksize=8) if pool is not None else map(_chunk_worker, args)
+
+    for d, chunks in zip(targets, chunk_lists):
+        by_hash: dict[str, list] = {}
+        for r in existing.get(d.doc_id, []):
+            if r.content_hash:
+                by_hash.setdefault(r.content_hash, []).append(r)
+        # 本文は位置で持ち、URL/タイトルは文書から引く
+        for idx, (start, end, h) in enumerate(chunks):
+            matches = by_hash.get(h)
+            match = matches.pop(0) if matches else None
+            rows.append(
+                {
+                    "chunk_id": match.chunk_id if match is not None else uuid.uuid4(),
+                    "doc_id": d.doc_id,
+                    "party_id": d.party_id,
+                    "chunk_index": idx,
+                    "content": None,
+                    "start_offset": start,
+                    "end_offset": end,
+                    "content_hash": h,
+                    "embedding": match.embedding if match is not None else None,
+                    "embedding_model": match.embedding_model if match is not None else None,
+                    "meta": {},
+                }
+            )
+            reused += match is not None
+    return rows, reused
+
+
+def _swap(
+    db: Session,
+    *,
+    snapshot: dict[Any, tuple],
+    ddl: list[tuple[str, str]],
+    params: tuple[int, int, int],
+    batch_size: int,
+    progress: ReindexProgress,
+) -> None:
+    """構築中に変わった文書だけ作り直し、埋め込みを写してから、影テーブルを policy_chunks と差し替える（1トランザクション）。"""
+    # 文書の書き込みを止めてから、チャンクの読み書きを差し替えの間だけ止める
+    db.execute(text("LOCK TABLE policy_documents IN SHARE MODE"))
+    db.execute(text(f"LOCK TABLE {LIVE_TABLE} IN ACCESS EXCLUSIVE MODE"))
+    current = _doc_state(db)
+    # 削除された文書のチャンクは外部キーで影テーブルからも消えている
+    stale = [doc_id for doc_id, state in current.items() if snapshot.get(doc_id) != state]
+    if stale:
+        for i in range(0, len(stale), batch_size):
+            batch = stale[i : i + batch_size]
+            db.execute(_shadow.delete().where(_shadow.c.doc_id.in_(batch)))
+            rows, _ = _build_rows(db, batch, params=params, pool=None)
+            if rows:
+                db.execute(insert(_shadow), rows)
+        progress.catch_up_documents = len(stale)
+    # 構築中に旧世代の行へ書かれた埋め込み（embed_policy_chunks 等）を、同じ chunk_id の行に写す。
+    # chunk_id を引き継ぐのは内容ハッシュが同じチャンクだけなので、そのまま使える
+    copied = db.execute(
+        _shadow.update()
+        .where(
+            _shadow.c.chunk_id == _live.c.chunk_id,
+            _live.c.embedding.is_not(None),
+            or_(_shadow.c.embedding.is_(None), _shadow.c.embedding_model.is_distinct_from(_live.c.embedding_model)),
+        )
+        .values(embedding=_live.c.embedding, embedding_model=_live.c.embedding_model)
+    )
+    progress.catch_up_embeddings = copied.rowcount or 0
+    # 全政党のチャンクが作り直されるので、topic_party_chunks は全て古いものになる
+    bump_index_generation(db)
+    db.execute(text(f"DROP TABLE {LIVE_TABLE}"))
+    db.execute(text(f"ALTER TABLE {SHADOW_TABLE} RENAME TO {LIVE_TABLE}"))
+    for name, stmt in ddl:
+        if stmt.startswith("ALTER TABLE"):
+            db.execute(text(f'ALTER TABLE {LIVE_TABLE} RENAME CONSTRAINT "{name}_next" TO "{name}"'))
+        else:
+            db.execute(text(f'ALTER INDEX "{name}_next" RENAME TO "{name}"'))
+    db.commit()
+
+
+def reindex_policy_chunks(
+    db: Session,
+    *,
+    workers: int | None = None,
+    batch_size: int = 200,
+    chunk_size: int = CHUNK_TOKENS,
+    min_size: int = MIN_CHUNK_TOKENS,
+    overlap: int = OVERLAP_TOKENS,
+    progress: ReindexProgress | None = None,
+    on_progress: Callable[[ReindexProgress], None] | None = None,
+) -> ReindexProgress:
+    """全文書の content_text からチャンクを作り直す（再クロール/再取り込み不要）。
+
+    新しい世代は影テーブルにバッチごとに commit しながら作り、索引まで作ってから policy_chunks と
+    1トランザクションで差し替える。検索は常に旧世代か新世代のどちらか一方の完全な索引を見る。
+    構築中にクロール等で変わった文書は、差し替え直前にロックを取ってから作り直す。構築中に付いた埋め込みも
+    同じロックの中で chunk_id ごとに写す。
+    """
+    p = progress or ReindexProgress()
+    p.state = "building"
+    started = time.perf_counter()
+    params = (chunk_size, min_size, overlap)
+
+    def report() -> None:
+        p.elapsed_sec = round(time.perf_counter() - started, 2)
+        if on_progress is not None:
+            on_progress(p)
+
+    try:
+        ddl = _prepare_shadow(db)
+        snapshot = _doc_state(db)
+        db.commit()
+        doc_ids = sorted(snapshot, key=str)
+        p.documents_total = len(doc_ids)
+        report()
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, workers or multiprocessing.cpu_count()), mp_context=ctx) as pool:
+            for i in range(0, len(doc_ids), batch_size):
+                batch = doc_ids[i : i + batch_size]
+                rows, reused = _build_rows(db, batch, params=params, pool=pool)
+                if rows:
+                    db.execute(insert(_shadow), rows)
+                db.commit()
+                p.documents_done += len(batch)
+                p.chunks_written += len(rows)
+                p.chunks_reused += reused
+                p.batches += 1
+                report()
+
+        p.state = "indexing"
+        report()
+        for _, stmt in ddl:
+            db.execute(text(stmt))
+        db.commit()
+
+        p.state = "swapping"
+        report()
+        _swap(db, snapshot=snapshot, ddl=ddl, params=params, batch_size=batch_size, progress=p)
+        p.state = "done"
+    except Exception as e:
+        db.rollback()
+        db.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+        db.commit()
+        p.state = "error"
+        p.error = f"{type(e).__name__}: {e}"
+        report()
+        raise
+    report()
+    return p
+
+
+# 管理APIから起動するジョブ（プロセス内で同時に1つだけ）
+_job_lock = threading.Lock()
+_job = ReindexProgress()
+
+
+def job_status() -> dict[str, Any]:
+    return _job.as_dict()
+
+
+def claim_job() -> bool:
+    """ジョブを開始できれば True（実行中なら False）。"""
+    global _job
+    with _job_lock:
+        if _job.running:
+            return False
+        _job = ReindexProgress(state="building")
+        return True
+
+
+def run_job(**kwargs: Any) -> None:
+    """claim_job() の後にバックグラウンドで呼ぶ。進捗は job_status() で見る。"""
+    db = SessionLocal()
+    try:
+        reindex_policy_chunks(db, progress=_job, **kwargs)
+    except Exception:
+        pass  # エラー内容は job_status() に残る
+    finally:
+        db.close()
@@ -7,6 +7,8 @@ from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 
 from ..db import models
+from .crawl_traps import compile_deny_patterns
+from .url_canon import canonicalize_url, url_key
 
 
 def _normalize_url(url: str) -> str:
@@ -15,6 +17,7 @@ def _normalize_url(url: str) -> str:
         return ""
     # Common copy/paste artifacts from JSON/HTML attributes
     u = u.strip().strip('\'"')
+    u = canonicalize_url(u) or u
     if u.endswith("/"):
         return u
     return u + "/"
@@ -40,11 +43,26 @@ def list_sources(db: Session, party_id) -> list[models.PartyPolicySource]:
     )
 
 
-def replace_sources(db: Session, party_id, base_urls: Iterable[str]) -> list[models.PartyPolicySource]:
+def replace_sources(
+    db: Session,
+    party_id,
+    base_urls: Iterable[str],
+    *,
+    deny_patterns: dict[str, list[str]] | None = None,
+) -> list[models.PartyPolicySource]:
+    """政策URLを置き換える。deny_patterns 未指定のURLは既存のルールを引き継ぐ。"""
     party = db.get(models.PartyRegistry, party_id)
     if not party:
         raise ValueError("party not found")
 
+    existing = list_sources(db, party_id)
+    deny_by_key: dict[str, list[str]] = {url_key(s.base_url): list(s.deny_patterns or []) for s in existing}
+    sha_by_key: dict[str, str | None] = {url_key(s.base_url): s.repo_commit_sha for s in existing}
+    for u, patterns in (deny_patterns or {}).items():
+        cleaned = [str(p).strip() for p in patterns or [] if str(p).strip()]
+        compile_deny_patterns(cleaned)
+        deny_by_key[url_key(_normalize_url(str(u or "")))] = cleaned
+
     allowed_domains = list(party.allowed_domains or [])
     if party.official_home_url:
         try:
@@ -56,7 +74,7 @@ def replace_sources(db: Session, party_id, base_urls: Iterable[str]) -> list[mod
     seen: set[str] = set()
     for u in base_urls:
         url = _normalize_url(str(u or ""))
-        if not url or url in seen:
+        if not url or url_key(url) in seen:
             continue
         try:
             pu = urlparse(url)
@@ -66,11 +84,19 @@ def replace_sources(db: Session, party_id, base_urls: Iterable[str]) -> list[mod
             continue
         if not _domain_allowed(pu.netloc, allowed_domains):
             continue
-        seen.add(url)
+        seen.add(url_key(url))
         normalized.append(url)
 
     db.execute(delete(models.PartyPolicySource).where(models.PartyPolicySource.party_id == party_id))
     for url in normalized:
-        db.add(models.PartyPolicySource(party_id=party_id, base_url=url, status="active"))
+        db.add(
+            models.PartyPolicySource(
+                party_id=party_id,
+                base_url=url,
+                status="active",
+                deny_patterns=deny_by_key.get(url_key(url), []),
+                repo_commit_sha=sha_by_key.get(url_key(url)),
+            )
+        )
     db.commit()
     return list_sources(db, party_id)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+import zlib
+from dataclasses import dataclass
+from typing import IO, Any, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..db import models
+
+
+# source_snapshots.source_name。content_hash ごとに1行（部分ユニークインデックス）
+ARCHIVE_SOURCE = "policy_crawl"
+# archive_stream で一度に読む大きさ
+STREAM_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class RawBody:
+    """クロールで取得した生の本文（zlib 圧縮済み）。再抽出のために source_snapshots へ保存する。"""
+
+    content_hash: str  # sha256(生の本文)
+    compressed: bytes
+    kind: str  # html|pdf|markdown|text
+    size: int
+    content_type: str | None = None
+    encoding: str | None = None
+
+    @property
+    def meta(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "size": self.size,
+            "content_type": self.content_type,
+            "encoding": self.encoding,
+            "compression": "zlib",
+        }
+
+
+def pack_body(data: bytes, *, kind: str, content_type: str | None = None, encoding: str | None = None) -> RawBody:
+    data = bytes(data or b"")
+    return RawBody(
+        content_hash=hashlib.sha256(data).hexdigest(),
+        compressed=zlib.compress(data, 6),
+        kind=kind,
+        size=len(data),
+        content_type=content_type or None,
+        encoding=encoding or None,
+    )
+
+
+def unpack_body(compressed: bytes) -> bytes:
+    return zlib.decompress(compressed)
+
+
+def store_bodies(db: Session, bodies: Iterable[tuple[str, RawBody]]) -> tuple[int, int]:
+    """(URL, 本文) を内容ハッシュで重複排除して保存する。新しく保存した件数と圧縮後バイト数を返す。
+
+    同じ本文は URL/政党が違っても1行だけ持つ（source_url は最初に見つかったURL）。
+    """
+    by_hash: dict[str, tuple[str, RawBody]] = {}
+    for url, body in bodies:
+        by_hash.setdefault(body.content_hash, (url, body))
+    if not by_hash:
+        return 0, 0
+    S = models.SourceSnapshot
+    existing = set(
+        db.scalars(select(S.content_hash).where(S.source_name == ARCHIVE_SOURCE, S.content_hash.in_(list(by_hash))))
+    )
+    missing = [(url, body) for h, (url, body) in by_hash.items() if h not in existing]
+    if not missing:
+        return 0, 0
+    stmt = pg_insert(S).values(
+        [
+            {
+                "source_name": ARCHIVE_SOURCE,
+                "source_url": url,
+                "content_hash": body.content_hash,
+                "content": body.compressed,
+                "meta": body.meta,
+            }
+            for url, body in missing
+        ]
+    )
+    # 並行クロールで同じ本文が先に入っていれば何もしない
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=[S.content_hash],
+        index_where=S.source_name == ARCHIVE_SOURCE,
+    )
+    db.execute(stmt)
+    return len(missing), sum(len(body.compressed) for _, body in missing)
+
+
+def archive_stream(
+    db: Session,
+    url: str,
+    fp: IO[bytes],
+    *,
+    kind: str,
+    content_type: str | None = None,
+    encoding: str | None = None,
+) -> tuple[str, int, int]:
+    """ファイル（一時ファイル等）の本文を少しずつ読んでハッシュ・圧縮し、その場で保存する。
+
+    大きい PDF を bytes に読み戻さないためのもの。既に同じ本文があれば圧縮もしない。
+    (内容ハッシュ, 新しく保存した件数, 圧縮後バイト数) を返す。
+    """
+    h = hashlib.sha256()
+    size = 0
+    fp.seek(0)
+    while part := fp.read(STREAM_CHUNK_BYTES):
+        h.update(part)
+        size += len(part)
+    content_hash = h.hexdigest()
+    S = models.SourceSnapshot
+    exists = db.scalar(select(S.snapshot_id).where(S.source_name == ARCHIVE_SOURCE, S.content_hash == content_hash).limit(1))
+    if exists is not None:
+        return content_hash, 0, 0
+    z = zlib.compressobj(6)
+    compressed = bytearray()
+    fp.seek(0)
+    while part := fp.read(STREAM_CHUNK_BYTES):
+        compressed += z.compress(part)
+    compressed += z.flush()
+    body = RawBody(
+        content_hash=content_hash,
+        compressed=bytes(compressed),
+        kind=kind,
+        size=size,
+        content_type=content_type or None,
+        encoding=encoding or None,
+    )
+    stored, stored_bytes = store_bodies(db, [(url, body)])
+    return content_hash, stored, stored_bytes
+
+
+def load_bodies(db: Session, hashes: Iterable[str]) -> dict[str, tuple[bytes, dict[str, Any]]]:
+    """内容ハッシュ → (圧縮済み本文, meta)。"""
+    S = models.SourceSnapshot
+    wanted = list(set(hashes))
+    out: dict[str, tuple[bytes, dict[str, Any]]] = {}
+    for i in range(0, len(wanted), 500):
+        for row in db.execute(
+            select(S.content_hash, S.content, S.meta).where(
+                S.source_name == ARCHIVE_SOURCE,
+                S.content_hash.in_(wanted[i : i + 500]),
+            )
+        ):
+            if row.content is not None:
+                out[row.content_hash] = (bytes(row.content), dict(row.meta or {}))
+    return out
@@ -12,6 +12,8 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ..db import models
+from .chunking import chunk_spans, sync_chunks
+from .near_dup import link_near_duplicate
 
 
 @dataclass
@@ -21,6 +23,8 @@ class ImportStats:
     documents_upserted: int = 0
     documents_unchanged: int = 0
     chunks_written: int = 0
+    chunks_kept: int = 0
+    near_duplicates: int = 0
     skipped: int = 0
 
 
@@ -30,21 +34,6 @@ def _hash_text(text: str) -> str:
     return h.hexdigest()
 
 
-def _chunk_text(text: str, *, chunk_size: int = 800, overlap: int = 120) -> list[str]:
-    t = " ".join((text or "").split())
-    if not t:
-        return []
-    chunks: list[str] = []
-    start = 0
-    while start < len(t):
-        end = min(len(t), start + chunk_size)
-        chunks.append(t[start:end])
-        if end == len(t):
-            break
-        start = max(0, end - overlap)
-    return chunks
-
-
 def _parse_dt(value: Any) -> datetime | None:
     if not value:
         return None
@@ -152,24 +141,6 @@ def _upsert_document(
     return doc, True
 
 
-def _replace_chunks(db: Session, *, doc: models.PolicyDocument, party_id: uuid.UUID, chunks: list[str], meta: dict[str, Any]) -> int:
-    db.query(models.PolicyChunk).filter(models.PolicyChunk.doc_id == doc.doc_id).delete()
-    written = 0
-    for idx, text in enumerate(chunks):
-        db.add(
-            models.PolicyChunk(
-                doc_id=doc.doc_id,
-                party_id=party_id,
-                chunk_index=idx,
-                content=text,
-                embedding=None,
-                meta=meta,
-            )
-        )
-        written += 1
-    return written
-
-
 def import_research_pack(db: Session, pack: dict[str, Any]) -> tuple[ImportStats, list[dict[str, Any]]]:
     if not isinstance(pack, dict):
         raise ValueError("pack must be an object")
@@ -299,15 +270,22 @@ def import_research_pack(db: Session, pack: dict[str, Any]) -> tuple[ImportStats
             else:
                 stats.documents_unchanged += 1
 
-            # Replace chunks with item-level meta (so deprecated can be filtered per chunk).
-            db.query(models.PolicyChunk).filter(models.PolicyChunk.doc_id == doc.doc_id).delete()
-            chunk_index = 0
+            # Near-duplicates of an existing document of the same party are linked, not indexed again.
+            if link_near_duplicate(db, doc, doc_content) is not None:
+                sync_chunks(db, doc=doc, party_id=party_id, chunks=[])
+                stats.near_duplicates += 1
+                continue
+
+            # Chunks carry item-level meta (so deprecated can be filtered per chunk).
+            # Unchanged chunks keep their chunk_id; only new/changed ones are written.
+            # Chunks are stored as offsets into doc_content; source_url/title come from the document.
+            doc_chunks: list[tuple[str, dict[str, Any]]] = []
+            doc_spans: list[tuple[int, int] | None] = []
+            pos = 0
             for it in items:
                 if not isinstance(it, dict):
                     continue
                 base_meta: dict[str, Any] = {
-                    "source_url": url,
-                    "title": entry.get("title"),
                     "generator": generator,
                     "topic_ids": it.get("topic_ids") or [],
                     "deprecated": bool(it.get("deprecated") is True),
@@ -316,20 +294,17 @@ def import_research_pack(db: Session, pack: dict[str, Any]) -> tuple[ImportStats
                     "source_type": it.get("source_type"),
                 }
                 base_meta = {k: v for k, v in base_meta.items() if v is not None and v != ""}
-                chunks = _chunk_text(str(it.get("content_text") or ""))
-                for c in chunks:
-                    db.add(
-                        models.PolicyChunk(
-                            doc_id=doc.doc_id,
-                            party_id=party_id,
-                            chunk_index=chunk_index,
-                            content=c,
-                            embedding=None,
-                            meta=base_meta,
-                        )
-                    )
-                    chunk_index += 1
-                    stats.chunks_written += 1
+                item_text = str(it.get("content_text") or "")
+                base = doc_content.find(item_text, pos) if item_text.strip() else -1
+                if base >= 0:
+                    pos = base + len(item_text)
+                for start, end in chunk_spans(item_text):
+                    doc_chunks.append((item_text[start:end], base_meta))
+                    # Fall back to storing a copy if the item text is not found verbatim in the document.
+                    doc_spans.append((base + start, base + end) if base >= 0 else None)
+            synced = sync_chunks(db, doc=doc, party_id=party_id, chunks=doc_chunks, spans=doc_spans)
+            stats.chunks_written += synced.inserted
+            stats.chunks_kept += synced.kept + synced.updated
 
     db.commit()
     return stats, errors
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import time
+import zlib
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from ..settings import settings
+
+
+@dataclass
+class RobotsInfo:
+    host: str
+    parser: RobotFileParser | None
+    crawl_delay: float = 0.0
+    sitemaps: list[str] = field(default_factory=list)
+    fetched_at: float = 0.0
+    # 照合する User-agent（実際に送るものと robots_user_agent）。どちらかで禁止なら取得しない
+    user_agents: tuple[str, ...] = ()
+
+    def allowed(self, url: str) -> bool:
+        if self.parser is None:
+            return True
+        try:
+            return all(self.parser.can_fetch(agent, url) for agent in self.user_agents or (settings.robots_user_agent,))
+        except Exception:
+            return True
+
+
+@dataclass(frozen=True)
+class SitemapEntry:
+    url: str
+    lastmod: datetime | None = None
+
+
+# host -> RobotsInfo（プロセス内キャッシュ。再クロール時に robots.txt を毎回取りに行かない）
+_ROBOTS_CACHE: dict[str, RobotsInfo] = {}
+
+
+def _origin(url: str) -> tuple[str, str]:
+    p = urlparse(url)
+    return (p.scheme or "https").lower(), (p.netloc or "").lower()
+
+
+def _user_agents(fetcher) -> tuple[str, ...]:
+    sent = str(fetcher.client.headers.get("user-agent") or "")
+    return tuple(dict.fromkeys(a for a in (sent, settings.robots_user_agent) if a))
+
+
+def _agent_delay(parser: RobotFileParser, agent: str) -> float:
+    delay = parser.crawl_delay(agent)
+    if delay is None:
+        rate = parser.request_rate(agent)
+        if rate is not None and rate.requests:
+            delay = rate.seconds / rate.requests
+    return float(delay or 0.0)
+
+
+def get_robots(fetcher, url: str) -> RobotsInfo:
+    """URLのホストの robots.txt を取得してキャッシュする（取得失敗/4xx は全許可として扱う）。
+
+    規則は実際に送る User-Agent と robots_user_agent の両方で照合し、厳しい方に従う。
+    本文は robots_max_bytes までしか読まない（超えた分は無視する）。
+    """
+    scheme, host = _origin(url)
+    cached = _ROBOTS_CACHE.get(host)
+    if cached is not None and time.monotonic() - cached.fetched_at < settings.robots_cache_ttl_sec:
+        return cached
+
+    info = RobotsInfo(host=host, parser=None, fetched_at=time.monotonic(), user_agents=_user_agents(fetcher))
+    try:
+        res = fetcher.fetch_stream(
+            f"{scheme}://{host}/robots.txt",
+            kinds={"text", "html", "markdown", "other"},
+            max_bytes=int(settings.robots_max_bytes),
+            truncate=True,
+        )
+        body = res.text() if 200 <= res.status < 300 and res.skipped_reason is None else ""
+        res.close()
+    except Exception:
+        body = ""
+    if body:
+        parser = RobotFileParser()
+        parser.parse(body.splitlines())
+        info.parser = parser
+        delay = max(_agent_delay(parser, agent) for agent in info.user_agents)
+        info.crawl_delay = min(delay, float(settings.crawl_max_delay_sec))
+        info.sitemaps = list(parser.site_maps() or [])
+    if not info.sitemaps:
+        info.sitemaps = [f"{scheme}://{host}/sitemap.xml"]
+    _ROBOTS_CACHE[host] = info
+    return info
+
+
+def _parse_lastmod(value: str | None) -> datetime | None:
+    v = (value or "").strip()
+    if not v:
+        return None
+    if v.endswith("Z"):
+        v = v[:-1] + "+00:00"
+    try:
+        dt = datetime.fromisoformat(v)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _gunzip_capped(data: bytes, max_bytes: int) -> bytes | None:
+    """gzip を max_bytes まで展開する。壊れているか展開後が max_bytes を超えるなら None（圧縮爆弾を読み切らない）。"""
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        out = d.decompress(data, max_bytes)
+    except zlib.error:
+        return None
+    if d.unconsumed_tail:
+        return None
+    return out
+
+
+def parse_sitemap(data: bytes, *, max_bytes: int | None = None) -> tuple[list[SitemapEntry], list[str]]:
+    """sitemap XML を (URLエントリ, 子sitemap URL) に分解する。.gz は sitemap_max_bytes までしか展開しない。"""
+    if data[:2] == b"\x1f\x8b":
+        unpacked = _gunzip_capped(data, int(max_bytes if max_bytes is not None else settings.sitemap_max_bytes))
+        if unpacked is None:
+            return [], []
+        data = unpacked
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError:
+        return [], []
+    entries: list[SitemapEntry] = []
+    children: list[str] = []
+    is_index = _local(root.tag) == "sitemapindex"
+    for node in root:
+        loc = None
+        lastmod = None
+        for child in node:
+            name = _local(child.tag)
+            if name == "loc":
+                loc = (child.text or "").strip()
+            elif name == "lastmod":
+                lastmod = _parse_lastmod(child.text)
+        if not loc:
+            continue
+        if is_index:
+            children.append(loc)
+        else:
+            entries.append(SitemapEntry(url=loc, lastmod=lastmod))
+    return entries, children
+
+
+def collect_sitemap_entries(
+    fetcher,
+    sitemap_urls: list[str],
+    *,
+    max_sitemaps: int = 20,
+    max_entries: int = 5000,
+) -> list[SitemapEntry]:
+    """sitemap（index含む）を辿ってURL一覧を集める。sitemap_max_bytes を超えるものは読まずに飛ばす。"""
+    queue = list(sitemap_urls)
+    seen: set[str] = set()
+    out: list[SitemapEntry] = []
+    while queue and len(seen) < max_sitemaps and len(out) < max_entries:
+        sm = queue.pop(0)
+        if sm in seen:
+            continue
+        seen.add(sm)
+        try:
+            res = fetcher.fetch_stream(sm, kinds={"text", "html", "markdown", "other"}, max_bytes=int(settings.sitemap_max_bytes))
+            data = res.read_bytes() if 200 <= res.status < 300 and res.skipped_reason is None else b""
+            res.close()
+        except Exception:
+            continue
+        if not data:
+            continue
+        entries, children = parse_sitemap(data)
+        out.extend(entries[: max_entries - len(out)])
+        queue.extend(c for c in children if c not in seen)
+    return out
+
+
+class HostThrottle:
+    """robots.txt の Crawl-delay をホストごとに守る。"""
+
+    def __init__(self) -> None:
+        self._last: dict[str, float] = {}
+
+    def wait(self, url: str, delay: float) -> None:
+        if delay <= 0:
+            return
+        host = _origin(url)[1]
+        last = self._last.get(host)
+        now = time.monotonic()
+        if last is not None and now - last < delay:
+            time.sleep(delay - (now - last))
+        self._last[host] = time.monotonic()
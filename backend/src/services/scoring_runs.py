@@ -18,7 +18,8 @@ from ..agents.scorer import ScoringAgent
 from ..agents.text_extract import html_to_text
 from ..db import models
 from ..settings import settings
-from . import policy_index, topic_rubrics
+from . import topic_chunks, topic_rubrics
+from .url_canon import url_key
 
 
 def _now_iso() -> str:
@@ -29,26 +30,17 @@ def _canonicalize_name_ja(name_ja: str) -> str:
     return "".join((name_ja or "").split()).lower()
 
 
-def _normalize_url(url: str) -> str:
-    u = (url or "").strip()
-    if not u:
-        return ""
-    # remove trailing slash for comparisons
-    return u[:-1] if u.endswith("/") else u
-
-
 def _is_homepage_url(url: str, official_url: str) -> bool:
-    a = _normalize_url(url)
-    b = _normalize_url(official_url)
+    # url_key は scheme/www/末尾スラッシュ/index.html/計測パラメータの違いを吸収する
+    a = url_key(url)
+    b = url_key(official_url)
     if not a or not b:
         return False
     if a == b:
         return True
-    pa = urlparse(a)
-    pb = urlparse(b)
-    if pa.scheme and pb.scheme and pa.netloc == pb.netloc:
-        return pa.path in {"", "/"} and pa.query == "" and pa.fragment == ""
-    return False
+    host_a, _, rest_a = a.partition("/")
+    host_b, _, _ = b.partition("/")
+    return host_a == host_b and rest_a == ""
 
 
 def _domain_allowed(netloc: str, allowed_domains: list[str]) -> bool:
@@ -74,6 +66,16 @@ def _toggle_trailing_slash(url: str) -> str:
     return u[:-1] if u.endswith("/") else (u + "/")
 
 
+# 根拠URLの検証で本文を読む種別（PDF/動画などは本文を読まずに打ち切る）
+_EVIDENCE_KINDS = {"html", "markdown", "text"}
+
+
+def _page_text(resp) -> str:
+    if resp.skipped_reason:
+        return ""
+    return html_to_text(resp.text())
+
+
 def _pick_search_client(*, provider: str, openai_model: str | None, gemini_model: str | None, debug: bool):
     p = (provider or "auto").lower()
     if p in {"auto", "gemini"} and settings.gemini_api_key:
@@ -203,27 +205,31 @@ def run_topic_scoring(
     url_checks_by_party: dict[str, list[dict[str, str | int]]] = {}
     index_hits_count_by_party: dict[str, int] = {}
     index_fallback_used_by_party: dict[str, bool] = {}
+    duplicate_urls_skipped_by_party: dict[str, int] = {}
+    # 索引検索の結果は topic_party_chunks から読み、古い政党の分だけ1文の SQL でまとめて引き直す
+    index_search: topic_chunks.TopicChunksResult | None = None
 
     if index_only:
         index_queries = [topic_text, *list(subkeywords or [])]
         max_chunks = max(3, int(max_evidence_per_party) * 2)
         per_query = max(1, int(max_evidence_per_party))
+        index_search = topic_chunks.get_topic_chunks(
+            db,
+            topic_id=topic_id,
+            party_ids=[party_by_name[p.name_ja].party_id for p in resolved],
+            queries=index_queries,
+            per_query=per_query,
+            max_total=max_chunks,
+        )
         for p in resolved:
-            hits = policy_index.search_policy_chunks(
-                db,
-                party_id=party_by_name[p.name_ja].party_id,
-                queries=index_queries,
-                per_query=per_query,
-                max_total=max_chunks,
-            )
+            hits = index_search.hits_for(party_by_name[p.name_ja].party_id)
             index_hits_count_by_party[p.name_ja] = len(hits)
             per_party_queries[p.name_ja] = list(index_queries)
             per_party_query_used[p.name_ja] = "index"
             per_party_attempts_by_party[p.name_ja] = 1
             for hit in hits:
                 chunk = hit.chunk
-                meta = chunk.meta if isinstance(chunk.meta, dict) else {}
-                url = (meta.get("source_url") or "").strip()
+                url = (chunk.source_url or "").strip()
                 content = (chunk.content or "").strip()
                 if not url or not content:
                     continue
@@ -372,10 +378,18 @@ def run_topic_scoring(
             candidates.extend(_replacement_urls_for_party(party_name))
 
         used: set[str] = set()
+        used_raw: set[str] = set()
         for url in candidates:
-            if not url or url in used:
+            if not url or url in used_raw:
                 continue
-            used.add(url)
+            used_raw.add(url)
+            key = url_key(url) or url
+            if key in used:
+                # 表記ゆれ（末尾スラッシュ/計測パラメータ等）の同一URLは再取得しない
+                duplicate_urls_skipped_by_party[party_name] = duplicate_urls_skipped_by_party.get(party_name, 0) + 1
+                _record_url_check(party_name, url, None, "skip_duplicate_url")
+                continue
+            used.add(key)
             if _is_homepage_url(url, official_url_by_party.get(party_name, "")):
                 _record_url_check(party_name, url, None, "skip_homepage")
                 continue
@@ -393,24 +407,24 @@ def run_topic_scoring(
 
             resp = None
             try:
-                resp = fetcher.client.get(url, timeout=fetcher.client.timeout)
+                resp = fetcher.fetch_stream(url, kinds=_EVIDENCE_KINDS)
             except Exception:
                 resp = None
 
             if resp is not None:
-                status = int(getattr(resp, "status_code", 0) or 0)
+                status = resp.status
                 if status == 404:
                     alt = _toggle_trailing_slash(url)
                     if alt and alt != url:
                         try:
-                            resp2 = fetcher.client.get(alt, timeout=fetcher.client.timeout)
+                            resp2 = fetcher.fetch_stream(alt, kinds=_EVIDENCE_KINDS)
                         except Exception:
                             resp2 = None
                         if resp2 is not None:
-                            status2 = int(getattr(resp2, "status_code", 0) or 0)
+                            status2 = resp2.status
                             if 200 <= status2 < 400:
                                 try:
-                                    text2 = html_to_text(resp2.text)
+                                    text2 = _page_text(resp2)
                                 except Exception:
                                     text2 = ""
                                 text2 = (text2 or "").strip()
@@ -426,7 +440,7 @@ def run_topic_scoring(
                     continue  # 実在しないURLは採用しない
                 if 200 <= status < 400:
                     try:
-                        text = html_to_text(resp.text)
+                        text = _page_text(resp)
                     except Exception:
                         text = ""
                     text = (text or "").strip()
@@ -455,31 +469,32 @@ def run_topic_scoring(
         max_chunks = max(3, int(max_evidence_per_party) * 2)
         max_docs = max(3, int(max_evidence_per_party) * 2)
         per_query = max(1, int(max_evidence_per_party))
+        index_search = topic_chunks.get_topic_chunks(
+            db,
+            topic_id=topic_id,
+            party_ids=[party_by_name[p.name_ja].party_id for p in resolved],
+            queries=index_queries,
+            per_query=per_query,
+            max_total=max_chunks,
+        )
         for p in resolved:
             party_name = p.name_ja
-            hits = policy_index.search_policy_chunks(
-                db,
-                party_id=party_by_name[party_name].party_id,
-                queries=index_queries,
-                per_query=per_query,
-                max_total=max_chunks,
-            )
+            hits = index_search.hits_for(party_by_name[party_name].party_id)
             index_hits_count_by_party[party_name] = len(hits)
             if not hits:
                 continue
             docs = docs_by_party.get(party_name) or []
-            seen_urls: set[str] = {d.url for d in docs if d.url}
+            seen_urls: set[str] = {url_key(d.url) or d.url for d in docs if d.url}
             for hit in hits:
                 if len(docs_by_party[party_name]) >= max_docs:
                     break
                 chunk = hit.chunk
-                meta = chunk.meta if isinstance(chunk.meta, dict) else {}
-                url = (meta.get("source_url") or "").strip()
+                url = (chunk.source_url or "").strip()
                 content = (chunk.content or "").strip()
-                if not url or not content or url in seen_urls:
+                if not url or not content or (url_key(url) or url) in seen_urls:
                     continue
                 docs_by_party[party_name].append(PolicyDocument(url=url, content=content[:max_doc_chars]))
-                seen_urls.add(url)
+                seen_urls.add(url_key(url) or url)
                 index_fallback_used_by_party[party_name] = True
                 if url not in quote_by_url:
                     quote_by_url[url] = _make_quote(content)
@@ -545,6 +560,16 @@ def run_topic_scoring(
                 "subkeywords": subkeywords,
                 "index_hits_count_by_party": index_hits_count_by_party,
                 "index_fallback_used_by_party": index_fallback_used_by_party,
+                "index_search_statements": (index_search.statements if index_search else 0),
+                "index_search_round_trips_saved": (index_search.round_trips_saved if index_search else 0),
+                "index_search_cached_parties": (index_search.cached_parties if index_search else 0),
+                "index_search_refreshed_parties": (index_search.refreshed_parties if index_search else 0),
+                "index_search_fallback_by_party": {
+                    name: index_search.fallback_by_party[str(party.party_id)]
+                    for name, party in party_by_name.items()
+                    if index_search and str(party.party_id) in index_search.fallback_by_party
+                },
+                "duplicate_urls_skipped_by_party": duplicate_urls_skipped_by_party,
                 "grounding_urls_count_by_party": {k: len(v or []) for k, v in grounding_urls_by_party.items()},
                 "per_party_attempts_by_party": per_party_attempts_by_party,
                 "openai_usage_by_party": (openai_usage_by_party if used_search_provider == "openai" else None),
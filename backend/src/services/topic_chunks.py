@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..settings import settings
+from . import embeddings, policy_index
+
+
+def _as_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def bump_index_generation(db: Session, party_ids: Iterable[Any] | None = None) -> None:
+    """政党のチャンクが変わったことを記録する（party_ids=None なら全政党）。呼び出し側のトランザクションで行う。"""
+    P = models.PartyRegistry
+    stmt = update(P).values(index_generation=P.index_generation + 1)
+    if party_ids is not None:
+        ids = list({_as_uuid(p) for p in party_ids if p is not None})
+        if not ids:
+            return
+        stmt = stmt.where(P.party_id.in_(ids))
+    db.execute(stmt.execution_options(synchronize_session=False))
+
+
+def _normalize_queries(queries: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(qn for qn in (" ".join((q or "").split()) for q in queries) if qn))
+
+
+def query_key(queries: Sequence[str], *, mode: str, per_query: int, top_n: int) -> str:
+    """保存した行が今の検索条件で作られたかを見るためのハッシュ（サブキーワードや検索方式が変われば変わる）。"""
+    payload: dict[str, Any] = {"queries": list(queries), "mode": mode, "per_query": per_query, "top_n": top_n}
+    if mode in {"vector", policy_index.HYBRID_MODE}:
+        payload["embedder"] = embeddings.get_embedder().name
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class TopicChunksResult:
+    hits_by_party: dict[str, list[policy_index.PolicyChunkHit]]
+    # topic_party_chunks から読めた政党 / 古い（または無い）ので引き直した政党
+    cached_parties: int = 0
+    refreshed_parties: int = 0
+    statements: int = 0
+    # 政党ごと・クエリごとに検索していた場合の往復数
+    legacy_round_trips: int = 0
+
+    @property
+    def round_trips_saved(self) -> int:
+        return max(0, self.legacy_round_trips - self.statements)
+
+    def hits_for(self, party_id) -> list[policy_index.PolicyChunkHit]:
+        return self.hits_by_party.get(str(party_id), [])
+
+    @property
+    def fallback_by_party(self) -> dict[str, str]:
+        """指定の検索方式で引けず bi-gram 検索にした政党とその理由。"""
+        return {party: hits[0].fallback for party, hits in self.hits_by_party.items() if hits and hits[0].fallback}
+
+
+def get_topic_chunks(
+    db: Session,
+    *,
+    topic_id: str,
+    party_ids: Sequence[Any],
+    queries: Sequence[str],
+    per_query: int,
+    max_total: int,
+    mode: str | None = None,
+) -> TopicChunksResult:
+    """(トピック, 政党) ごとの上位 max_total 件のチャンクを topic_party_chunks から読む。
+
+    行が無い政党、政党の index_generation が進んだ政党、クエリ（トピック名/サブキーワード）や検索条件が
+    変わった政党だけ search_policy_chunks_multi でまとめて引き直し、上位 topic_chunks_top_n 件を保存する。
+    保存は呼び出し側のトランザクションで行う（commit は呼び出し側）。
+    """
+    parties = list(dict.fromkeys(str(p) for p in party_ids if p is not None))
+    result = TopicChunksResult(hits_by_party={p: [] for p in parties})
+    norm = _normalize_queries(queries)
+    if not parties or not norm:
+        return result
+    key_mode = (mode or settings.policy_search_mode or "bigram").lower()
+    per_query = max(1, int(per_query))
+    max_total = max(1, int(max_total))
+    # 結果は (順位, クエリ順, chunk_id) の全順序で並ぶので、上位 top_n 件の先頭 max_total 件は直接引いた結果と同じ
+    top_n = max(int(settings.topic_chunks_top_n), max_total)
+    key = query_key(norm, mode=key_mode, per_query=per_query, top_n=top_n)
+
+    P, T = models.PartyRegistry, models.TopicPartyChunks
+    state = db.execute(
+        select(P.party_id, P.index_generation, T.index_generation.label("stored_generation"), T.query_key, T.chunk_ids, T.ranks)
+        .outerjoin(T, (T.party_id == P.party_id) & (T.topic_id == topic_id))
+        .where(P.party_id.in_([_as_uuid(p) for p in parties]))
+    ).all()
+    result.statements = 1
+    generation: dict[str, int] = {}
+    stored: dict[str, list[tuple[str, float]]] = {}
+    for r in state:
+        party = str(r.party_id)
+        generation[party] = int(r.index_generation)
+        if r.query_key == key and r.stored_generation == r.index_generation:
+            stored[party] = [(str(cid), float(rank)) for cid, rank in zip(r.chunk_ids or [], r.ranks or [])][:max_total]
+
+    wanted = {cid for ranked in stored.values() for cid, _ in ranked}
+    chunks: dict[str, models.PolicyChunk] = {}
+    if wanted:
+        C = models.PolicyChunk
+        chunks = {str(c.chunk_id): c for c in db.scalars(select(C).where(C.chunk_id.in_([_as_uuid(c) for c in wanted])))}
+        result.statements += 1
+    served: set[str] = set()
+    for party, ranked in stored.items():
+        # 世代を上げずに消されたチャンクがあれば古い行として扱う
+        if any(cid not in chunks for cid, _ in ranked):
+            continue
+        result.hits_by_party[party] = [policy_index.PolicyChunkHit(chunk=chunks[cid], rank=rank) for cid, rank in ranked]
+        served.add(party)
+    result.cached_parties = len(served)
+    result.legacy_round_trips += len(served) * len(norm)
+
+    # party_registry に無い政党は検索しない
+    stale = [p for p in parties if p in generation and p not in served]
+    if not stale:
+        return result
+    search = policy_index.search_policy_chunks_multi(
+        db, party_ids=stale, queries=norm, per_query=per_query, max_total=top_n, mode=key_mode
+    )
+    rows = []
+    for party in stale:
+        hits = search.hits_for(party)
+        result.hits_by_party[party] = hits[:max_total]
+        if any(h.fallback in {"timeout", "embed_error"} for h in hits):
+            # 一時的な切り替えの結果は保存しない（次回また指定の方式で引く）
+            continue
+        rows.append(
+            {
+                "topic_id": topic_id,
+                "party_id": _as_uuid(party),
+                # 検索前に読んだ世代を入れる（検索中にチャンクが変われば次回また引き直す）
+                "index_generation": generation[party],
+                "query_key": key,
+                "chunk_ids": [h.chunk.chunk_id for h in hits],
+                "ranks": [float(h.rank) for h in hits],
+            }
+        )
+    if not rows:
+        result.refreshed_parties = len(stale)
+        result.statements += search.statements
+        result.legacy_round_trips += search.legacy_round_trips
+        return result
+    stmt = pg_insert(T).values(rows)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[T.topic_id, T.party_id],
+            set_={
+                "index_generation": stmt.excluded.index_generation,
+                "query_key": stmt.excluded.query_key,
+                "chunk_ids": stmt.excluded.chunk_ids,
+                "ranks": stmt.excluded.ranks,
+                "computed_at": func.now(),
+            },
+        )
+    )
+    result.refreshed_parties = len(stale)
+    result.statements += search.statements + 1
+    result.legacy_round_trips += search.legacy_round_trips
+    return result
+
+
+@dataclass
+class TopicChunksRefreshStats:
+    topics: int = 0
+    parties: int = 0
+    refreshed_pairs: int = 0
+    cached_pairs: int = 0
+    elapsed_sec: float = 0.0
+
+
+def refresh_topic_chunks(
+    db: Session,
+    *,
+    topic_ids: Sequence[str] | None = None,
+    party_ids: Sequence[Any] | None = None,
+) -> TopicChunksRefreshStats:
+    """有効なトピック × 政党のうち、古くなった行だけ作り直してトピックごとに commit する。
+
+    クエリと件数はスコアリングの既定（トピック名+サブキーワード、max_evidence_per_party）に合わせる。
+    """
+    started = time.perf_counter()
+    stats = TopicChunksRefreshStats()
+    Tp, P = models.Topic, models.PartyRegistry
+    q = select(Tp).where(Tp.is_active.is_(True)).order_by(Tp.topic_id)
+    if topic_ids is not None:
+        q = q.where(Tp.topic_id.in_(list(topic_ids)))
+    topics = list(db.scalars(q))
+    pq = select(P.party_id).where(P.status != "rejected")
+    if party_ids is not None:
+        pq = pq.where(P.party_id.in_([_as_uuid(p) for p in party_ids if p is not None]))
+    parties = list(db.scalars(pq))
+    stats.parties = len(parties)
+    per_query = max(1, int(settings.max_evidence_per_party))
+    for topic in topics:
+        res = get_topic_chunks(
+            db,
+            topic_id=topic.topic_id,
+            party_ids=parties,
+            queries=[topic.name, *list(topic.search_subkeywords or [])],
+            per_query=per_query,
+            max_total=max(3, per_query * 2),
+        )
+        db.commit()
+        stats.topics += 1
+        stats.refreshed_pairs += res.refreshed_parties
+        stats.cached_pairs += res.cached_parties
+    stats.elapsed_sec = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def list_topic_chunks(db: Session, topic_id: str, *, party_id: Any | None = None) -> list[dict[str, Any]]:
+    """根拠の閲覧用: 保存済みの上位チャンクを政党ごとに返す（引き直しはしない。stale で古さが分かる）。"""
+    P, T, C = models.PartyRegistry, models.TopicPartyChunks, models.PolicyChunk
+    q = (
+        select(T, P.name_ja, P.index_generation.label("current_generation"))
+        .join(P, P.party_id == T.party_id)
+        .where(T.topic_id == topic_id)
+        .order_by(P.name_ja)
+    )
+    if party_id is not None:
+        q = q.where(T.party_id == _as_uuid(party_id))
+    rows = db.execute(q).all()
+    ids = {cid for r in rows for cid in (r.TopicPartyChunks.chunk_ids or [])}
+    chunks = {c.chunk_id: c for c in db.scalars(select(C).where(C.chunk_id.in_(list(ids))))} if ids else {}
+    out: list[dict[str, Any]] = []
+    for r in rows:
+        row = r.TopicPartyChunks
+        items = []
+        for cid, rank in zip(row.chunk_ids or [], row.ranks or []):
+            chunk = chunks.get(cid)
+            items.append(
+                {
+                    "chunk_id": str(cid),
+                    "rank": float(rank),
+                    "source_url": (chunk.source_url if chunk is not None else None),
+                    "title": (chunk.title if chunk is not None else None),
+                    "content": (chunk.content if chunk is not None else None),
+                }
+            )
+        out.append(
+            {
+                "party_id": str(row.party_id),
+                "party_name": r.name_ja,
+                "index_generation": int(row.index_generation),
+                "current_generation": int(r.current_generation),
+                "stale": int(row.index_generation) != int(r.current_generation) or any(i["content"] is None for i in items),
+                "computed_at": row.computed_at.isoformat() if row.computed_at else None,
+                "chunks": items,
+            }
+        )
+    return out
@@ -9,6 +9,7 @@ from ..db import models
 from ..schemas import TopicCreate, TopicRubricCreate, TopicRubricUpdate
 from ..settings import settings
 from ..agents import query_expander
+from . import topic_chunks
 
 
 def _generate_subkeywords(name: str, description: str | None) -> list[str]:
@@ -31,15 +32,28 @@ def _generate_subkeywords(name: str, description: str | None) -> list[str]:
     return []
 
 
+def _refresh_topic_chunks(db: Session, topic: models.Topic) -> None:
+    # トピック名/サブキーワードが変わると検索クエリが変わるので、このトピックの上位チャンクを作り直す
+    try:
+        topic_chunks.refresh_topic_chunks(db, topic_ids=[topic.topic_id])
+    except Exception:
+        # スコアリング時に引き直されるので、ここで失敗してもトピックの保存は成功とする
+        db.rollback()
+    db.refresh(topic)
+
+
 def upsert_topic(db: Session, payload: TopicCreate) -> models.Topic:
     topic = db.get(models.Topic, payload.topic_id)
     if topic:
+        before = (topic.name, list(topic.search_subkeywords or []))
         topic.name = payload.name
         topic.description = payload.description
         topic.is_active = True if payload.is_active is None else bool(payload.is_active)
         topic.search_subkeywords = _generate_subkeywords(payload.name, payload.description)
         db.commit()
         db.refresh(topic)
+        if (topic.name, list(topic.search_subkeywords or [])) != before:
+            _refresh_topic_chunks(db, topic)
         return topic
 
     topic = models.Topic(topic_id=payload.topic_id, name=payload.name, description=payload.description)
@@ -48,6 +62,7 @@ def upsert_topic(db: Session, payload: TopicCreate) -> models.Topic:
     db.add(topic)
     db.commit()
     db.refresh(topic)
+    _refresh_topic_chunks(db, topic)
     return topic
 
 
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import posixpath
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+INDEX_FILES = {
+    "index.html",
+    "index.htm",
+    "index.php",
+    "index.shtml",
+    "default.htm",
+    "default.html",
+    "default.aspx",
+}
+
+# 完全一致で除外するクエリパラメータ（広告/計測系）
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "yclid",
+    "msclkid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "ref_src",
+    "spm",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+
+def _is_tracking_param(name: str) -> bool:
+    n = (name or "").lower()
+    return n in TRACKING_PARAMS or n.startswith(TRACKING_PREFIXES)
+
+
+def _normalize_path(path: str) -> str:
+    if not path:
+        return "/"
+    trailing = path.endswith("/")
+    norm = posixpath.normpath(path)
+    # posixpath.normpath keeps a leading "//"
+    if norm.startswith("//"):
+        norm = "/" + norm.lstrip("/")
+    if norm in {".", ""}:
+        norm = "/"
+    if trailing and not norm.endswith("/"):
+        norm += "/"
+    head, _, last = norm.rpartition("/")
+    if last.lower() in INDEX_FILES:
+        norm = head + "/"
+    return norm
+
+
+def canonicalize_url(url: str) -> str:
+    """取得可能な形を保ったまま正規化したURL（scheme/host小文字化、既定ポート・計測パラメータ・index除去）。"""
+    u = (url or "").strip().strip('\'"')
+    if not u:
+        return ""
+    if u.startswith("//"):
+        u = "https:" + u
+    try:
+        p = urlparse(u)
+    except ValueError:
+        return ""
+    scheme = (p.scheme or "").lower()
+    if scheme not in {"http", "https"}:
+        return u.split("#", 1)[0]
+    host = (p.hostname or "").lower().rstrip(".")
+    if not host:
+        return ""
+    try:
+        port = p.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port is not None and str(port) != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    query_items = [(k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if not _is_tracking_param(k)]
+    query = urlencode(sorted(query_items), doseq=True) if query_items else ""
+    return urlunparse((scheme, netloc, _normalize_path(p.path), p.params, query, ""))
+
+
+def url_key(url: str) -> str:
+    """同一ページ判定用のキー。http/https・www有無・末尾スラッシュの違いを同一視する。"""
+    canon = canonicalize_url(url)
+    if not canon:
+        return ""
+    try:
+        p = urlparse(canon)
+    except ValueError:
+        return canon
+    if p.scheme not in {"http", "https"}:
+        return canon
+    host = p.netloc.removeprefix("www.")
+    path = p.path.rstrip("/") or "/"
+    key = host + path
+    if p.query:
+        key += "?" + p.query
+    return key
+
+
+@dataclass
+class UrlDeduper:
+    """正規化キーで既出URLを管理し、重複取得を抑止した件数を数える。
+
+    add には正規化前のURL（リンクの href を絶対URLにしたもの）を渡す。同じキーに対する表記の種類が
+    n 通りあれば、取得は1回で済むので n-1 件を fetches_saved に数える。
+    """
+
+    keys: set[str] = field(default_factory=set)
+    # キーごとに見た正規化前の表記
+    variants: dict[str, set[str]] = field(default_factory=dict)
+    fetches_saved: int = 0
+
+    def seen(self, url: str) -> bool:
+        return url_key(url) in self.keys
+
+    def add(self, url: str) -> bool:
+        """新規なら登録してTrue。正規化キーが既出ならFalse（初めて見た表記なら fetches_saved に加算）。"""
+        key = url_key(url)
+        if not key:
+            return False
+        raw = (url or "").strip()
+        seen_variants = self.variants.setdefault(key, set())
+        if key in self.keys:
+            if raw not in seen_variants:
+                seen_variants.add(raw)
+                self.fetches_saved += 1
+            return False
+        self.keys.add(key)
+        seen_variants.add(raw)
+        return True
+
+    def alias(self, url: str) -> bool:
+        """リダイレクト先やcanonical URLを既出として登録する。既に登録済みならTrue。"""
+        key = url_key(url)
+        if not key:
+            return False
+        if key in self.keys:
+            return True
+        self.keys.add(key)
+        return False
@@ -42,6 +42,86 @@ class Settings(BaseSettings):
         default="ja,en-US;q=0.8,en;q=0.7",
         description="HTTP取得に使うAccept-Language",
     )
+    crawl_frontier_mode: str = Field(
+        default="best_first",
+        description="政策クロールの巡回順（best_first: 政策関連度の高いリンクから取得 / bfs: 幅優先）",
+    )
+    fetch_max_bytes_html: int = Field(default=10 * 1024 * 1024, description="HTML/テキスト取得時の最大サイズ（バイト）")
+    fetch_max_bytes_pdf: int = Field(default=60 * 1024 * 1024, description="PDF取得時の最大サイズ（バイト）")
+    fetch_spool_threshold_bytes: int = Field(
+        default=2 * 1024 * 1024,
+        description="これを超える本文はメモリではなく一時ファイルに退避する（バイト）",
+    )
+    pdf_extract_workers: int = Field(default=2, description="PDF本文抽出に使うワーカープロセス数")
+    pdf_extract_timeout_sec: float = Field(default=60.0, description="PDF1件あたりの本文抽出タイムアウト（秒）")
+    pdf_max_pages: int = Field(default=300, description="PDF本文抽出で読む最大ページ数（0で無制限）")
+    pdf_text_cache_dir: str | None = Field(
+        default=None,
+        description="PDF抽出テキストのキャッシュ先（未指定なら backend/cache/pdf_text）",
+    )
+    html_parser_backend: str = Field(
+        default="auto",
+        description="HTML本文抽出のパーサ（auto|stdlib|lxml|selectolax。auto は導入済みの高速パーサを優先）",
+    )
+    boilerplate_strip: bool = Field(default=True, description="政策クロールでサイト共通のメニュー/フッター等の行を除去してからチャンク化する")
+    boilerplate_min_pages: int = Field(default=3, description="共通行とみなすのに必要な最小ページ数")
+    boilerplate_min_ratio: float = Field(default=0.5, description="ホスト内のこの割合以上のページに出る行を共通行とみなす")
+    boilerplate_warmup_pages: int = Field(
+        default=20,
+        description="共通行の学習に使うホストごとの先頭ページ数（学習が済むまでこの件数だけ本文を保持し、以後は取得ごとに除去して書き込む）",
+    )
+    near_dup_max_hamming: int = Field(default=3, description="ほぼ同一文書とみなす SimHash のハミング距離上限（3以下推奨）")
+    near_dup_min_chars: int = Field(default=200, description="ほぼ同一判定の対象にする本文の最小文字数")
+    crawl_archive_raw: bool = Field(default=True, description="クロールした生の本文を source_snapshots に圧縮保存する（再取得なしの再抽出用）")
+    policy_search_mode: str = Field(
+        default="bigram",
+        description=(
+            "政策チャンク検索の方式（bigram=日本語 bi-gram 索引 / simple=従来の 'simple' 全文検索 + ILIKE / "
+            "bm25=プロセス内の BM25 索引。numpy が無い環境では bigram / vector=埋め込みの近傍検索 / "
+            "hybrid=bi-gram とベクトル（無ければ BM25）を RRF で融合し MMR で重複を除く）"
+        ),
+    )
+    bm25_index_dir: str | None = Field(
+        default=None,
+        description="BM25 索引の保存先（未指定なら backend/cache/bm25）",
+    )
+    policy_search_max_chunks_per_doc: int = Field(default=2, description="hybrid 検索で1文書から採用するチャンク数の上限")
+    policy_search_mmr_lambda: float = Field(
+        default=0.5,
+        description="hybrid 検索の MMR の重み（1に近いほど関連度優先、0に近いほど多様性優先）",
+    )
+    embedding_provider: str = Field(
+        default="hashing",
+        description="チャンク埋め込みの方式（hashing=ネットワーク不要の bi-gram ハッシュ / openai / gemini。API キーが無ければ hashing）",
+    )
+    embedding_model: str | None = Field(default=None, description="openai/gemini の埋め込みモデル名（未指定なら各社の既定）")
+    embedding_batch_size: int = Field(default=64, description="埋め込みジョブで1回に埋め込む（commit する）チャンク数")
+    vector_search_timeout_ms: int = Field(default=500, description="ベクトル検索1回の時間上限（ミリ秒）。超えたら bi-gram 検索にする")
+    bm25_refresh_interval_sec: float = Field(
+        default=300.0,
+        description="scripts/build_bm25_index.py --watch が BM25 索引へチャンクの差分を反映する間隔（秒）。検索時には更新しない",
+    )
+    topic_chunks_top_n: int = Field(
+        default=10,
+        description="topic_party_chunks に保存する (トピック, 政党) ごとの上位チャンク数（スコアリングはこの先頭から使う）",
+    )
+    index_write_batch_size: int = Field(default=50, description="政策文書/チャンクをまとめて書き込み commit する文書数")
+    github_policy_sites: dict[str, dict[str, str]] = Field(
+        default={"policy.team-mir.ai": {"repo": "team-mirai/policy", "view_prefix": "/view/"}},
+        description="GitHub リポジトリの markdown を表示している政策サイト（ホスト → repo/view_prefix/ref）。tarball で一括取得する",
+    )
+    github_token: str | None = Field(default=None, description="GitHub API のトークン（未設定だと 60 リクエスト/時 に制限される）")
+    github_tarball_max_bytes: int = Field(default=100_000_000, description="政策リポジトリの tarball サイズ上限（バイト）")
+    crawl_respect_robots: bool = Field(default=True, description="政策クロールで robots.txt（Disallow/Crawl-delay）を守る")
+    crawl_use_sitemaps: bool = Field(default=True, description="政策クロールの起点に sitemap.xml のURLを加える")
+    crawl_max_delay_sec: float = Field(default=10.0, description="robots.txt の Crawl-delay の上限（秒）")
+    robots_user_agent: str = Field(default="PartyVizBot", description="robots.txt の照合に使うUser-agentトークン")
+    robots_cache_ttl_sec: int = Field(default=6 * 3600, description="robots.txt のキャッシュ保持時間（秒）")
+    robots_max_bytes: int = Field(default=500 * 1024, description="robots.txt を読む最大サイズ（バイト。超えた分は無視する）")
+    sitemap_max_bytes: int = Field(
+        default=50 * 1024 * 1024,
+        description="sitemap の最大サイズ（バイト。取得時と .gz の展開後の両方に適用する）",
+    )
 
     model_config = SettingsConfigDict(
         env_file=["../.env", ".env"],
@@ -0,0 +1,75 @@
+"""scripts/eval_policy_search.py の --engine local が本番の検索を再現していることと、検索品質の基準の確認。
+
+bi-gram 全文検索の再現（ja_bigram_tsvector / ja_bigram_tsquery / ts_rank_cd）は PostgreSQL 16 で
+同じ本文・問い合わせを実行した値と比べる。検索品質はフィクスチャで評価し、
+scripts/fixtures/policy_search_eval_baseline.json から下がっていないことを確かめる。
+
+    cd backend && python -m pytest tests/test_eval_policy_search.py
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "scripts"))
+
+from eval_policy_search import (  # noqa: E402
+    BASELINE,
+    FIXTURE,
+    _bigram_match,
+    _bigram_tsvector,
+    _rank_cd,
+    build_corpus,
+    evaluate,
+    local_modes,
+    regressions,
+)
+from src.services import chunk_bm25  # noqa: E402
+from src.services.chunking import chunk_text  # noqa: E402
+from src.settings import settings  # noqa: E402
+
+_TEXT_A = "児童手当を拡充します。児童の手当は所得制限なし。"
+_TEXT_B = "消費税の減税と、子育て支援の給付。"
+
+
+# (本文, 問い合わせ, mode, @@ の結果, ts_rank_cd)。値は PostgreSQL 16.2 で
+# SELECT ja_bigram_tsvector(t) @@ ja_bigram_tsquery(q, m), ts_rank_cd(ja_bigram_tsvector(t), ja_bigram_tsquery(q, m))
+@pytest.mark.parametrize(
+    ("text", "query", "mode", "matches", "rank"),
+    [
+        (_TEXT_A, "児童手当", "all", True, 0.1),
+        (_TEXT_A, "児童 手当", "all", True, 0.09583333),
+        (_TEXT_A, "手当 所得", "any", True, 0.3),
+        (_TEXT_B, "子 給付", "all", True, 0.016666668),
+        (_TEXT_B, "年金 減税", "all", False, 0.0),
+    ],
+)
+def test_bigram_emulation_matches_postgres(text: str, query: str, mode: str, matches: bool, rank: float) -> None:
+    tsv = _bigram_tsvector(text)
+    phrases = [tokens for _, tokens in chunk_bm25.bigram_segments(query)]
+    assert _bigram_match(tsv, phrases, mode) is matches
+    if matches:
+        assert _rank_cd(tsv, phrases, mode) == pytest.approx(rank, abs=1e-6)
+
+
+def test_local_engine_meets_baseline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    base = json.loads(BASELINE.read_text(encoding="utf-8"))
+    size, min_size, overlap = base["chunking"]
+    corpus = build_corpus(
+        fixture, chunker=lambda t: chunk_text(t, chunk_size=size, min_size=min_size, overlap=overlap), min_overlap=30
+    )
+    monkeypatch.setattr(settings, "embedding_provider", "hashing")
+    monkeypatch.setattr(settings, "bm25_index_dir", str(tmp_path))
+    report = evaluate(fixture, corpus, local_modes(corpus, tmp_path), k=base["k"], repeat=1)
+    assert regressions(report, base, k=base["k"], tolerance=0.02) == []
+    # hybrid は字句検索（既定の bigram と bm25）より下がらない
+    k = base["k"]
+    lexical = [report[m][f"recall@{k}"] for m in ("bigram", "bm25") if m in report]
+    assert report["hybrid"][f"recall@{k}"] >= max(lexical)
@@ -0,0 +1,50 @@
+"""共通部分の学習のために保持した HTML が、取得か除外のどちらか一方にだけ数えられることの確認。
+
+    cd backend && python -m pytest tests/test_policy_crawler.py
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.services.boilerplate import BoilerplateStripper  # noqa: E402
+from src.services.policy_crawler import CrawlStats, _store_stripped_pages  # noqa: E402
+
+MENU = "ホーム\n政策\nお知らせ\nお問い合わせ"
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.docs = []
+
+    def add(self, doc) -> None:
+        self.docs.append(doc)
+
+
+def test_held_pages_are_counted_once():
+    stripper = BoilerplateStripper(min_pages=3, min_ratio=0.5)
+    texts = [
+        MENU + "\n子育て支援を拡充します",
+        MENU + "\n教育の無償化を進めます",
+        MENU,  # 一覧ページ: 共通部分しかない
+    ]
+    pages = []
+    for i, text in enumerate(texts):
+        url = f"https://example.jp/p{i}"
+        stripper.model_for(url).add(text)
+        pages.append((url, text, None, None, {"url": url, "type": "html", "status": 200, "priority": 0}))
+
+    stats = CrawlStats()
+    log: dict[str, list[dict]] = {"fetched": [], "skipped": [], "errors": []}
+    writer = _Writer()
+    _store_stripped_pages(party_id=None, pages=pages, stripper=stripper, writer=writer, stats=stats, log=log)
+
+    assert stats.fetched_html == 2
+    assert stats.skipped == 1
+    assert stats.fetched_html + stats.skipped == len(pages)
+    assert [e["url"] for e in log["fetched"]] == ["https://example.jp/p0", "https://example.jp/p1"]
+    assert log["skipped"] == [{"url": "https://example.jp/p2", "reason": "boilerplate_only"}]
+    assert [d.content_text for d in writer.docs] == ["子育て支援を拡充します", "教育の無償化を進めます"]
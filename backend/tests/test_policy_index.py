@@ -0,0 +1,31 @@
+"""policy_index のベクトル検索が埋め込み API の失敗を切り替え理由として返すことの確認（DB 不要の部分）。
+
+    cd backend && python -m pytest tests/test_policy_index.py
+"""
+
+from __future__ import annotations
+
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.services import embeddings, policy_index  # noqa: E402
+
+
+class _FailingEmbedder:
+    name = "failing:test"
+
+    def embed(self, texts):
+        raise ConnectionError("provider unavailable")
+
+
+def test_embed_error_is_a_fallback_reason(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(embeddings, "get_embedder", lambda provider=None: _FailingEmbedder())
+    # 埋め込みに失敗したら DB には触れずに理由を返す
+    rows, reason = policy_index._vector_rows(None, party_id=uuid.uuid4(), q="子育て 支援", limit=3)
+    assert rows == []
+    assert reason == "embed_error"
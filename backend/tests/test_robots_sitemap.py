@@ -0,0 +1,82 @@
+"""robots.txt / sitemap の取得が上限を守ることと、robots.txt を実際に送る User-Agent でも照合することの確認。
+
+    cd backend && python -m pytest tests/test_robots_sitemap.py
+"""
+
+from __future__ import annotations
+
+import gzip
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.agents.fetchers import HttpxFetcher  # noqa: E402
+from src.services import robots_sitemap  # noqa: E402
+from src.settings import settings  # noqa: E402
+
+_URLSET = (
+    '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    "<url><loc>https://party.example.jp/policy/</loc></url></urlset>"
+)
+
+
+def _fetcher(routes: dict[str, tuple[bytes, str]], user_agent: str = "Mozilla/5.0 (X11) Chrome/120.0") -> HttpxFetcher:
+    def handler(request: httpx.Request) -> httpx.Response:
+        body, ctype = routes.get(request.url.path, (b"", "text/plain"))
+        return httpx.Response(200 if body else 404, content=body, headers={"content-type": ctype})
+
+    fetcher = HttpxFetcher()
+    fetcher.client = httpx.Client(transport=httpx.MockTransport(handler), headers={"User-Agent": user_agent})
+    return fetcher
+
+
+@pytest.fixture(autouse=True)
+def _clear_robots_cache():
+    robots_sitemap._ROBOTS_CACHE.clear()
+    yield
+    robots_sitemap._ROBOTS_CACHE.clear()
+
+
+def test_gzip_sitemap_is_decompressed() -> None:
+    fetcher = _fetcher({"/sitemap.xml.gz": (gzip.compress(_URLSET.encode()), "application/gzip")})
+    entries = robots_sitemap.collect_sitemap_entries(fetcher, ["https://party.example.jp/sitemap.xml.gz"])
+    assert [e.url for e in entries] == ["https://party.example.jp/policy/"]
+
+
+def test_gzip_bomb_is_not_expanded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "sitemap_max_bytes", 64 * 1024)
+    bomb = gzip.compress(b"<" + b" " * (8 * 1024 * 1024))
+    assert len(bomb) < 64 * 1024
+    assert robots_sitemap.parse_sitemap(bomb) == ([], [])
+
+
+def test_oversized_sitemap_is_skipped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "sitemap_max_bytes", 1024)
+    big = _URLSET.replace("</urlset>", "<!--" + "x" * 4096 + "--></urlset>").encode()
+    fetcher = _fetcher({"/sitemap.xml": (big, "application/xml")})
+    assert robots_sitemap.collect_sitemap_entries(fetcher, ["https://party.example.jp/sitemap.xml"]) == []
+
+
+def test_robots_rules_apply_to_the_sent_user_agent() -> None:
+    robots = b"User-agent: Mozilla\nDisallow: /private/\n\nUser-agent: *\nAllow: /\n"
+    info = robots_sitemap.get_robots(_fetcher({"/robots.txt": (robots, "text/plain")}), "https://party.example.jp/")
+    assert not info.allowed("https://party.example.jp/private/a.html")
+    assert info.allowed("https://party.example.jp/policy/")
+
+
+def test_robots_rules_apply_to_the_bot_token() -> None:
+    robots = f"User-agent: {settings.robots_user_agent}\nDisallow: /\n".encode()
+    info = robots_sitemap.get_robots(_fetcher({"/robots.txt": (robots, "text/plain")}), "https://party.example.jp/")
+    assert not info.allowed("https://party.example.jp/policy/")
+
+
+def test_robots_reads_only_the_first_bytes(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "robots_max_bytes", 64)
+    robots = b"User-agent: *\nDisallow: /a/\n" + b"#" * 1024 + b"\nDisallow: /b/\n"
+    info = robots_sitemap.get_robots(_fetcher({"/robots.txt": (robots, "text/plain")}), "https://party.example.jp/")
+    assert not info.allowed("https://party.example.jp/a/")
+    assert info.allowed("https://party.example.jp/b/")
@@ -0,0 +1,78 @@
+"""HTML本文抽出のバックエンド（stdlib / lxml / selectolax）が同じ結果を返すことの確認。
+
+tests/fixtures/html の政党サイト風ページ（WordPress / 静的HTML4 / Next.js / GitHub Pages 等の
+よくある構造を再現したもの）に加え、環境変数 HTML_EQUIV_CORPUS に保存済みHTMLのディレクトリを
+指定すると、その全ページでも比較する（実サイトを保存して確認する用）。
+
+    cd backend && python -m pytest tests/test_text_extract_equivalence.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.agents.text_extract import HTML_BACKENDS, ParsedHtml, available_backends  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "html"
+# stdlib 実装と比べる木構造パーサ（インストール済みのもの）
+TREE_BACKENDS = [b for b in available_backends() if b != "stdlib"]
+
+
+def _pages() -> list[Path]:
+    pages = sorted(FIXTURES.glob("*.htm*"))
+    corpus = os.environ.get("HTML_EQUIV_CORPUS")
+    if corpus:
+        pages += sorted(Path(corpus).rglob("*.htm*"))
+    return pages
+
+
+def _signature(p: ParsedHtml) -> dict:
+    # 埋め込みURLは重複排除されるだけなので順序は問わない
+    return {
+        "text": p.text,
+        "title": p.title,
+        "canonical": p.canonical,
+        "links": p.links,
+        "anchors": p.anchors,
+        "embedded_links": sorted(p.embedded_links),
+    }
+
+
+@pytest.mark.skipif(not TREE_BACKENDS, reason="lxml / selectolax not installed")
+@pytest.mark.parametrize("backend", TREE_BACKENDS)
+@pytest.mark.parametrize("page", _pages(), ids=lambda p: p.name)
+def test_backend_matches_stdlib(backend: str, page: Path) -> None:
+    html = page.read_text(encoding="utf-8", errors="ignore")
+    expected = _signature(HTML_BACKENDS["stdlib"](html))
+    assert _signature(HTML_BACKENDS[backend](html)) == expected
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_skipped_elements_are_not_text(backend: str) -> None:
+    html = (
+        "<html><head><title>A <b>B</b> &amp; C</title><noscript>head noscript</noscript></head><body>"
+        "<p>前 <noscript>JSを有効に</noscript> 後</p>"
+        '<form><textarea name="q"><b>入力</b> 例</textarea></form>'
+        '<iframe src="https://www.youtube.com/embed/x">fallback</iframe>'
+        "<template><p>テンプレート</p></template>"
+        "<script>var u = 'https://example.jp/embedded';</script>"
+        "<p>本文</p></body></html>"
+    )
+    page = HTML_BACKENDS[backend](html)
+    assert page.text == "A <b>B</b> & C\n前\n後\n本文"
+    assert page.title == "A <b>B</b> & C"
+    assert "https://example.jp/embedded" in page.embedded_links
+
+
+def test_fixture_pages_keep_body_text() -> None:
+    page = HTML_BACKENDS["stdlib"]((FIXTURES / "contact_form.html").read_text(encoding="utf-8"))
+    assert "皆さまの声を政策づくりに生かします。" in page.text
+    assert "JavaScript を有効に" not in page.text
+    assert "ここに入力" not in page.text
+    assert "入力内容に誤りがあります" not in page.text
@@ -929,7 +929,7 @@ crawlPolicySourcesBtn?.addEventListener("click", async () => {
       method: "POST",
     });
     alert(
-      `クロール完了: html=${resp.stats?.fetched_html ?? 0}, pdf=${resp.stats?.fetched_pdf ?? 0}, skipped=${resp.stats?.skipped ?? 0}, errors=${resp.stats?.errors ?? 0}`
+      `クロール完了: html=${resp.stats?.fetched_html ?? 0}, pdf=${resp.stats?.fetched_pdf ?? 0}, skipped=${resp.stats?.skipped ?? 0}, errors=${resp.stats?.errors ?? 0}, duplicates=${resp.stats?.duplicates ?? 0}, fetches_saved=${resp.stats?.fetches_saved ?? 0}, trap_skipped=${resp.stats?.trap_skipped ?? 0}, boilerplate_chunks_saved=${resp.stats?.boilerplate_chunks_saved ?? 0}, near_duplicates=${resp.stats?.near_duplicates ?? 0}, write_rows_per_sec=${resp.stats?.write_rows_per_sec ?? 0}`
     );
   } catch (e) {
     alert(`クロール失敗: ${e.message}`);
@@ -1097,6 +1097,8 @@ importResearchPackBtn?.addEventListener("click", async () => {
         <div class="rubric-meta">documents_upserted: ${escapeHtml(stats.documents_upserted ?? "")}</div>
         <div class="rubric-meta">documents_unchanged: ${escapeHtml(stats.documents_unchanged ?? "")}</div>
         <div class="rubric-meta">chunks_written: ${escapeHtml(stats.chunks_written ?? "")}</div>
+        <div class="rubric-meta">chunks_kept: ${escapeHtml(stats.chunks_kept ?? "")}</div>
+        <div class="rubric-meta">near_duplicates: ${escapeHtml(stats.near_duplicates ?? "")}</div>
         <div class="rubric-meta">skipped: ${escapeHtml(stats.skipped ?? "")}</div>
       </div>
       ${errHtml}